@@ -17,12 +17,14 @@ from app.models.user import User  # noqa
 from app.models.olympiad import Olympiad  # noqa
 from app.models.olympiad_task import OlympiadTask  # noqa
 from app.models.attempt import Attempt, AttemptAnswer, AttemptTaskGrade  # noqa
+from app.models.attempt_stats import AttemptStatsBucket  # noqa
 from app.models.auth_token import EmailVerification, PasswordResetToken, RefreshToken  # noqa
 from app.models.audit_log import AuditLog  # noqa
 from app.core.config import settings
 from app.models.social_account import SocialAccount  # noqa
 from app.models.content import ContentItem  # noqa
 from app.models.school import School  # noqa
+from app.models.teacher_certificate import TeacherCertificate  # noqa
 from app.models.olympiad_pool import OlympiadPool, OlympiadPoolItem, OlympiadAssignment  # noqa
 from app.models.announcement import (  # noqa
     AnnouncementCampaign,
@@ -0,0 +1,69 @@
+"""add attempt stats buckets
+
+Revision ID: 7d2e4f6a8b1c
+Revises: 6b7c8d9e0f1a
+Create Date: 2026-03-10 12:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7d2e4f6a8b1c"
+down_revision: Union[str, None] = "6b7c8d9e0f1a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _bucket(column: str) -> str:
+    return f"to_timestamp(floor(extract(epoch FROM {column}) / 1800) * 1800)"
+
+
+def _backfill(counter: str, source: str) -> None:
+    op.execute(
+        f"""
+        INSERT INTO attempt_stats_buckets (bucket_start, {counter})
+        SELECT bucket_start, count(*) FROM ({source}) AS src
+        GROUP BY bucket_start
+        ON CONFLICT (bucket_start)
+        DO UPDATE SET {counter} = attempt_stats_buckets.{counter} + EXCLUDED.{counter};
+        """
+    )
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS attempt_stats_buckets (
+            bucket_start TIMESTAMPTZ PRIMARY KEY,
+            attempts_started INTEGER NOT NULL DEFAULT 0,
+            attempts_submitted INTEGER NOT NULL DEFAULT 0,
+            attempts_expired INTEGER NOT NULL DEFAULT 0,
+            diploma_downloads INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    # разовый перенос истории; дальше таблицу ведёт app.services.attempt_stats
+    _backfill("attempts_started", f"SELECT {_bucket('started_at')} AS bucket_start FROM attempts")
+    _backfill(
+        "attempts_submitted",
+        f"SELECT {_bucket('COALESCE(graded_at, started_at)')} AS bucket_start FROM attempts WHERE status = 'submitted'",
+    )
+    _backfill(
+        "attempts_expired",
+        f"SELECT {_bucket('graded_at')} AS bucket_start FROM attempts WHERE status = 'expired' AND graded_at IS NOT NULL",
+    )
+    _backfill(
+        "diploma_downloads",
+        f"""
+        SELECT {_bucket('created_at')} AS bucket_start FROM audit_logs
+        WHERE method = 'GET' AND path LIKE '/api/v1/attempts/%/diploma'
+          AND status_code >= 200 AND status_code < 400
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS attempt_stats_buckets;")
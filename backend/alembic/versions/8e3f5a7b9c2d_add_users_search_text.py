@@ -0,0 +1,55 @@
+"""add users search_text with trigram index
+
+Revision ID: 8e3f5a7b9c2d
+Revises: 7d2e4f6a8b1c
+Create Date: 2026-03-12 12:00:00.000000
+
+Downtime: adding the STORED generated column rewrites ``users`` under an
+ACCESS EXCLUSIVE lock, so logins and every users query wait until the
+ALTER finishes (roughly seconds per 100k rows). Run this revision in a
+maintenance window. The trigram index is built CONCURRENTLY afterwards and
+does not block writes.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8e3f5a7b9c2d"
+down_revision: Union[str, None] = "7d2e4f6a8b1c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_TEXT_SQL = (
+    "coalesce(login, '') || ' ' || coalesce(email, '') || ' ' || coalesce(surname, '') || ' ' || "
+    "coalesce(name, '') || ' ' || coalesce(father_name, '') || ' ' || coalesce(city, '') || ' ' || "
+    "coalesce(school, '') || ' ' || coalesce(subject, '')"
+)
+INDEX_NAME = "ix_users_search_text_trgm"
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        f"ALTER TABLE users ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS ({SEARCH_TEXT_SQL}) STORED"
+    )
+    # CONCURRENTLY нельзя внутри транзакции миграции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            INDEX_NAME,
+            "users",
+            ["search_text"],
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.execute("ANALYZE users")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(INDEX_NAME, table_name="users", postgresql_concurrently=True, if_exists=True)
+    op.execute("ALTER TABLE users DROP COLUMN IF EXISTS search_text")
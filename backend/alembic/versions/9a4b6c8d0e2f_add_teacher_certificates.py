@@ -0,0 +1,36 @@
+"""add teacher certificates index
+
+Revision ID: 9a4b6c8d0e2f
+Revises: 8e3f5a7b9c2d
+Create Date: 2026-03-14 12:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9a4b6c8d0e2f"
+down_revision: Union[str, None] = "8e3f5a7b9c2d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # заполняется загрузчиком сертификатов и задачей maintenance.reconcile_teacher_certificates
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS teacher_certificates (
+            teacher_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            season VARCHAR(9) NOT NULL,
+            seq INTEGER NOT NULL,
+            key VARCHAR(512) NOT NULL,
+            PRIMARY KEY (teacher_id, season, seq)
+        );
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS teacher_certificates;")
@@ -1,5 +1,6 @@
+import codecs
 import csv
-from io import StringIO
+from collections.abc import AsyncIterator
 
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.exc import IntegrityError
@@ -7,10 +8,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import error_codes as codes
 from app.core.deps import get_db, get_read_db
-from app.core.deps_auth import require_role
+from app.core.deps_auth import require_principal_role
 from app.core.errors import http_error
 from app.models.user import UserRole
 from app.repos.announcements import AnnouncementsRepo
+from app.services.announcements import invalidate_announcements, load_assignments_hash
 from app.schemas.announcements import (
     AnnouncementCampaignCreate,
     AnnouncementCampaignRead,
@@ -25,7 +27,7 @@ from app.schemas.announcements import (
 
 router = APIRouter(
     prefix="/admin/announcements",
-    dependencies=[Depends(require_role(UserRole.admin))],
+    dependencies=[Depends(require_principal_role(UserRole.admin))],
 )
 
 
@@ -34,42 +36,74 @@ def _validate_window(starts_at, ends_at) -> None:
         raise http_error(422, codes.VALIDATION_ERROR, "starts_at must be earlier than ends_at")
 
 
-def _parse_csv_rows(csv_text: str) -> tuple[list[tuple[int, int]], int]:
-    rows: list[tuple[int, int]] = []
-    invalid = 0
-    if not csv_text.strip():
-        return rows, invalid
-
-    sample = csv_text[:4096]
-    try:
-        dialect = csv.Sniffer().sniff(sample, delimiters=",;")
-        delimiter = dialect.delimiter
-    except Exception:
-        delimiter = ","
-
-    reader = csv.reader(StringIO(csv_text), delimiter=delimiter)
-    first = True
-    for raw in reader:
-        if not raw:
-            continue
-        cols = [c.strip() for c in raw]
-        if len(cols) < 2:
-            invalid += 1
-            continue
-        if first:
-            first = False
-            header0 = cols[0].lower()
-            header1 = cols[1].lower()
-            if header0 in {"user_id", "userid", "id"} and header1 in {"group", "group_number", "group_id"}:
-                continue
+CSV_READ_CHUNK_SIZE = 64 * 1024
+_HEADER_USER = {"user_id", "userid", "id"}
+_HEADER_GROUP = {"group", "group_number", "group_id"}
+
+
+class _CsvRowParser:
+    """Incremental ``user_id,group`` parser; counts rows it could not parse."""
+
+    def __init__(self, file: UploadFile):
+        self.file = file
+        self.invalid = 0
+
+    async def _lines(self) -> AsyncIterator[str]:
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        tail = ""
+        while True:
+            chunk = await self.file.read(CSV_READ_CHUNK_SIZE)
+            text = tail + decoder.decode(chunk, final=not chunk)
+            lines = text.splitlines(keepends=True)
+            tail = lines.pop() if chunk and lines and not lines[-1].endswith(("\n", "\r")) else ""
+            for line in lines:
+                yield line
+            if not chunk:
+                if tail:
+                    yield tail
+                return
+
+    async def rows(self) -> AsyncIterator[tuple[int, int]]:
+        lines = self._lines()
+        head: list[str] = []
+        async for line in lines:
+            head.append(line)
+            if sum(len(item) for item in head) >= 4096:
+                break
+        sample = "".join(head)
+        if not sample.strip():
+            return
         try:
-            user_id = int(cols[0])
-            group_number = int(cols[1])
+            delimiter = csv.Sniffer().sniff(sample[:4096], delimiters=",;").delimiter
         except Exception:
-            invalid += 1
-            continue
-        rows.append((user_id, group_number))
-    return rows, invalid
+            delimiter = ","
+
+        async def _all_lines() -> AsyncIterator[str]:
+            for line in head:
+                yield line
+            async for line in lines:
+                yield line
+
+        first = True
+        async for line in _all_lines():
+            raw = next(csv.reader([line], delimiter=delimiter), None)
+            if not raw:
+                continue
+            cols = [c.strip() for c in raw]
+            if len(cols) < 2:
+                self.invalid += 1
+                continue
+            if first:
+                first = False
+                if cols[0].lower() in _HEADER_USER and cols[1].lower() in _HEADER_GROUP:
+                    continue
+            try:
+                user_id = int(cols[0])
+                group_number = int(cols[1])
+            except Exception:
+                self.invalid += 1
+                continue
+            yield user_id, group_number
 
 
 def _ensure_subject(subject: str) -> str:
@@ -95,9 +129,11 @@ async def create_campaign(payload: AnnouncementCampaignCreate, db: AsyncSession
     if existing is not None:
         raise http_error(409, codes.VALIDATION_ERROR, "Campaign code already exists")
     try:
-        return await repo.create_campaign(payload.model_dump())
+        campaign = await repo.create_campaign(payload.model_dump())
     except IntegrityError:
         raise http_error(409, codes.VALIDATION_ERROR, "Campaign code already exists")
+    await invalidate_announcements()
+    return campaign
 
 
 @router.patch("/campaigns/{campaign_id}", response_model=AnnouncementCampaignRead, tags=["admin"])
@@ -110,7 +146,9 @@ async def update_campaign(campaign_id: int, payload: AnnouncementCampaignUpdate,
     starts = patch.get("starts_at", campaign.starts_at)
     ends = patch.get("ends_at", campaign.ends_at)
     _validate_window(starts, ends)
-    return await repo.update_campaign(campaign, patch)
+    campaign = await repo.update_campaign(campaign, patch)
+    await invalidate_announcements()
+    return campaign
 
 
 @router.get("/campaigns/{campaign_id}/groups", response_model=list[AnnouncementGroupMessageRead], tags=["admin"])
@@ -138,7 +176,9 @@ async def upsert_group_message(
     campaign = await repo.get_campaign(campaign_id)
     if campaign is None:
         raise http_error(404, codes.ANNOUNCEMENT_CAMPAIGN_NOT_FOUND, "Campaign not found")
-    return await repo.upsert_group_message(campaign_id, payload.model_dump())
+    row = await repo.upsert_group_message(campaign_id, payload.model_dump())
+    await invalidate_announcements()
+    return row
 
 
 @router.get("/campaigns/{campaign_id}/fallback", response_model=AnnouncementFallbackRead | None, tags=["admin"])
@@ -160,7 +200,9 @@ async def upsert_fallback(
     campaign = await repo.get_campaign(campaign_id)
     if campaign is None:
         raise http_error(404, codes.ANNOUNCEMENT_CAMPAIGN_NOT_FOUND, "Campaign not found")
-    return await repo.upsert_fallback(campaign_id, payload.model_dump())
+    row = await repo.upsert_fallback(campaign_id, payload.model_dump())
+    await invalidate_announcements()
+    return row
 
 
 @router.post(
@@ -180,21 +222,20 @@ async def import_assignments(
     if campaign is None:
         raise http_error(404, codes.ANNOUNCEMENT_CAMPAIGN_NOT_FOUND, "Campaign not found")
 
-    content = await file.read()
+    parser = _CsvRowParser(file)
     try:
-        csv_text = content.decode("utf-8-sig")
-    except Exception:
+        stats = await repo.replace_assignments(
+            campaign_id=campaign_id,
+            subject=norm_subject,
+            rows=parser.rows(),
+            source_file=file.filename or "uploaded.csv",
+        )
+    except UnicodeDecodeError:
+        await db.rollback()
         raise http_error(422, codes.VALIDATION_ERROR, "CSV must be UTF-8 encoded")
-
-    rows, invalid_rows = _parse_csv_rows(csv_text)
-    stats = await repo.replace_assignments(
-        campaign_id=campaign_id,
-        subject=norm_subject,
-        rows=rows,
-        source_file=file.filename or "uploaded.csv",
-    )
-    stats.total_rows += invalid_rows
-    stats.skipped_invalid_format += invalid_rows
+    await load_assignments_hash(db, campaign_id, norm_subject, new_import=True)
+    stats.total_rows += parser.invalid
+    stats.skipped_invalid_format += parser.invalid
 
     return AnnouncementImportResult(
         campaign_id=campaign_id,
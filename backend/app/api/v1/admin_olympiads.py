@@ -1,12 +1,16 @@
+import uuid
+from functools import partial
 from io import BytesIO
 
 from fastapi import APIRouter, Depends, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.deps import get_db, get_read_db
 from app.core.deps_auth import require_role
 from app.core.errors import http_error
+from app.core.storage import run_io
 from app.models.user import UserRole, User
 from app.repos.olympiads import OlympiadsRepo
 from app.repos.olympiad_tasks import OlympiadTasksRepo
@@ -15,7 +19,10 @@ from app.schemas.olympiads_admin import (
     OlympiadCreate, OlympiadUpdate, OlympiadRead,
     OlympiadTaskAdd, OlympiadTaskRead,
 )
+from app.schemas.diplomas import DiplomaRenderStatus, DiplomaTemplate
+from app.services import diploma_render
 from app.services.olympiads_admin import AdminOlympiadsService
+from app.tasks.diplomas import render_diplomas
 from app.schemas.olympiads_admin import OlympiadTaskFullRead
 from app.schemas.tasks import TaskRead
 from app.services.olympiad_pdf import build_olympiad_pdf_bytes
@@ -400,14 +407,79 @@ async def export_olympiad_pdf(
 
     repo = OlympiadTasksRepo(db)
     rows = await repo.list_full_by_olympiad(olympiad_id)
-    pdf_bytes = build_olympiad_pdf_bytes(
-        olympiad=obj,
-        task_rows=rows,
-        include_description=include_description,
-        include_task_title=include_task_title,
-        include_task_and_answer_type=include_task_and_answer_type,
-        include_correct_answer=include_correct_answer,
+    # картинки заданий скачиваются из хранилища — сборка идёт в пуле storage I/O
+    pdf_bytes = await run_io(
+        "olympiad_pdf",
+        partial(
+            build_olympiad_pdf_bytes,
+            olympiad=obj,
+            task_rows=rows,
+            include_description=include_description,
+            include_task_title=include_task_title,
+            include_task_and_answer_type=include_task_and_answer_type,
+            include_correct_answer=include_correct_answer,
+        ),
     )
     file_name = f"olympiad_{olympiad_id}.pdf"
     headers = {"Content-Disposition": f'attachment; filename="{file_name}"'}
     return StreamingResponse(BytesIO(pdf_bytes), media_type="application/pdf", headers=headers)
+
+
+@router.post(
+    "/{olympiad_id}/diplomas",
+    response_model=DiplomaRenderStatus,
+    status_code=202,
+    tags=["admin"],
+    description="Сгенерировать дипломы по шаблону для всех прошедших попыток (фоновая задача)",
+    responses={
+        401: response_example(codes.MISSING_TOKEN),
+        403: response_example(codes.FORBIDDEN),
+        404: response_example(codes.OLYMPIAD_NOT_FOUND),
+        409: response_examples(codes.RESULTS_NOT_RELEASED, codes.DIPLOMA_RENDER_IN_PROGRESS),
+    },
+)
+async def start_diploma_render(
+    olympiad_id: int,
+    payload: DiplomaTemplate,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(require_role(UserRole.admin)),
+):
+    obj = await OlympiadsRepo(db).get(olympiad_id)
+    if not obj:
+        raise http_error(404, codes.OLYMPIAD_NOT_FOUND)
+    if not obj.results_released:
+        raise http_error(409, codes.RESULTS_NOT_RELEASED)
+    state = await diploma_render.get_state(olympiad_id)
+    if state and diploma_render.is_active(state):
+        raise http_error(409, codes.DIPLOMA_RENDER_IN_PROGRESS)
+
+    job_id = uuid.uuid4().hex
+    # состояние пишем до отправки, чтобы не перезаписать «running» уже стартовавшей задачи
+    state = await diploma_render.mark_queued(job_id, olympiad_id)
+    render_diplomas.apply_async(
+        args=[olympiad_id, payload.model_dump()],
+        task_id=job_id,
+        queue=settings.DIPLOMA_RENDER_QUEUE,
+    )
+    return state
+
+
+@router.get(
+    "/{olympiad_id}/diplomas",
+    response_model=DiplomaRenderStatus,
+    tags=["admin"],
+    description="Прогресс генерации дипломов",
+    responses={
+        401: response_example(codes.MISSING_TOKEN),
+        403: response_example(codes.FORBIDDEN),
+        404: response_example(codes.DIPLOMA_RENDER_NOT_FOUND),
+    },
+)
+async def get_diploma_render(
+    olympiad_id: int,
+    admin: User = Depends(require_role(UserRole.admin)),
+):
+    state = await diploma_render.get_state(olympiad_id)
+    if state is None:
+        raise http_error(404, codes.DIPLOMA_RENDER_NOT_FOUND)
+    return state
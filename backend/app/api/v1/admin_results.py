@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal
 
-from app.core.deps import get_db, get_read_db
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.deps import get_db, get_read_db, get_read_sessionmaker
 from app.core.deps_auth import require_role
 from app.core.errors import http_error
 from app.core import error_codes as codes
@@ -12,10 +16,16 @@ from app.repos.teacher_students import TeacherStudentsRepo
 from app.models.teacher_student import TeacherStudentStatus
 from app.schemas.admin_results import AdminOlympiadAttemptRow, AdminAttemptView
 from app.services.teacher import TeacherService
+from app.services.results_export import iter_csv, iter_xlsx, teachers_value
 
 
 router = APIRouter(prefix="/admin/results")
 
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
 
 @router.get(
     "/olympiads/{olympiad_id}/attempts",
@@ -30,13 +40,20 @@ router = APIRouter(prefix="/admin/results")
 )
 async def list_olympiad_attempts(
     olympiad_id: int,
+    limit: int | None = Query(default=None, ge=1, le=5000),
+    before_id: int | None = Query(default=None, ge=1, description="Keyset: вернуть попытки с id < before_id"),
     db: AsyncSession = Depends(get_read_db),
     admin: User = Depends(require_role(UserRole.admin)),
 ):
     links_repo = TeacherStudentsRepo(db)
     service = TeacherService(TeacherRepo(db), OlympiadsRepo(db), links_repo)
     try:
-        _olymp, rows = await service.list_olympiad_attempts(teacher=admin, olympiad_id=olympiad_id)
+        _olymp, rows = await service.list_olympiad_attempts(
+            teacher=admin,
+            olympiad_id=olympiad_id,
+            limit=limit,
+            before_id=before_id,
+        )
     except ValueError as e:
         code = str(e)
         if code == codes.OLYMPIAD_NOT_FOUND:
@@ -45,29 +62,16 @@ async def list_olympiad_attempts(
             raise http_error(403, codes.FORBIDDEN)
         raise
 
+    linked_names = await links_repo.list_teacher_names_for_students(
+        [user.id for _attempt, user in rows],
+        TeacherStudentStatus.confirmed,
+    )
+
     result = []
     for attempt, user in rows:
         full_name = " ".join(filter(None, [user.surname, user.name, user.father_name])) or None
         gender = user.gender.value if user.gender else None
-
-        links = await links_repo.list_links_with_users_for_student(user.id, TeacherStudentStatus.confirmed)
-        teachers: list[str] = []
-        for _link, teacher_user, _student_user in links:
-            teacher_name = " ".join(filter(None, [teacher_user.surname, teacher_user.name, teacher_user.father_name]))
-            if teacher_name:
-                teachers.append(teacher_name)
-
-        for teacher in user.manual_teachers or []:
-            if isinstance(teacher, dict):
-                manual_name = str(teacher.get("full_name") or "").strip()
-                if manual_name:
-                    teachers.append(manual_name)
-
-        deduped_teachers: list[str] = []
-        for teacher_name in teachers:
-            if teacher_name not in deduped_teachers:
-                deduped_teachers.append(teacher_name)
-        teachers_value = "; ".join(deduped_teachers) if deduped_teachers else None
+        teachers = teachers_value(linked_names.get(user.id, []), user.manual_teachers)
 
         score_max = attempt.score_max or 0
         percent = int(round(attempt.score_total / score_max * 100)) if score_max > 0 else 0
@@ -81,8 +85,8 @@ async def list_olympiad_attempts(
                 "class_grade": user.class_grade,
                 "city": user.city,
                 "school": user.school,
-                "teachers": teachers_value,
-                "linked_teachers": teachers_value,
+                "teachers": teachers,
+                "linked_teachers": teachers,
                 "started_at": attempt.started_at,
                 "completed_at": attempt.graded_at,
                 "duration_sec": attempt.duration_sec,
@@ -94,6 +98,46 @@ async def list_olympiad_attempts(
     return result
 
 
+@router.get(
+    "/olympiads/{olympiad_id}/export",
+    tags=["admin"],
+    description="Выгрузка результатов олимпиады (CSV/XLSX) с баллами по заданиям",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}},
+        401: {"description": "Missing token"},
+        403: {"description": "Forbidden"},
+        404: {"description": "Olympiad not found"},
+    },
+)
+async def export_olympiad_results(
+    olympiad_id: int,
+    export_format: Literal["csv", "xlsx"] = Query(default="csv", alias="format"),
+    db: AsyncSession = Depends(get_read_db),
+    session_maker: async_sessionmaker[AsyncSession] = Depends(get_read_sessionmaker),
+    admin: User = Depends(require_role(UserRole.admin)),
+):
+    repo = TeacherRepo(db)
+    if await repo.get_olympiad(olympiad_id) is None:
+        raise http_error(404, codes.OLYMPIAD_NOT_FOUND)
+    task_ids = [olympiad_task.task_id for olympiad_task, _task in await repo.list_tasks(olympiad_id)]
+
+    # сессия запроса закрывается до отправки тела — поток открывает свою
+    iter_rows = iter_xlsx if export_format == "xlsx" else iter_csv
+    body = iter_rows(
+        session_maker,
+        olympiad_id=olympiad_id,
+        task_ids=task_ids,
+        batch_size=settings.RESULTS_EXPORT_BATCH_SIZE,
+    )
+    filename = f"olympiad_{olympiad_id}_results.{export_format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 @router.get(
     "/attempts/{attempt_id}",
     response_model=AdminAttemptView,
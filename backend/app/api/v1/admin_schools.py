@@ -4,18 +4,19 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.deps import get_db, get_read_db
-from app.core.deps_auth import require_role
+from app.core.deps_auth import require_principal_role
 from app.core.errors import http_error
 from app.core import error_codes as codes
 from app.models.school import School
 from app.models.user import User
 from app.models.user import UserRole
 from app.schemas.school import SchoolCreate, SchoolRead, SchoolAdminRead, SchoolSummary
+from app.services.school_lookup import bump_index_version
 
 
 router = APIRouter(
     prefix="/admin/schools",
-    dependencies=[Depends(require_role(UserRole.admin))],
+    dependencies=[Depends(require_principal_role(UserRole.admin))],
 )
 
 
@@ -91,5 +92,6 @@ async def create_school(
     except IntegrityError:
         await db.rollback()
         raise http_error(400, codes.VALIDATION_ERROR, "Школа с таким городом и названием уже существует.")
+    await bump_index_version()
     await db.refresh(school)
     return school
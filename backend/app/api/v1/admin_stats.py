@@ -3,52 +3,29 @@ from zoneinfo import ZoneInfo
 
 from fastapi import APIRouter, Depends
 from sqlalchemy import update
-from sqlalchemy import func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps_auth import require_role
+from app.core.deps_auth import require_principal_role
 from app.core.deps import get_db
 from app.models.attempt import Attempt, AttemptStatus
-from app.models.audit_log import AuditLog
 from app.models.user import UserRole
+from app.services import attempt_stats
 from app.schemas.admin_stats import StartedAttemptsSeries, StartedAttemptsSeriesPoint, ActiveAttemptsStats
 
-router = APIRouter(prefix="/admin/stats", dependencies=[Depends(require_role(UserRole.admin))])
+router = APIRouter(prefix="/admin/stats", dependencies=[Depends(require_principal_role(UserRole.admin))])
 
 
 @router.get("/attempts", response_model=ActiveAttemptsStats, tags=["admin"])
 async def get_attempts_stats(db: AsyncSession = Depends(get_db)) -> ActiveAttemptsStats:
     now = datetime.now(timezone.utc)
-
-    active_attempts = await db.scalar(
-        select(func.count()).select_from(Attempt).where(Attempt.status == AttemptStatus.active)
-    )
-    active_attempts_open = await db.scalar(
-        select(func.count())
-        .select_from(Attempt)
-        .where(Attempt.status == AttemptStatus.active, Attempt.deadline_at > now)
-    )
-    active_users_open = await db.scalar(
-        select(func.count(func.distinct(Attempt.user_id)))
-        .select_from(Attempt)
-        .where(Attempt.status == AttemptStatus.active, Attempt.deadline_at > now)
-    )
-    diploma_downloads_total = await db.scalar(
-        select(func.count())
-        .select_from(AuditLog)
-        .where(
-            AuditLog.method == "GET",
-            AuditLog.path.like("/api/v1/attempts/%/diploma"),
-            AuditLog.status_code >= 200,
-            AuditLog.status_code < 400,
-        )
-    )
+    active_attempts, active_attempts_open, active_users_open = await attempt_stats.active_overview(db, now)
+    diploma_downloads_total = await attempt_stats.counter_total(db, "diploma_downloads")
 
     return ActiveAttemptsStats(
-        active_attempts=int(active_attempts or 0),
-        active_attempts_open=int(active_attempts_open or 0),
-        active_users_open=int(active_users_open or 0),
-        diploma_downloads_total=int(diploma_downloads_total or 0),
+        active_attempts=active_attempts,
+        active_attempts_open=active_attempts_open,
+        active_users_open=active_users_open,
+        diploma_downloads_total=diploma_downloads_total,
         updated_at=now,
     )
 
@@ -57,44 +34,18 @@ async def get_attempts_stats(db: AsyncSession = Depends(get_db)) -> ActiveAttemp
 async def get_attempts_timeseries(
     db: AsyncSession = Depends(get_db),
 ) -> StartedAttemptsSeries:
-    step_minutes = 30
+    step_minutes = int(attempt_stats.BUCKET_STEP.total_seconds() // 60)
     moscow_tz = ZoneInfo("Europe/Moscow")
     now_msk = datetime.now(moscow_tz)
     rounded_minute = (now_msk.minute // step_minutes) * step_minutes
     now_msk = now_msk.replace(minute=rounded_minute, second=0, microsecond=0)
-    now = now_msk.astimezone(timezone.utc)
-    end_time = now
+    end_time = now_msk.astimezone(timezone.utc)
     start_time = now_msk.replace(hour=0, minute=0, second=0, microsecond=0).astimezone(timezone.utc)
 
-    stmt = text(
-        """
-        SELECT
-            t.bucket AS bucket,
-            COALESCE(count(a.id), 0) AS started_attempts
-        FROM generate_series(:start_time, :end_time, CAST(:step AS interval)) AS t(bucket)
-        LEFT JOIN attempts a
-            ON a.started_at >= t.bucket
-            AND a.started_at < t.bucket + CAST(:step AS interval)
-        GROUP BY t.bucket
-        ORDER BY t.bucket
-        """
-    )
-
-    rows = await db.execute(
-        stmt,
-        {
-            "start_time": start_time,
-            "end_time": end_time,
-            "step": timedelta(minutes=step_minutes),
-        },
-    )
-
+    series = await attempt_stats.counter_series(db, "attempts_started", start_time, end_time)
     points = [
-        StartedAttemptsSeriesPoint(
-            bucket=row.bucket,
-            started_attempts=int(row.started_attempts or 0),
-        )
-        for row in rows
+        StartedAttemptsSeriesPoint(bucket=bucket, started_attempts=started_attempts)
+        for bucket, started_attempts in series
     ]
 
     return StartedAttemptsSeries(step_minutes=step_minutes, points=points)
@@ -111,6 +62,9 @@ async def expire_overdue_attempts(db: AsyncSession = Depends(get_db)) -> int:
             Attempt.deadline_at < (now - buffer_window),
         )
         .values(status=AttemptStatus.expired)
+        .returning(Attempt.id)
     )
+    expired_ids = list(res.scalars().all())
     await db.commit()
-    return int(res.rowcount or 0)
+    await attempt_stats.record_closed(expired_ids)
+    return len(expired_ids)
@@ -2,7 +2,7 @@ from datetime import datetime, timezone, timedelta
 import secrets
 import string
 
-from fastapi import APIRouter, Depends, Header, Query
+from fastapi import APIRouter, Depends, Header, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
@@ -12,7 +12,7 @@ from app.core.deps_auth import require_role, get_current_user_optional
 from app.core.errors import http_error
 from app.core.request_id import get_request_id
 from app.core.redis import safe_redis
-from app.core.security import hash_password, validate_password_policy, hash_token
+from app.core.security import hash_password_async, validate_password_policy, hash_token
 from app.tasks.email import send_email_task
 from app.models.user import UserRole, User
 from app.repos.auth_tokens import AuthTokensRepo
@@ -204,6 +204,8 @@ async def list_users(
     subject: str | None = Query(default=None),
     gender: str | None = Query(default=None, pattern="^(male|female)$"),
     subscription: int | None = Query(default=None, ge=0, le=5),
+    q: str | None = Query(default=None, max_length=255, description="Поиск по логину, email, ФИО, городу, школе и предмету"),
+    after_id: int | None = Query(default=None, ge=0, description="Keyset-пагинация: id последнего пользователя предыдущей страницы"),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
     db: AsyncSession = Depends(get_db),
@@ -230,6 +232,8 @@ async def list_users(
         subject=subject,
         gender=gender,
         subscription=subscription,
+        q=_normalize_query(q),
+        after_id=after_id,
         limit=limit,
         offset=offset,
     )
@@ -247,6 +251,7 @@ async def list_users(
     },
 )
 async def count_users(
+    response: Response,
     user_id: int | None = Query(default=None),
     role: UserRole | None = Query(default=None),
     is_active: bool | None = Query(default=None),
@@ -266,11 +271,14 @@ async def count_users(
     subject: str | None = Query(default=None),
     gender: str | None = Query(default=None, pattern="^(male|female)$"),
     subscription: int | None = Query(default=None, ge=0, le=5),
+    q: str | None = Query(default=None, max_length=255),
+    exact: bool = Query(default=False, description="Всегда считать точно, без оценки планировщика"),
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_role(UserRole.admin)),
 ):
     repo = UsersRepo(db)
-    return await repo.count(
+    total, estimated = await repo.estimate_count(
+        estimate_above=None if exact else settings.ADMIN_USERS_EXACT_COUNT_LIMIT,
         user_id=user_id,
         role=role,
         is_active=is_active,
@@ -290,7 +298,10 @@ async def count_users(
         subject=subject,
         gender=gender,
         subscription=subscription,
+        q=_normalize_query(q),
     )
+    response.headers["X-Count-Estimated"] = "1" if estimated else "0"
+    return total
 
 
 @router.get(
@@ -515,7 +526,7 @@ async def set_temporary_password(
         validate_password_policy(payload.temp_password)
     except ValueError:
         raise http_error(422, codes.WEAK_PASSWORD)
-    password_hash = hash_password(payload.temp_password)
+    password_hash = await hash_password_async(payload.temp_password)
     expires_at = datetime.now(timezone.utc) + timedelta(hours=settings.TEMP_PASSWORD_TTL_HOURS)
     await repo.set_password(
         user,
@@ -575,7 +586,7 @@ async def generate_temporary_password(
         raise http_error(404, codes.USER_NOT_FOUND)
 
     temp_password = _generate_temp_password()
-    password_hash = hash_password(temp_password)
+    password_hash = await hash_password_async(temp_password)
     expires_at = datetime.now(timezone.utc) + timedelta(hours=settings.TEMP_PASSWORD_TTL_HOURS)
     await repo.set_password(
         user,
@@ -6,18 +6,22 @@ from fastapi.responses import RedirectResponse
 from app.core.errors import http_error
 from app.core.rate_limit import token_bucket_rate_limit
 from app.core.metrics import RATE_LIMIT_BLOCKS
-from app.core.redis import get_redis
+from app.core.redis import safe_redis
 from app.core.config import settings
 from app.core import error_codes as codes
-from app.core.storage import public_url_for_key, presign_get
+from app.core.storage import public_url_for_key
+from app.core.storage.presign_cache import presign_get_cached
 
 
 from app.core.deps import get_db, get_read_db
-from app.core.deps_auth import require_role, get_current_user
+from app.core.auth_context import Principal
+from app.core.deps_auth import get_current_principal, require_principal_role, require_role
 from app.models.user import UserRole, User
 from app.repos.attempts import AttemptsRepo
 from app.repos.teacher_students import TeacherStudentsRepo
 from app.models.teacher_student import TeacherStudentStatus
+from app.services import attempt_stats
+from app.services.diplomas import diploma_exists, diploma_key
 from app.services.attempts import AttemptsService
 from app.api.v1.openapi_errors import response_example, response_examples
 from app.api.v1.openapi_examples import (
@@ -102,7 +106,7 @@ async def start_attempt(
 async def get_attempt_view(
     attempt_id: int,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     service = AttemptsService(AttemptsRepo(db))
     try:
@@ -168,10 +172,10 @@ async def upsert_answer(
     payload: AttemptAnswerUpsertRequest,
     response: Response,
     db: AsyncSession = Depends(get_db),
-    student: User = Depends(require_role(UserRole.student)),
+    student: Principal = Depends(require_principal_role(UserRole.student)),
 ):
     # Rate limit: per (user_id, attempt_id)
-    redis = await get_redis()
+    redis = await safe_redis()
     rl_key = f"rl:answers:u{student.id}:a{attempt_id}"
 
     rl = await token_bucket_rate_limit(
@@ -232,7 +236,7 @@ async def upsert_answer(
 async def submit_attempt(
     attempt_id: int,
     db: AsyncSession = Depends(get_db),
-    student: User = Depends(require_role(UserRole.student)),
+    student: Principal = Depends(require_principal_role(UserRole.student)),
 ):
     service = AttemptsService(AttemptsRepo(db))
     try:
@@ -264,7 +268,7 @@ async def submit_attempt(
 async def get_attempt_result(
     attempt_id: int,
     db: AsyncSession = Depends(get_read_db),
-    student: User = Depends(require_role(UserRole.student)),
+    student: Principal = Depends(require_principal_role(UserRole.student)),
 ):
     service = AttemptsService(AttemptsRepo(db))
     try:
@@ -286,14 +290,14 @@ async def get_attempt_result(
         307: {"description": "Temporary redirect to diploma file"},
         401: response_example(codes.MISSING_TOKEN),
         403: response_example(codes.FORBIDDEN),
-        404: response_example(codes.ATTEMPT_NOT_FOUND),
+        404: response_examples(codes.ATTEMPT_NOT_FOUND, codes.DIPLOMA_NOT_FOUND),
         503: response_example(codes.STORAGE_UNAVAILABLE),
     },
 )
 async def get_attempt_diploma(
     attempt_id: int,
     db: AsyncSession = Depends(get_read_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     repo = AttemptsRepo(db)
     attempt = await repo.get_attempt(attempt_id)
@@ -311,15 +315,20 @@ async def get_attempt_diploma(
     elif user.role != UserRole.admin:
         raise http_error(403, codes.FORBIDDEN)
 
-    key = f"attempt_{attempt_id}.jpg"
+    if await diploma_exists(attempt_id) is False:
+        raise http_error(404, codes.DIPLOMA_NOT_FOUND)
+
+    key = diploma_key(attempt_id)
     public_url = public_url_for_key(key)
     if public_url:
+        await attempt_stats.record_diploma_download()
         return RedirectResponse(url=public_url, status_code=307)
 
     try:
-        signed_url = presign_get(key=key)
+        signed_url = await presign_get_cached(key)
     except RuntimeError:
         raise http_error(503, codes.STORAGE_UNAVAILABLE)
+    await attempt_stats.record_diploma_download()
     return RedirectResponse(url=signed_url, status_code=307)
 
 
@@ -334,7 +343,7 @@ async def get_attempt_diploma(
 )
 async def list_my_results(
     db: AsyncSession = Depends(get_read_db),
-    student: User = Depends(require_role(UserRole.student)),
+    student: Principal = Depends(require_principal_role(UserRole.student)),
 ):
     service = AttemptsService(AttemptsRepo(db))
     try:
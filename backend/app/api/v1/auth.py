@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.deps import get_db
 from app.core.errors import http_error
-from app.core.redis import get_redis
+from app.core.redis import safe_redis
 from app.core.rate_limit import token_bucket_rate_limit
 from app.core.config import settings
 from app.core.metrics import RATE_LIMIT_BLOCKS
@@ -24,7 +24,7 @@ from app.schemas.auth import (
 )
 from app.schemas.user import UserRead
 from app.core.deps_auth import get_current_user, get_current_user_allow_password_change
-from app.core.security import verify_password, hash_password, validate_password_policy
+from app.core.security import verify_password_async, hash_password_async, validate_password_policy
 from app.api.v1.openapi_errors import response_example, response_examples
 from app.api.v1.openapi_examples import EXAMPLE_TOKEN_PAIR, EXAMPLE_USER_READ, response_model_example
 from app.core import error_codes as codes
@@ -40,25 +40,19 @@ async def _apply_rate_limit(
     window_sec: int,
     identity: str | None = None,
 ) -> None:
-    try:
-        redis = await get_redis()
-    except Exception:
-        return
+    redis = await safe_redis()
 
     ip = request.client.host if request.client else "unknown"
     ident = identity or "anon"
     key = f"rl:{key_prefix}:{ip}:{ident}"
 
-    try:
-        rl = await token_bucket_rate_limit(
-            redis,
-            key=key,
-            capacity=limit,
-            window_sec=window_sec,
-            cost=1,
-        )
-    except Exception:
-        return
+    rl = await token_bucket_rate_limit(
+        redis,
+        key=key,
+        capacity=limit,
+        window_sec=window_sec,
+        cost=1,
+    )
 
     if not rl.allowed:
         RATE_LIMIT_BLOCKS.labels(scope=key_prefix).inc()
@@ -246,13 +240,13 @@ async def change_password(
         window_sec=settings.AUTH_PASSWORD_CHANGE_RL_WINDOW_SEC,
         identity=str(user.id),
     )
-    if not verify_password(payload.current_password, user.password_hash):
+    if not await verify_password_async(payload.current_password, user.password_hash):
         raise http_error(403, codes.INVALID_CURRENT_PASSWORD)
     try:
         validate_password_policy(payload.new_password)
     except ValueError:
         raise http_error(422, codes.WEAK_PASSWORD)
-    password_hash = hash_password(payload.new_password)
+    password_hash = await hash_password_async(payload.new_password)
     await UsersRepo(db).set_password(
         user,
         password_hash,
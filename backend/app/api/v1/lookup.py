@@ -1,46 +1,54 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.deps import get_read_db
-from app.models.school import School
+from app.services.school_lookup import get_index
 
 
 router = APIRouter(prefix="/lookup", tags=["lookup"])
 
 
+def _not_modified(request: Request, response: Response, etag: str) -> Response | None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = f"public, max-age={settings.SCHOOL_LOOKUP_MAX_AGE_SEC}"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=dict(response.headers))
+    return None
+
+
 @router.get("/cities", response_model=list[str])
 async def lookup_cities(
+    request: Request,
+    response: Response,
     query: str = Query(default="", max_length=120),
     limit: int = Query(default=20, ge=1, le=100),
     db: AsyncSession = Depends(get_read_db),
-) -> list[str]:
+) -> list[str] | Response:
     if not query:
         return []
-    stmt = (
-        select(School.city)
-        .where(School.city.ilike(f"{query}%"))
-        .distinct()
-        .order_by(School.city)
-        .limit(limit)
-    )
-    result = await db.execute(stmt)
-    return [row[0] for row in result.all()]
+    index = await get_index(db)
+    not_modified = _not_modified(request, response, index.etag("cities", query, limit))
+    if not_modified is not None:
+        return not_modified
+    return index.cities(query, limit)
 
 
 @router.get("/schools", response_model=list[str])
 async def lookup_schools(
+    request: Request,
+    response: Response,
     city: str = Query(..., max_length=120),
     query: str = Query(default="", max_length=255),
     limit: int = Query(default=50, ge=1, le=200),
     db: AsyncSession = Depends(get_read_db),
-) -> list[str]:
+) -> list[str] | Response:
     city_value = city.strip()
     if not city_value:
         return []
-    stmt = select(School.name).where(School.city.ilike(city_value))
-    if query:
-        stmt = stmt.where(School.name.ilike(f"%{query}%"))
-    stmt = stmt.distinct().order_by(School.name).limit(limit)
-    result = await db.execute(stmt)
-    return [row[0] for row in result.all()]
+    index = await get_index(db)
+    not_modified = _not_modified(request, response, index.etag("schools", city_value, query, limit))
+    if not_modified is not None:
+        return not_modified
+    return index.schools(city_value, query, limit)
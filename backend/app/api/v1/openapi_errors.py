@@ -65,6 +65,10 @@ ERROR_EXAMPLES = {
     codes.INVALID_PREFIX: {"error": {"code": codes.INVALID_PREFIX, "message": codes.INVALID_PREFIX}},
     codes.CONTENT_TYPE_NOT_ALLOWED: {"error": {"code": codes.CONTENT_TYPE_NOT_ALLOWED, "message": codes.CONTENT_TYPE_NOT_ALLOWED}},
     codes.STORAGE_UNAVAILABLE: {"error": {"code": codes.STORAGE_UNAVAILABLE, "message": codes.STORAGE_UNAVAILABLE}},
+    codes.DIPLOMA_NOT_FOUND: {"error": {"code": codes.DIPLOMA_NOT_FOUND, "message": codes.DIPLOMA_NOT_FOUND}},
+    codes.RESULTS_NOT_RELEASED: {"error": {"code": codes.RESULTS_NOT_RELEASED, "message": codes.RESULTS_NOT_RELEASED}},
+    codes.DIPLOMA_RENDER_IN_PROGRESS: {"error": {"code": codes.DIPLOMA_RENDER_IN_PROGRESS, "message": codes.DIPLOMA_RENDER_IN_PROGRESS}},
+    codes.DIPLOMA_RENDER_NOT_FOUND: {"error": {"code": codes.DIPLOMA_RENDER_NOT_FOUND, "message": codes.DIPLOMA_RENDER_NOT_FOUND}},
     codes.STUDENT_NOT_FOUND: {"error": {"code": codes.STUDENT_NOT_FOUND, "message": codes.STUDENT_NOT_FOUND}},
     codes.LINK_NOT_FOUND: {"error": {"code": codes.LINK_NOT_FOUND, "message": codes.LINK_NOT_FOUND}},
     codes.CANNOT_ATTACH_SELF: {"error": {"code": codes.CANNOT_ATTACH_SELF, "message": codes.CANNOT_ATTACH_SELF}},
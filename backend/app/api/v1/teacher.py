@@ -1,5 +1,4 @@
 import os
-import re
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, Query
@@ -15,17 +14,17 @@ from app.repos.teacher import TeacherRepo
 from app.repos.teacher_students import TeacherStudentsRepo
 from app.repos.users import UsersRepo
 from app.services.teacher import TeacherService
+from app.services.teacher_certificates import teacher_certificate_rows
 from app.schemas.teacher import TeacherAttemptView, TeacherOlympiadAttemptRow, TeacherCertificateItem
 from app.schemas.user import ModeratorRequestResponse
-from app.core.storage import list_object_keys, presign_get, public_url_for_key
+from app.core.storage import public_url_for_key
+from app.core.storage.presign_cache import presign_get_cached
 from app.api.v1.openapi_errors import response_example, response_examples
 from app.api.v1.openapi_examples import EXAMPLE_TEACHER_ATTEMPT_VIEW, response_model_example
 from app.core import error_codes as codes
 
 router = APIRouter(prefix="/teacher")
 
-CERT_PREFIX = "certificates/teachers"
-CERT_RE = re.compile(r"^certificate_(\d+)_(\d{4})_(\d{4})_(\d{2})\.jpg$", re.IGNORECASE)
 SEQ_TITLE_MAP = {
     2: "Благодарность за подготовку ко II дистанционному туру олимпиады в {season} году",
 }
@@ -192,47 +191,34 @@ async def request_moderator_status(
 async def list_teacher_certificates(
     season: str | None = Query(default=None, pattern=r"^\d{4}_\d{4}$"),
     teacher: User = Depends(require_role(UserRole.teacher)),
+    db: AsyncSession = Depends(get_db),
 ):
     season_value = season or _default_season(datetime.now(timezone.utc))
     season_dash = season_value.replace("_", "-")
-    prefix = f"{CERT_PREFIX}/{season_value}/"
     try:
-        keys = list_object_keys(prefix)
+        certificates = await teacher_certificate_rows(db, teacher.id, season_value)
     except RuntimeError:
         raise http_error(503, codes.STORAGE_UNAVAILABLE)
-    except Exception:
-        raise http_error(503, codes.STORAGE_UNAVAILABLE)
 
     rows: list[TeacherCertificateItem] = []
-    for key in keys:
-        file_name = os.path.basename(key)
-        match = CERT_RE.match(file_name)
-        if not match:
-            continue
-        user_id, year_start, year_end, seq_raw = match.groups()
-        if int(user_id) != teacher.id:
-            continue
-        if f"{year_start}_{year_end}" != season_value:
-            continue
-        seq = int(seq_raw)
-        public_url = public_url_for_key(key)
+    for certificate in certificates:
+        public_url = public_url_for_key(certificate["key"])
         if public_url:
             url = public_url
         else:
             try:
-                url = presign_get(key)
+                url = await presign_get_cached(certificate["key"])
             except RuntimeError:
                 raise http_error(503, codes.STORAGE_UNAVAILABLE)
             except Exception:
                 raise http_error(503, codes.STORAGE_UNAVAILABLE)
         rows.append(
             TeacherCertificateItem(
-                file_name=file_name,
+                file_name=os.path.basename(certificate["key"]),
                 season=season_value,
-                seq=seq,
-                title=_title_for_seq(seq, season_dash),
+                seq=certificate["seq"],
+                title=_title_for_seq(certificate["seq"], season_dash),
                 url=url,
             )
         )
-    rows.sort(key=lambda item: item.seq)
     return rows
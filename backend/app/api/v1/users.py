@@ -2,13 +2,14 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.deps import get_db, get_read_db
-from app.core.deps_auth import get_current_user
+from app.core.auth_context import Principal
+from app.core.deps_auth import get_current_principal, get_current_user
 from app.core.errors import http_error
 from app.models.user import User, UserRole
 from app.repos.users import UsersRepo
-from app.repos.announcements import AnnouncementsRepo
 from app.schemas.user import UserRead, UserUpdate
 from app.schemas.announcements import UserAnnouncementRead
+from app.services.announcements import get_user_announcements
 from app.api.v1.openapi_errors import response_example
 from app.api.v1.openapi_examples import EXAMPLE_USER_READ, response_model_example
 from app.core import error_codes as codes
@@ -77,9 +78,8 @@ async def update_me(
 )
 async def get_my_announcements(
     db: AsyncSession = Depends(get_read_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     if user.role != UserRole.student:
         return []
-    repo = AnnouncementsRepo(db)
-    return await repo.get_user_announcements(user.id)
+    return await get_user_announcements(db, user.id)
@@ -0,0 +1,281 @@
+"""Request-scoped authentication context.
+
+``AuthContextMiddleware`` (the outermost middleware) decodes the bearer token
+once and stores the result in a context variable; audit, the rate limiter and
+``get_current_user`` reuse it instead of decoding again. Verified tokens are
+remembered by their SHA-256 until ``exp``, so a session's repeated requests
+skip the signature check. The user's ``Principal`` (id, role and the
+active / password-change / moderator flags, never credentials) is kept in a
+short-lived in-process cache (L1) backed by Redis, so the Sentry role tag and
+the route guards share one load and other workers reuse it;
+``invalidate_user`` drops it everywhere after a write. Handlers that need the
+full ``User`` load it from the database.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LocalCache, invalidate_keys, register_local_cache
+from app.core.config import settings
+from app.core.metrics import REDIS_CACHE_HITS_TOTAL, REDIS_CACHE_MISSES_TOTAL
+from app.core.redis import mark_redis_down, redis_marked_down, safe_redis
+from app.core.security import decode_token
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """What the auth checks need about a user; the only part of the row that is cached."""
+
+    id: int
+    role: UserRole
+    is_active: bool
+    must_change_password: bool
+    is_moderator: bool
+
+
+@dataclass(slots=True)
+class AuthContext:
+    token: str | None
+    payload: dict | None = None
+    error: Exception | None = None
+    principal: Principal | None = None
+
+    @property
+    def user_id(self) -> int | None:
+        if self.payload is None or self.payload.get("type") != "access":
+            return None
+        try:
+            return int(self.payload.get("sub"))
+        except (TypeError, ValueError):
+            return None
+
+
+_auth_context_var: ContextVar[AuthContext | None] = ContextVar("auth_context", default=None)
+
+principals = register_local_cache(
+    LocalCache(
+        maxsize=settings.AUTH_USER_CACHE_MAX_ITEMS,
+        ttl_sec=settings.AUTH_USER_CACHE_TTL_SEC,
+    )
+)
+
+
+def bearer_token(authorization: str | None) -> str | None:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    return authorization.split(" ", 1)[1].strip() or None
+
+
+class VerifiedTokenCache:
+    """LRU of already verified token payloads, each entry lives until its ``exp``."""
+
+    def __init__(self, *, maxsize: int, max_ttl_sec: float):
+        self.maxsize = maxsize
+        self.max_ttl_sec = max_ttl_sec
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item[1]
+
+    def set(self, token: str, payload: dict) -> None:
+        exp = payload.get("exp")
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return
+        expires_at = min(float(exp), time.time() + self.max_ttl_sec)
+        key = self._key(token)
+        self._data[key] = (expires_at, payload)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+verified_tokens = VerifiedTokenCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_MAX_ITEMS,
+    max_ttl_sec=settings.AUTH_TOKEN_CACHE_MAX_TTL_SEC,
+)
+
+
+def _decode(token: str) -> AuthContext:
+    ctx = AuthContext(token=token)
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        ctx.payload = payload
+        return ctx
+    try:
+        ctx.payload = decode_token(token)
+    except Exception as exc:
+        ctx.error = exc
+        return ctx
+    verified_tokens.set(token, ctx.payload)
+    return ctx
+
+
+def set_auth_context(token: str | None):
+    return _auth_context_var.set(_decode(token) if token else AuthContext(token=None))
+
+
+def reset_auth_context(token) -> None:
+    _auth_context_var.reset(token)
+
+
+def current_auth_context() -> AuthContext:
+    return _auth_context_var.get() or AuthContext(token=None)
+
+
+def auth_context_for(token: str) -> AuthContext:
+    """Decoded token for this request; decodes only if the middleware did not."""
+    ctx = _auth_context_var.get()
+    if ctx is not None and ctx.token == token:
+        return ctx
+    return _decode(token)
+
+
+def user_cache_key(user_id: int) -> str:
+    return f"cache:user:{user_id}:v2"
+
+
+def principal_of(user: User) -> Principal:
+    return Principal(
+        id=user.id,
+        role=user.role,
+        is_active=user.is_active,
+        must_change_password=user.must_change_password,
+        is_moderator=user.is_moderator,
+    )
+
+
+def _dump_principal(principal: Principal) -> str:
+    return json.dumps(
+        {
+            "id": principal.id,
+            "role": principal.role.value,
+            "is_active": principal.is_active,
+            "must_change_password": principal.must_change_password,
+            "is_moderator": principal.is_moderator,
+        }
+    )
+
+
+def _load_principal(raw: str) -> Principal:
+    data = json.loads(raw)
+    return Principal(
+        id=int(data["id"]),
+        role=UserRole(data["role"]),
+        is_active=bool(data["is_active"]),
+        must_change_password=bool(data["must_change_password"]),
+        is_moderator=bool(data["is_moderator"]),
+    )
+
+
+def cached_principal(user_id: int) -> Principal | None:
+    """Principal from the request context or the in-process L1."""
+    ctx = _auth_context_var.get()
+    if ctx is not None and ctx.principal is not None and ctx.principal.id == user_id:
+        return ctx.principal
+    principal = principals.get(user_cache_key(user_id), cache="auth_user")
+    if principal is not None and ctx is not None and ctx.user_id == user_id:
+        ctx.principal = principal
+    return principal
+
+
+def _remember_local(principal: Principal) -> None:
+    principals.set(user_cache_key(principal.id), principal)
+    ctx = _auth_context_var.get()
+    if ctx is not None and ctx.user_id == principal.id:
+        ctx.principal = principal
+
+
+async def _shared_redis():
+    if settings.AUTH_USER_CACHE_TTL_SEC <= 0 or redis_marked_down():
+        return None
+    return await safe_redis()
+
+
+async def _shared_principal(user_id: int) -> Principal | None:
+    principal = cached_principal(user_id)
+    if principal is not None:
+        return principal
+    redis = await _shared_redis()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(user_cache_key(user_id))
+    except (RedisError, OSError):
+        mark_redis_down()
+        return None
+    if raw is None:
+        REDIS_CACHE_MISSES_TOTAL.labels(cache="auth_user").inc()
+        return None
+    REDIS_CACHE_HITS_TOTAL.labels(cache="auth_user").inc()
+    principal = _load_principal(raw)
+    _remember_local(principal)
+    return principal
+
+
+async def _remember_user(user: User) -> Principal:
+    principal = principal_of(user)
+    _remember_local(principal)
+    redis = await _shared_redis()
+    if redis is not None:
+        try:
+            await redis.set(user_cache_key(user.id), _dump_principal(principal), ex=settings.AUTH_USER_CACHE_TTL_SEC)
+        except (RedisError, OSError):
+            mark_redis_down()
+    return principal
+
+
+async def invalidate_user(user_id: int) -> None:
+    """Drop the cached principal here, in Redis and in the L1 of every worker."""
+    ctx = _auth_context_var.get()
+    if ctx is not None and ctx.principal is not None and ctx.principal.id == user_id:
+        ctx.principal = None
+    redis = None if redis_marked_down() else await safe_redis()
+    try:
+        await invalidate_keys(redis, [user_cache_key(user_id)])
+    except (RedisError, OSError):
+        mark_redis_down()
+        logger.warning("user_cache_invalidation_failed", exc_info=True)
+
+
+async def load_principal(db: AsyncSession, user_id: int) -> Principal | None:
+    """Fields the auth checks need; served from the L1/Redis cache when possible."""
+    principal = await _shared_principal(user_id)
+    if principal is not None:
+        return principal
+    user = await db.get(User, user_id)
+    return await _remember_user(user) if user is not None else None
+
+
+async def load_user(db: AsyncSession, user_id: int) -> User | None:
+    """Full user row from the database (never from the cache); refreshes the cached principal."""
+    user = await db.get(User, user_id)
+    if user is not None:
+        await _remember_user(user)
+    return user
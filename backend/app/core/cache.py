@@ -1,6 +1,144 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+from redis.asyncio import Redis
+
+from app.core.config import settings
+from app.core.metrics import LOCAL_CACHE_HITS_TOTAL, LOCAL_CACHE_MISSES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+
 def olympiad_tasks_key(olympiad_id: int) -> str:
     return f"cache:olympiad:{olympiad_id}:tasks:v1"
 
 
 def olympiad_meta_key(olympiad_id: int) -> str:
     return f"cache:olympiad:{olympiad_id}:meta:v1"
+
+
+class LocalCache:
+    """In-process TTL/LRU cache (L1 in front of Redis).
+
+    Keys are the versioned Redis keys, values are already-inflated objects,
+    so a hit costs neither a Redis round trip nor ``json.loads``.
+    """
+
+    def __init__(self, *, maxsize: int, ttl_sec: float):
+        self.maxsize = maxsize
+        self.ttl_sec = ttl_sec
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str, *, cache: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            LOCAL_CACHE_MISSES_TOTAL.labels(cache=cache).inc()
+            return None
+        self._data.move_to_end(key)
+        LOCAL_CACHE_HITS_TOTAL.labels(cache=cache).inc()
+        return item[1]
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0 or self.ttl_sec <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl_sec, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+local_cache = LocalCache(
+    maxsize=settings.LOCAL_CACHE_MAX_ITEMS,
+    ttl_sec=settings.LOCAL_CACHE_TTL_SEC,
+)
+
+# все L1-кэши процесса, которые слушают канал инвалидации
+_local_caches: list[LocalCache] = [local_cache]
+_local_disabled = False
+
+
+def register_local_cache(cache: LocalCache) -> LocalCache:
+    if _local_disabled:
+        cache.maxsize = 0
+    _local_caches.append(cache)
+    return cache
+
+
+def disable_local_caches() -> None:
+    """Turn every L1 cache of this process into a pass-through.
+
+    For processes that do not run ``run_invalidation_listener`` (Celery
+    workers): without it an admin edit would reach them only after
+    ``LOCAL_CACHE_TTL_SEC``, so they read Redis/DB directly instead.
+    """
+    global _local_disabled
+    _local_disabled = True
+    for cache in _local_caches:
+        cache.maxsize = 0
+        cache.clear()
+
+
+def _invalidate_local(*keys: str) -> None:
+    for cache in _local_caches:
+        cache.invalidate(*keys)
+
+
+def _clear_local() -> None:
+    for cache in _local_caches:
+        cache.clear()
+
+
+async def invalidate_keys(redis: Redis | None, keys: list[str]) -> None:
+    """Drop keys from Redis and from the L1 cache of every worker."""
+    _invalidate_local(*keys)
+    if redis is None or not keys:
+        return
+    await redis.delete(*keys)
+    await redis.publish(CACHE_INVALIDATION_CHANNEL, json.dumps(keys))
+
+
+async def run_invalidation_listener() -> None:
+    # отдельное соединение без socket_timeout: pubsub ждёт сообщений бесконечно
+    while True:
+        client = Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SEC,
+        )
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+                # пока подписки не было, сообщения могли потеряться
+                _clear_local()
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        _invalidate_local(*json.loads(message["data"]))
+                    except Exception:
+                        _clear_local()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("cache_invalidation_listener_disconnected", exc_info=True)
+            await asyncio.sleep(1)
+        finally:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
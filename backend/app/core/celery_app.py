@@ -1,5 +1,7 @@
 from celery import Celery
+from celery.signals import worker_init
 from datetime import timedelta
+from app.core.cache import disable_local_caches
 from app.core.config import settings
 
 
@@ -11,12 +13,25 @@ celery_app = Celery(
 
 celery_app.autodiscover_tasks(["app"])
 
+
+@worker_init.connect
+def _disable_local_caches(**_kwargs) -> None:
+    # канал инвалидации слушает только API (lifespan FastAPI); без L1 воркер не оценит
+    # попытки ключом ответов, устаревшим после правки задач админом
+    disable_local_caches()
+
+
 beat_schedule: dict[str, dict] = {}
 if settings.CACHE_WARMUP_INTERVAL_SEC > 0:
     beat_schedule["warmup-olympiad-cache"] = {
         "task": "maintenance.warmup_olympiad_cache",
         "schedule": timedelta(seconds=settings.CACHE_WARMUP_INTERVAL_SEC),
     }
+if settings.OVERDUE_GRADE_INTERVAL_SEC > 0:
+    beat_schedule["grade-overdue-attempts"] = {
+        "task": "maintenance.grade_overdue_attempts",
+        "schedule": timedelta(seconds=settings.OVERDUE_GRADE_INTERVAL_SEC),
+    }
 if settings.TOKEN_CLEANUP_INTERVAL_SEC > 0:
     beat_schedule["cleanup-expired-auth"] = {
         "task": "maintenance.cleanup_expired_auth",
@@ -27,6 +42,16 @@ if settings.AUDIT_LOG_CLEANUP_INTERVAL_SEC > 0:
         "task": "maintenance.cleanup_audit_logs",
         "schedule": timedelta(seconds=settings.AUDIT_LOG_CLEANUP_INTERVAL_SEC),
     }
+if settings.CERT_INDEX_RECONCILE_INTERVAL_SEC > 0:
+    beat_schedule["reconcile-teacher-certificates"] = {
+        "task": "maintenance.reconcile_teacher_certificates",
+        "schedule": timedelta(seconds=settings.CERT_INDEX_RECONCILE_INTERVAL_SEC),
+    }
+if settings.DIPLOMA_INDEX_REBUILD_INTERVAL_SEC > 0:
+    beat_schedule["rebuild-diploma-index"] = {
+        "task": "maintenance.rebuild_diploma_index",
+        "schedule": timedelta(seconds=settings.DIPLOMA_INDEX_REBUILD_INTERVAL_SEC),
+    }
 
 celery_app.conf.update(
     task_serializer="json",
@@ -8,8 +8,15 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_SOCKET_TIMEOUT_SEC: int = 2
     REDIS_CONNECT_TIMEOUT_SEC: int = 2
+    REDIS_RETRY_AFTER_SEC: int = 5
     OLYMPIAD_TASKS_CACHE_TTL_SEC: int = 300
+    LOCAL_CACHE_TTL_SEC: int = 30
+    LOCAL_CACHE_MAX_ITEMS: int = 256
+    SCHOOL_INDEX_CHECK_SEC: int = 30
+    SCHOOL_LOOKUP_MAX_AGE_SEC: int = 300
     CACHE_WARMUP_INTERVAL_SEC: int = 300
+    OVERDUE_GRADE_INTERVAL_SEC: int = 60
+    OVERDUE_GRADE_BATCH_SIZE: int = 500
 
     APP_NAME: str = "NI_SITE API"
     ENV: str = "dev"
@@ -28,12 +35,18 @@ class Settings(BaseSettings):
     DB_CONNECT_TIMEOUT_SEC: int = 5
     DB_STATEMENT_TIMEOUT_MS: int = 15000
     DB_APPLICATION_NAME: str | None = None
+    RESULTS_EXPORT_BATCH_SIZE: int = 1000
+    ADMIN_USERS_EXACT_COUNT_LIMIT: int = 10000
 
     JWT_SECRET: str = "change_me"
     JWT_SECRETS: str = ""
     JWT_ALG: str = "HS256"
     JWT_ACCESS_TTL_MIN: int = 60
     JWT_REFRESH_TTL_DAYS: int = 30
+    AUTH_USER_CACHE_TTL_SEC: int = 5
+    AUTH_USER_CACHE_MAX_ITEMS: int = 10000
+    AUTH_TOKEN_CACHE_MAX_ITEMS: int = 10000
+    AUTH_TOKEN_CACHE_MAX_TTL_SEC: int = 300
 
     EMAIL_BASE_URL: str = "http://localhost:3000"
     EMAIL_FROM: str = "no-reply@example.com"
@@ -44,6 +57,8 @@ class Settings(BaseSettings):
     EMAIL_SEND_ENABLED: bool = False
     EMAIL_PROVIDER: str = "smtp"
     PASSWORD_MIN_LEN: int = 8
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
     PASSWORD_REQUIRE_UPPER: bool = True
     PASSWORD_REQUIRE_LOWER: bool = True
     PASSWORD_REQUIRE_DIGIT: bool = True
@@ -72,6 +87,10 @@ class Settings(BaseSettings):
     # rate limit for saving answers
     ANSWERS_RL_LIMIT: int = 100
     ANSWERS_RL_WINDOW_SEC: int = 10
+    ANSWERS_WRITE_BEHIND_ENABLED: bool = False
+    ANSWERS_WRITE_BEHIND_FLUSH_MS: int = 500
+    ANSWERS_WRITE_BEHIND_BATCH_SIZE: int = 200
+    ANSWERS_WRITE_BEHIND_TTL_GRACE_SEC: int = 86400
     SUBMIT_LOCK_TTL_SEC: int = 15
     ATTEMPT_MIN_SUBMIT_AGE_SEC: int = 15
 
@@ -86,6 +105,7 @@ class Settings(BaseSettings):
     AUTH_PASSWORD_CHANGE_RL_LIMIT: int = 5
     AUTH_PASSWORD_CHANGE_RL_WINDOW_SEC: int = 60
 
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 50000
     GLOBAL_RL_LIMIT: int = 0
     GLOBAL_RL_WINDOW_SEC: int = 0
     CRITICAL_RL_USER_LIMIT: int = 0
@@ -100,9 +120,17 @@ class Settings(BaseSettings):
 
     AUDIT_LOG_ENABLED: bool = True
     AUDIT_LOG_RETENTION_DAYS: int = 90
+    AUDIT_LOG_FLUSH_MS: int = 250
+    AUDIT_LOG_BATCH_SIZE: int = 500
+    AUDIT_LOG_QUEUE_MAX: int = 20000
+    AUDIT_LOG_DEFAULT_SAMPLE_RATE: float = 1.0
+    # "METHOD /route/template=rate,..."; admin actions and errors are always logged
+    AUDIT_LOG_SAMPLE_RULES: str = "POST /api/v1/attempts/{attempt_id}/answers=0.01"
     SENTRY_DSN: str | None = None
     PROMETHEUS_ENABLED: bool = False
     AUDIT_LOG_CLEANUP_INTERVAL_SEC: int = 86400
+    STATS_ROLLUP_FLUSH_SEC: int = 5
+    STATS_ACTIVE_RESYNC_SEC: int = 300
 
     STORAGE_ENDPOINT: str | None = None
     STORAGE_BUCKET: str = "ni-site"
@@ -114,6 +142,19 @@ class Settings(BaseSettings):
     STORAGE_PRESIGN_EXPIRES_SEC: int = 900
     STORAGE_MAX_UPLOAD_MB: int = 10
     STORAGE_ALLOWED_CONTENT_TYPES: str = "image/jpeg,image/png,image/webp"
+    STORAGE_IO_WORKERS: int = 8
+    STORAGE_CONNECT_TIMEOUT_SEC: int = 5
+    STORAGE_READ_TIMEOUT_SEC: int = 30
+    STORAGE_PROBE_TIMEOUT_SEC: int = 2
+    STORAGE_ENDPOINT_RETRY_SEC: int = 30
+    STORAGE_PRESIGN_REUSE_RATIO: float = 0.8
+    STORAGE_PRESIGN_CACHE_MAX_ITEMS: int = 20000
+    DIPLOMA_INDEX_TTL_SEC: int = 300
+    DIPLOMA_INDEX_REBUILD_INTERVAL_SEC: int = 120
+    CERT_INDEX_RECONCILE_INTERVAL_SEC: int = 3600
+    DIPLOMA_RENDER_WORKERS: int = 0
+    DIPLOMA_RENDER_QUEUE: str = "celery"
+    DIPLOMA_RENDER_STATE_TTL_SEC: int = 7 * 24 * 3600
 
     READ_DATABASE_URL: str | None = None
     READ_DB_POOL_SIZE: int = 2
@@ -1,7 +1,7 @@
 """Dependencies for dependency injection."""
 from typing import AsyncGenerator
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.core.config import settings
 from app.core.metrics import READ_DB_FALLBACK_TOTAL
@@ -23,3 +23,8 @@ async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
             READ_DB_FALLBACK_TOTAL.inc()
     async with SessionLocal() as session:
         yield session
+
+
+def get_read_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """Session factory for streaming responses, which outlive request-scoped sessions."""
+    return ReadSessionLocal if settings.READ_DATABASE_URL else SessionLocal
@@ -4,27 +4,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.deps import get_db
 from app.core.errors import http_error
-from app.core.security import decode_token
-from app.repos.users import UsersRepo
+from app.core.auth_context import Principal, auth_context_for, load_principal, load_user
 from app.models.user import User, UserRole
 from app.core import error_codes as codes
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
-async def _get_current_user_base(
+async def _get_current_principal_base(
     creds: HTTPAuthorizationCredentials | None,
     db: AsyncSession,
     *,
     allow_password_change: bool,
-) -> User:
+) -> Principal:
     if creds is None or not creds.credentials:
         raise http_error(status.HTTP_401_UNAUTHORIZED, codes.MISSING_TOKEN)
 
-    token = creds.credentials
-    try:
-        payload = decode_token(token)
-    except Exception:
+    ctx = auth_context_for(creds.credentials)
+    payload = ctx.payload
+    if payload is None:
         raise http_error(status.HTTP_401_UNAUTHORIZED, codes.INVALID_TOKEN)
 
     if payload.get("type") != "access":
@@ -34,8 +32,25 @@ async def _get_current_user_base(
     if not sub:
         raise http_error(status.HTTP_401_UNAUTHORIZED, codes.INVALID_TOKEN)
 
-    users_repo = UsersRepo(db)
-    user = await users_repo.get_by_id(int(sub))
+    principal = await load_principal(db, int(sub))
+    if not principal or not principal.is_active:
+        raise http_error(status.HTTP_401_UNAUTHORIZED, codes.USER_NOT_FOUND)
+
+    if principal.must_change_password and not allow_password_change:
+        raise http_error(status.HTTP_403_FORBIDDEN, codes.PASSWORD_CHANGE_REQUIRED)
+
+    return principal
+
+
+async def _get_current_user_base(
+    creds: HTTPAuthorizationCredentials | None,
+    db: AsyncSession,
+    *,
+    allow_password_change: bool,
+) -> User:
+    principal = await _get_current_principal_base(creds, db, allow_password_change=allow_password_change)
+    # полная строка — всегда из БД; кэшированный principal мог отстать на AUTH_USER_CACHE_TTL_SEC
+    user = await load_user(db, principal.id)
     if not user or not user.is_active:
         raise http_error(status.HTTP_401_UNAUTHORIZED, codes.USER_NOT_FOUND)
 
@@ -45,6 +60,14 @@ async def _get_current_user_base(
     return user
 
 
+async def get_current_principal(
+    creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
+    """Id and role of the caller without loading the ``User`` row (cached)."""
+    return await _get_current_principal_base(creds, db, allow_password_change=False)
+
+
 async def get_current_user(
     creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
     db: AsyncSession = Depends(get_db),
@@ -76,6 +99,14 @@ def require_role(*roles: UserRole):
     return _guard
 
 
+def require_principal_role(*roles: UserRole):
+    async def _guard(principal: Principal = Depends(get_current_principal)) -> Principal:
+        if principal.role not in roles:
+            raise http_error(status.HTTP_403_FORBIDDEN, codes.FORBIDDEN)
+        return principal
+    return _guard
+
+
 def require_admin_or_moderator():
     async def _guard(user: User = Depends(get_current_user)) -> User:
         if user.role == UserRole.admin:
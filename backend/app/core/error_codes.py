@@ -11,6 +11,7 @@ WEAK_PASSWORD = "weak_password"
 TEMP_PASSWORD_EXPIRED = "temp_password_expired"
 VALIDATION_ERROR = "validation_error"
 RATE_LIMITED = "rate_limited"
+AUTH_BUSY = "auth_busy"
 FORBIDDEN = "forbidden"
 ADMIN_OTP_REQUIRED = "admin_otp_required"
 ADMIN_OTP_INVALID = "admin_otp_invalid"
@@ -51,6 +52,10 @@ ARTICLE_BODY_TOO_SHORT = "article_body_too_short"
 INVALID_PREFIX = "invalid_prefix"
 CONTENT_TYPE_NOT_ALLOWED = "content_type_not_allowed"
 STORAGE_UNAVAILABLE = "storage_unavailable"
+DIPLOMA_NOT_FOUND = "diploma_not_found"
+RESULTS_NOT_RELEASED = "results_not_released"
+DIPLOMA_RENDER_IN_PROGRESS = "diploma_render_in_progress"
+DIPLOMA_RENDER_NOT_FOUND = "diploma_render_not_found"
 STUDENT_NOT_FOUND = "student_not_found"
 LINK_NOT_FOUND = "link_not_found"
 CANNOT_ATTACH_SELF = "cannot_attach_self"
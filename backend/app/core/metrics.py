@@ -6,6 +6,12 @@ RATE_LIMIT_BLOCKS = Counter(
     ["scope"],
 )
 
+RATE_LIMIT_DECISIONS_TOTAL = Counter(
+    "rate_limit_decisions_total",
+    "Rate limit decisions by backend (redis or local fallback)",
+    ["backend"],
+)
+
 REDIS_CACHE_HITS_TOTAL = Counter(
     "redis_cache_hits_total",
     "Redis cache hits",
@@ -18,6 +24,18 @@ REDIS_CACHE_MISSES_TOTAL = Counter(
     ["cache"],
 )
 
+LOCAL_CACHE_HITS_TOTAL = Counter(
+    "local_cache_hits_total",
+    "In-process (L1) cache hits",
+    ["cache"],
+)
+
+LOCAL_CACHE_MISSES_TOTAL = Counter(
+    "local_cache_misses_total",
+    "In-process (L1) cache misses",
+    ["cache"],
+)
+
 REDIS_OP_LATENCY_SECONDS = Histogram(
     "redis_op_latency_seconds",
     "Redis operation latency",
@@ -78,6 +96,47 @@ REDIS_HEALTH_LATENCY_SECONDS = Gauge(
     "Latency for Redis health check",
 )
 
+AUDIT_LOG_WRITTEN_TOTAL = Counter(
+    "audit_log_written_total",
+    "Audit log rows written by the batched writer",
+)
+
+AUDIT_LOG_DROPPED_TOTAL = Counter(
+    "audit_log_dropped_total",
+    "Audit log rows not written",
+    ["reason"],
+)
+
+PASSWORD_HASH_QUEUE_WAIT_SECONDS = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a password hash/verify waited for a pool thread",
+    ["op"],
+)
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Password hash/verify duration",
+    ["op"],
+)
+
+PASSWORD_HASH_REJECTED_TOTAL = Counter(
+    "password_hash_rejected_total",
+    "Password hash/verify calls rejected because the pool queue was full",
+    ["op"],
+)
+
+STORAGE_OP_LATENCY_SECONDS = Histogram(
+    "storage_op_latency_seconds",
+    "Object storage call duration (presign, listing, head_bucket, endpoint probing)",
+    ["op"],
+)
+
+STORAGE_OP_ERRORS_TOTAL = Counter(
+    "storage_op_errors_total",
+    "Object storage calls that raised",
+    ["op"],
+)
+
 REQUEST_LATENCY_SECONDS = Histogram(
     "request_latency_seconds",
     "HTTP request latency",
@@ -1,7 +1,20 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
+
 from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_DECISIONS_TOTAL
+from app.core.redis import mark_redis_down, redis_marked_down
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -12,70 +25,201 @@ class RateLimitResult:
 
 
 TOKEN_BUCKET_LUA = r"""
--- KEYS[1] = tokens_key
--- KEYS[2] = ts_key
--- ARGV[1] = capacity
--- ARGV[2] = refill_rate_per_ms
--- ARGV[3] = now_ms
--- ARGV[4] = cost
--- ARGV[5] = ttl_ms
-
-local tokens_key = KEYS[1]
-local ts_key = KEYS[2]
-
-local capacity = tonumber(ARGV[1])
-local refill_rate = tonumber(ARGV[2])
-local now_ms = tonumber(ARGV[3])
-local cost = tonumber(ARGV[4])
-local ttl_ms = tonumber(ARGV[5])
-
-local tokens = redis.call("GET", tokens_key)
-local last_ts = redis.call("GET", ts_key)
-
-if tokens == false then
-  tokens = capacity
-else
-  tokens = tonumber(tokens)
+-- KEYS[i]          = bucket hash (fields: t = tokens, ts = last refill, ms)
+-- ARGV[4*(i-1)+1]  = capacity
+-- ARGV[4*(i-1)+2]  = refill_rate_per_ms
+-- ARGV[4*(i-1)+3]  = cost
+-- ARGV[4*(i-1)+4]  = ttl_ms
+--
+-- Все корзины проверяются атомарно: токены списываются, только если
+-- разрешили все. Возвращает {denied_index (0 = allowed), remaining_1,
+-- retry_after_ms_1, remaining_2, retry_after_ms_2, ...}.
+
+if redis.replicate_commands then
+  redis.replicate_commands()
 end
 
-if last_ts == false then
-  last_ts = now_ms
-else
-  last_ts = tonumber(last_ts)
+local now = redis.call("TIME")
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+
+local tokens = {}
+local denied = 0
+local result = {0}
+
+for i = 1, #KEYS do
+  local base = 4 * (i - 1)
+  local capacity = tonumber(ARGV[base + 1])
+  local refill_rate = tonumber(ARGV[base + 2])
+  local cost = tonumber(ARGV[base + 3])
+  local ttl_ms = tonumber(ARGV[base + 4])
+
+  local state = redis.call("HMGET", KEYS[i], "t", "ts")
+  local current = tonumber(state[1]) or capacity
+  local last_ts = tonumber(state[2]) or now_ms
+
+  local delta = now_ms - last_ts
+  if delta < 0 then delta = 0 end
+  current = math.min(capacity, current + delta * refill_rate)
+
+  local retry_after_ms = 0
+  if current < cost then
+    if denied == 0 then denied = i end
+    if refill_rate > 0 then
+      retry_after_ms = math.ceil((cost - current) / refill_rate)
+    else
+      retry_after_ms = ttl_ms
+    end
+  end
+  tokens[i] = current
+  result[2 * i] = current
+  result[2 * i + 1] = retry_after_ms
 end
 
-local delta = now_ms - last_ts
-if delta < 0 then delta = 0 end
-
-local refill = delta * refill_rate
-tokens = math.min(capacity, tokens + refill)
-
-local allowed = 0
-local retry_after_ms = 0
-
-if tokens >= cost then
-  allowed = 1
-  tokens = tokens - cost
-else
-  allowed = 0
-  local missing = cost - tokens
-  if refill_rate > 0 then
-    retry_after_ms = math.ceil(missing / refill_rate)
-  else
-    retry_after_ms = ttl_ms
+for i = 1, #KEYS do
+  local base = 4 * (i - 1)
+  local current = tokens[i]
+  if denied == 0 then
+    current = current - tonumber(ARGV[base + 3])
   end
+  redis.call("HSET", KEYS[i], "t", current, "ts", now_ms)
+  redis.call("PEXPIRE", KEYS[i], ARGV[base + 4])
+  result[2 * i] = math.floor(current)
 end
 
-redis.call("SET", tokens_key, tokens, "PX", ttl_ms)
-redis.call("SET", ts_key, now_ms, "PX", ttl_ms)
-
-local remaining = math.floor(tokens)
-return {allowed, remaining, retry_after_ms}
+result[1] = denied
+return result
 """
 
+TOKEN_BUCKET_SHA = hashlib.sha1(TOKEN_BUCKET_LUA.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class Bucket:
+    key: str
+    capacity: int
+    window_sec: int
+    cost: int = 1
+
+
+class LocalTokenBuckets:
+    """In-process token buckets used while Redis is unavailable.
+
+    Same algorithm as the Lua script, but per worker process, so limits are
+    approximate (multiplied by the number of workers). Memory is bounded by
+    ``maxsize`` keys with LRU eviction.
+    """
+
+    def __init__(self, *, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, buckets: list[Bucket]) -> list[RateLimitResult]:
+        now_ms = time.monotonic() * 1000
+        states: list[tuple[float, float, int]] = []
+        denied_index = 0
+        for i, bucket in enumerate(buckets, start=1):
+            capacity = float(bucket.capacity)
+            refill_rate = capacity / float(bucket.window_sec * 1000)
+            tokens, last_ms = self._buckets.get(bucket.key, (capacity, now_ms))
+            tokens = min(capacity, tokens + max(now_ms - last_ms, 0.0) * refill_rate)
+            retry_after_ms = 0
+            if tokens < bucket.cost:
+                denied_index = denied_index or i
+                retry_after_ms = math.ceil((bucket.cost - tokens) / refill_rate)
+            states.append((tokens, refill_rate, retry_after_ms))
+
+        results: list[RateLimitResult] = []
+        for i, (bucket, (tokens, _rate, retry_after_ms)) in enumerate(zip(buckets, states), start=1):
+            if denied_index == 0:
+                tokens -= bucket.cost
+            self._buckets[bucket.key] = (tokens, now_ms)
+            self._buckets.move_to_end(bucket.key)
+            denied = i == denied_index
+            results.append(
+                RateLimitResult(
+                    allowed=not denied,
+                    remaining=int(tokens),
+                    retry_after_sec=int((retry_after_ms + 999) // 1000) if denied else 0,
+                )
+            )
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return results
+
+
+local_buckets = LocalTokenBuckets(maxsize=settings.RATE_LIMIT_LOCAL_MAX_KEYS)
+
+
+async def _eval_token_bucket(redis: Redis, keys: list[str], args: list[str]):
+    # скрипт кешируется в Redis по SHA; после рестарта/FLUSH — NOSCRIPT и повторная загрузка
+    try:
+        return await redis.evalsha(TOKEN_BUCKET_SHA, len(keys), *keys, *args)
+    except NoScriptError:
+        await redis.script_load(TOKEN_BUCKET_LUA)
+        return await redis.evalsha(TOKEN_BUCKET_SHA, len(keys), *keys, *args)
+
+
+async def token_bucket_rate_limit_many(redis: Redis | None, buckets: list[Bucket]) -> list[RateLimitResult]:
+    """Check several buckets in one round trip.
+
+    Tokens are taken only if every bucket allows the request; a blocked
+    request therefore does not drain the other buckets. Only the first
+    bucket that ran out is reported as not allowed. Without Redis (``None``
+    or any error from the client) the decision is made by ``local_buckets``.
+    """
+    active = [b for b in buckets if b.capacity > 0 and b.window_sec > 0]
+    if not active:
+        return [RateLimitResult(allowed=True, remaining=b.capacity, retry_after_sec=0) for b in buckets]
+
+    res = None
+    if redis is not None and not redis_marked_down():
+        args: list[str] = []
+        for bucket in active:
+            args.extend(
+                (
+                    str(float(bucket.capacity)),
+                    str(float(bucket.capacity) / float(bucket.window_sec * 1000)),
+                    str(float(bucket.cost)),
+                    str(int(max(bucket.window_sec * 2 * 1000, 10_000))),
+                )
+            )
+        try:
+            res = await _eval_token_bucket(redis, [b.key for b in active], args)
+        except Exception:
+            # не только RedisError: клиент, привязанный к другому/закрытому loop, даёт RuntimeError
+            mark_redis_down()
+            logger.warning("rate_limit_redis_unavailable", exc_info=True)
+
+    if res is None:
+        RATE_LIMIT_DECISIONS_TOTAL.labels(backend="local").inc()
+        results = local_buckets.take(active)
+    else:
+        RATE_LIMIT_DECISIONS_TOTAL.labels(backend="redis").inc()
+        denied_index = int(res[0])
+        results = []
+        for i in range(1, len(active) + 1):
+            retry_after_ms = int(res[2 * i])
+            denied = i == denied_index
+            results.append(
+                RateLimitResult(
+                    allowed=not denied,
+                    remaining=int(res[2 * i - 1]),
+                    retry_after_sec=int((retry_after_ms + 999) // 1000) if denied else 0,
+                )
+            )
+
+    by_key = dict(zip((b.key for b in active), results))
+    return [
+        by_key.get(b.key) or RateLimitResult(allowed=True, remaining=b.capacity, retry_after_sec=0)
+        for b in buckets
+    ]
+
 
 async def token_bucket_rate_limit(
-    redis: Redis,
+    redis: Redis | None,
     *,
     key: str,
     capacity: int,
@@ -84,33 +228,7 @@ async def token_bucket_rate_limit(
 ) -> RateLimitResult:
     if capacity <= 0 or window_sec <= 0:
         return RateLimitResult(allowed=True, remaining=capacity, retry_after_sec=0)
-
-    refill_rate_per_ms = float(capacity) / float(window_sec * 1000)
-    ttl_ms = int(max(window_sec * 2 * 1000, 10_000))
-
-    # время берём у Redis (чтобы не зависеть от локальных часов)
-    sec, usec = await redis.time()
-    now_ms = int(sec) * 1000 + int(usec) // 1000
-
-    tokens_key = f"{key}:tokens"
-    ts_key = f"{key}:ts"
-
-    # ВАЖНО: redis.eval(script, numkeys, *keys_and_args)
-    res = await redis.eval(
-        TOKEN_BUCKET_LUA,
-        2,
-        tokens_key,
-        ts_key,
-        str(float(capacity)),
-        str(refill_rate_per_ms),
-        str(now_ms),
-        str(float(cost)),
-        str(ttl_ms),
+    [result] = await token_bucket_rate_limit_many(
+        redis, [Bucket(key=key, capacity=capacity, window_sec=window_sec, cost=cost)]
     )
-
-    allowed = int(res[0]) == 1
-    remaining = int(res[1])
-    retry_after_ms = int(res[2])
-
-    retry_after_sec = 0 if allowed else int((retry_after_ms + 999) // 1000)
-    return RateLimitResult(allowed=allowed, remaining=remaining, retry_after_sec=retry_after_sec)
+    return result
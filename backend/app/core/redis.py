@@ -1,8 +1,22 @@
+import time
+
 from redis.asyncio import Redis
 from app.core.config import settings
 
 redis_client: Redis | None = None
 
+# после ошибки соединения не ходим в Redis на горячем пути REDIS_RETRY_AFTER_SEC секунд
+_unavailable_until = 0.0
+
+
+def redis_marked_down() -> bool:
+    return time.monotonic() < _unavailable_until
+
+
+def mark_redis_down() -> None:
+    global _unavailable_until
+    _unavailable_until = time.monotonic() + settings.REDIS_RETRY_AFTER_SEC
+
 
 async def get_redis() -> Redis:
     global redis_client
@@ -1,12 +1,20 @@
 """Security utilities."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 import hashlib
 import hmac
 import secrets
+import time
 import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 from app.core import error_codes as codes
+from app.core.metrics import (
+    PASSWORD_HASH_QUEUE_WAIT_SECONDS,
+    PASSWORD_HASH_REJECTED_TOTAL,
+    PASSWORD_HASH_SECONDS,
+)
 
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
@@ -27,6 +35,73 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
+
+class PasswordHashBusy(Exception):
+    """Too many password hashes are already waiting for the pool."""
+
+
+class PasswordHashPool:
+    """Bounded thread pool for argon2 (argon2-cffi releases the GIL).
+
+    At most ``max_pending`` operations may be queued or running; beyond that
+    callers get ``PasswordHashBusy`` immediately instead of piling up.
+    """
+
+    def __init__(self, *, workers: int, max_pending: int):
+        self.workers = max(workers, 1)
+        self.max_pending = max(max_pending, self.workers)
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def run(self, op: str, fn, *args):
+        if self._pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED_TOTAL.labels(op=op).inc()
+            raise PasswordHashBusy(op)
+        enqueued_at = time.perf_counter()
+
+        def _timed():
+            started_at = time.perf_counter()
+            PASSWORD_HASH_QUEUE_WAIT_SECONDS.labels(op=op).observe(started_at - enqueued_at)
+            try:
+                return fn(*args)
+            finally:
+                PASSWORD_HASH_SECONDS.labels(op=op).observe(time.perf_counter() - started_at)
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), _timed)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordHashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run("hash", hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await password_pool.run("verify", verify_password, password, password_hash)
+
+
 def create_access_token(sub: str) -> str:
     now = datetime.now(timezone.utc)
     exp = now + timedelta(minutes=settings.JWT_ACCESS_TTL_MIN)
@@ -0,0 +1,30 @@
+"""Object storage (S3/MinIO): presigned URLs, listings and the shared client."""
+from app.core.storage.client import (  # noqa: F401
+    get_client,
+    new_client,
+    resolve_endpoint,
+    run_io,
+    shutdown,
+    start_endpoint_resolution,
+    storage_configured,
+)
+from app.core.storage.objects import (  # noqa: F401
+    ALLOWED_CONTENT_TYPES,
+    CONTENT_TYPE_EXT,
+    ObjectStat,
+    PresignPostResult,
+    PresignPutResult,
+    list_object_keys,
+    list_object_keys_async,
+    list_object_stats,
+    object_exists,
+    object_exists_async,
+    presign_get,
+    presign_post,
+    presign_put,
+    public_url_for_key,
+    put_object,
+    read_object,
+    storage_health,
+    storage_health_async,
+)
@@ -0,0 +1,233 @@
+"""Parallel, resumable bulk upload of local files to the bucket.
+
+Used by ``scripts/upload_objects.py`` for diplomas and teacher certificates.
+Files are uploaded from a bounded thread pool (``workers`` uploads in flight,
+one connection each); files above ``multipart_threshold`` go as multipart
+uploads with ``part_size`` parts. Instead of a HEAD per object, the caller
+passes one prefix listing (``list_object_stats``): objects whose size and
+ETag match the local file are skipped. The ETag of a local file is its MD5
+(or the multipart ETag for the same part size) and is cached in a JSON lines
+manifest keyed by (key, size, mtime), so a rerun after a crash or on an
+unchanged source directory does not re-read the files.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import threading
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+from boto3.s3.transfer import TransferConfig
+
+from app.core.storage.client import timed
+from app.core.storage.objects import ObjectStat
+
+MB = 1024 * 1024
+DEFAULT_MULTIPART_THRESHOLD = 8 * MB
+DEFAULT_PART_SIZE = 8 * MB
+HASH_BLOCK_SIZE = MB
+REPORT_FIELDS = ["key", "source_path", "status", "size", "etag", "message"]
+
+
+@dataclass(slots=True)
+class UploadItem:
+    key: str
+    source_path: Path
+    content_type: str = "image/jpeg"
+
+
+@dataclass(slots=True)
+class UploadResult:
+    key: str
+    source_path: str
+    # uploaded | would_upload | skipped_unchanged | skipped_exists | error
+    status: str
+    size: int = 0
+    etag: str = ""
+    message: str = ""
+
+
+def s3_etag(path: Path, *, multipart_threshold: int, part_size: int) -> str:
+    """ETag S3/MinIO reports for ``path`` uploaded with these transfer settings."""
+    size = path.stat().st_size
+    if size < multipart_threshold:
+        digest = hashlib.md5(usedforsecurity=False)
+        with path.open("rb") as fh:
+            for block in iter(lambda: fh.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    part_digests: list[bytes] = []
+    with path.open("rb") as fh:
+        for part in iter(lambda: fh.read(part_size), b""):
+            part_digests.append(hashlib.md5(part, usedforsecurity=False).digest())
+    combined = hashlib.md5(b"".join(part_digests), usedforsecurity=False).hexdigest()
+    return f"{combined}-{len(part_digests)}"
+
+
+class UploadManifest:
+    """Append-only JSON lines ``{key, size, mtime_ns, etag}`` of local files already hashed/uploaded."""
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self._entries: dict[str, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+        self._fh = None
+        if path is None:
+            return
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                    self._entries[entry["key"]] = (int(entry["size"]), int(entry["mtime_ns"]), str(entry["etag"]))
+                except (ValueError, KeyError, TypeError):
+                    # недописанная строка после падения — просто пересчитаем этот файл
+                    continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = path.open("a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def etag(self, key: str, size: int, mtime_ns: int) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] != size or entry[1] != mtime_ns:
+            return None
+        return entry[2]
+
+    def record(self, key: str, size: int, mtime_ns: int, etag: str) -> None:
+        with self._lock:
+            if self._entries.get(key) == (size, mtime_ns, etag):
+                return
+            self._entries[key] = (size, mtime_ns, etag)
+            if self._fh is not None:
+                self._fh.write(json.dumps({"key": key, "size": size, "mtime_ns": mtime_ns, "etag": etag}) + "\n")
+                self._fh.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+class BulkUploader:
+    """Upload ``UploadItem``s with ``workers`` threads sharing one client.
+
+    ``existing`` is the listing of the target prefix. An object that is
+    already there with the same size and ETag is skipped; a different one is
+    replaced unless ``keep_existing`` is set.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        bucket: str,
+        workers: int,
+        existing: Mapping[str, ObjectStat] | None = None,
+        manifest: UploadManifest | None = None,
+        keep_existing: bool = False,
+        dry_run: bool = False,
+        multipart_threshold: int = DEFAULT_MULTIPART_THRESHOLD,
+        part_size: int = DEFAULT_PART_SIZE,
+        progress: Callable[[int], None] | None = None,
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.workers = max(workers, 1)
+        self.existing = existing or {}
+        self.manifest = manifest if manifest is not None else UploadManifest(None)
+        self.keep_existing = keep_existing
+        self.dry_run = dry_run
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.progress = progress
+        # параллелизм — по файлам; части одного multipart-файла идут в том же потоке
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=part_size,
+            use_threads=False,
+        )
+
+    def _local_etag(self, item: UploadItem, size: int, mtime_ns: int) -> str:
+        etag = self.manifest.etag(item.key, size, mtime_ns)
+        if etag is None:
+            etag = s3_etag(item.source_path, multipart_threshold=self.multipart_threshold, part_size=self.part_size)
+            self.manifest.record(item.key, size, mtime_ns, etag)
+        return etag
+
+    def _process(self, item: UploadItem) -> UploadResult:
+        result = UploadResult(key=item.key, source_path=str(item.source_path), status="error")
+        try:
+            stat = item.source_path.stat()
+            result.size = stat.st_size
+            remote = self.existing.get(item.key)
+            if remote is not None:
+                if self.keep_existing:
+                    result.status, result.etag = "skipped_exists", remote.etag
+                    return result
+                if remote.size == stat.st_size:
+                    result.etag = self._local_etag(item, stat.st_size, stat.st_mtime_ns)
+                    if result.etag == remote.etag:
+                        result.status = "skipped_unchanged"
+                        return result
+            if self.dry_run:
+                result.status = "would_upload"
+                return result
+            timed(
+                "bulk_upload",
+                self.client.upload_file,
+                Filename=str(item.source_path),
+                Bucket=self.bucket,
+                Key=item.key,
+                ExtraArgs={"ContentType": item.content_type},
+                Config=self.transfer_config,
+            )
+            result.etag = result.etag or self._local_etag(item, stat.st_size, stat.st_mtime_ns)
+            result.status = "uploaded"
+        except Exception as exc:
+            result.status = "error"
+            result.message = str(exc)
+        return result
+
+    def run(self, items: Iterable[UploadItem]) -> list[UploadResult]:
+        """Upload all items; at most ``2 * workers`` of them are queued at a time."""
+        results: list[UploadResult] = []
+        pending: set[Future] = set()
+
+        def _collect(done: set[Future]) -> None:
+            for future in done:
+                results.append(future.result())
+                if self.progress is not None:
+                    self.progress(len(results))
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="storage-bulk") as executor:
+            for item in items:
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _collect(done)
+                pending.add(executor.submit(self._process, item))
+            done, _ = wait(pending)
+            _collect(done)
+        results.sort(key=lambda result: result.key)
+        return results
+
+
+def write_report(rows: Iterable[UploadResult], path: Path) -> None:
+    with path.open("w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(REPORT_FIELDS)
+        for row in rows:
+            writer.writerow([row.key, row.source_path, row.status, row.size, row.etag, row.message])
+
+
+def count_statuses(rows: Iterable[UploadResult]) -> dict[str, int]:
+    counters: dict[str, int] = {}
+    for row in rows:
+        counters[row.status] = counters.get(row.status, 0) + 1
+    return counters
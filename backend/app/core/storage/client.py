@@ -0,0 +1,238 @@
+"""Long-lived S3 client and storage I/O pool.
+
+One boto3 client per process (botocore clients are thread-safe) is built for
+the endpoint that answered ``head_bucket``. Endpoint probing is network I/O,
+so it runs in the storage thread pool: started at API startup, or by the first
+presign in processes without a lifespan (Celery, scripts). Until it finishes,
+presigning uses the configured endpoint — signing is local HMAC and needs no
+round trip. Blocking S3 calls from async code go through ``run_io``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import boto3
+from botocore.client import Config
+
+from app.core.config import settings
+from app.core.metrics import STORAGE_OP_ERRORS_TOTAL, STORAGE_OP_LATENCY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_endpoint: str | None = None
+_resolved_at: float | None = None
+_resolving: Future | None = None
+_client = None
+_client_endpoint: str | None = None
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def storage_configured() -> bool:
+    return bool(settings.STORAGE_ACCESS_KEY and settings.STORAGE_SECRET_KEY)
+
+
+def _endpoint_candidates() -> list[str]:
+    candidates: list[str] = []
+    configured = (settings.STORAGE_ENDPOINT or "").strip()
+    if configured:
+        candidates.append(configured)
+        parsed = urlparse(configured)
+        host = (parsed.hostname or "").lower()
+        scheme = (parsed.scheme or ("https" if settings.STORAGE_USE_SSL else "http")).lower()
+        alt_scheme = "http" if scheme == "https" else "https"
+        port = parsed.port or (443 if scheme == "https" else 80)
+        if host not in {"minio", "localhost", "127.0.0.1"}:
+            candidates.extend(
+                [
+                    f"{scheme}://minio:9000",
+                    "http://minio:9000",
+                    "https://minio:9000",
+                    f"{scheme}://127.0.0.1:{port}",
+                    f"{alt_scheme}://127.0.0.1:{port}",
+                    f"{scheme}://localhost:{port}",
+                    f"{alt_scheme}://localhost:{port}",
+                ]
+            )
+        else:
+            candidates.extend(
+                [
+                    f"{alt_scheme}://{host}:{port}",
+                    "http://minio:9000",
+                    "https://minio:9000",
+                ]
+            )
+    else:
+        candidates.extend(["http://minio:9000", "https://minio:9000"])
+
+    unique: list[str] = []
+    seen: set[str] = set()
+    for candidate in candidates:
+        if candidate in seen:
+            continue
+        seen.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
+def _make_client(endpoint: str, *, timeout_sec: float | None = None, max_connections: int | None = None):
+    scheme = urlparse(endpoint).scheme.lower()
+    use_ssl = scheme == "https" if scheme in {"http", "https"} else settings.STORAGE_USE_SSL
+    config = Config(
+        signature_version="s3v4",
+        max_pool_connections=max(max_connections or settings.STORAGE_IO_WORKERS, 10),
+        connect_timeout=timeout_sec or settings.STORAGE_CONNECT_TIMEOUT_SEC,
+        read_timeout=timeout_sec or settings.STORAGE_READ_TIMEOUT_SEC,
+        retries={"max_attempts": 1 if timeout_sec else 3},
+    )
+    # своя сессия: boto3.client() на дефолтной сессии не потокобезопасен
+    return boto3.session.Session().client(
+        "s3",
+        endpoint_url=endpoint,
+        aws_access_key_id=settings.STORAGE_ACCESS_KEY,
+        aws_secret_access_key=settings.STORAGE_SECRET_KEY,
+        region_name=settings.STORAGE_REGION,
+        use_ssl=use_ssl,
+        config=config,
+    )
+
+
+def _probe(endpoint: str) -> bool:
+    client = _make_client(endpoint, timeout_sec=settings.STORAGE_PROBE_TIMEOUT_SEC)
+    try:
+        client.head_bucket(Bucket=settings.STORAGE_BUCKET)
+        return True
+    except Exception:
+        return False
+    finally:
+        client.close()
+
+
+def resolve_endpoint() -> str | None:
+    """Probe the candidate endpoints (blocking); the first one that answers wins."""
+    global _endpoint, _resolved_at
+    if not storage_configured():
+        return None
+    started_at = time.perf_counter()
+    found = next((endpoint for endpoint in _endpoint_candidates() if _probe(endpoint)), None)
+    STORAGE_OP_LATENCY_SECONDS.labels(op="resolve_endpoint").observe(time.perf_counter() - started_at)
+    with _lock:
+        _endpoint = found
+        _resolved_at = time.monotonic()
+    if found is None:
+        STORAGE_OP_ERRORS_TOTAL.labels(op="resolve_endpoint").inc()
+        logger.warning("storage_endpoint_unreachable candidates=%s", len(_endpoint_candidates()))
+    else:
+        logger.info("storage_endpoint_resolved endpoint=%s", found)
+    return found
+
+
+def start_endpoint_resolution() -> Future | None:
+    """Resolve the endpoint in the storage pool unless it is resolved or in progress."""
+    global _resolving
+    if not storage_configured():
+        return None
+    with _lock:
+        if _resolving is not None and not _resolving.done():
+            return _resolving
+        if _endpoint is not None:
+            return None
+        _resolving = _get_executor().submit(resolve_endpoint)
+        return _resolving
+
+
+def _current_endpoint(*, wait: bool) -> str | None:
+    with _lock:
+        endpoint, resolved_at = _endpoint, _resolved_at
+    if resolved_at is not None:
+        if endpoint is None and time.monotonic() - resolved_at >= settings.STORAGE_ENDPOINT_RETRY_SEC:
+            # хранилище было недоступно — пробуем снова, не блокируя вызывающего
+            if wait:
+                return resolve_endpoint()
+            start_endpoint_resolution()
+        return endpoint
+    if wait:
+        return resolve_endpoint()
+    start_endpoint_resolution()
+    return _endpoint_candidates()[0]
+
+
+def get_client(*, wait: bool = True):
+    """Shared S3 client, or ``None`` when storage is not configured/reachable.
+
+    ``wait=False`` never blocks on endpoint probing (use it on the event loop);
+    ``wait=True`` may probe and is meant for worker threads and scripts.
+    """
+    global _client, _client_endpoint
+    if not storage_configured():
+        return None
+    endpoint = _current_endpoint(wait=wait)
+    if endpoint is None:
+        return None
+    with _lock:
+        if _client is None or _client_endpoint != endpoint:
+            _client = _make_client(endpoint)
+            _client_endpoint = endpoint
+        return _client
+
+
+def new_client(*, max_connections: int):
+    """Separate client with its own connection pool (bulk jobs), ``None`` like ``get_client``."""
+    if not storage_configured():
+        return None
+    endpoint = _current_endpoint(wait=True)
+    if endpoint is None:
+        return None
+    return _make_client(endpoint, max_connections=max_connections)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(settings.STORAGE_IO_WORKERS, 1),
+                thread_name_prefix="storage-io",
+            )
+        return _executor
+
+
+def timed(op: str, fn, *args, **kwargs):
+    started_at = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        STORAGE_OP_ERRORS_TOTAL.labels(op=op).inc()
+        raise
+    finally:
+        STORAGE_OP_LATENCY_SECONDS.labels(op=op).observe(time.perf_counter() - started_at)
+
+
+async def run_io(op: str, fn, *args):
+    """Run a blocking storage call in the storage thread pool."""
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), timed, op, fn, *args)
+
+
+def reset() -> None:
+    """Forget the resolved endpoint and client (tests, config reload)."""
+    global _endpoint, _resolved_at, _resolving, _client, _client_endpoint
+    with _lock:
+        _endpoint = None
+        _resolved_at = None
+        _resolving = None
+        _client = None
+        _client_endpoint = None
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
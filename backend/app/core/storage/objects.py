@@ -2,14 +2,12 @@ from __future__ import annotations
 
 import uuid
 from dataclasses import dataclass
-from functools import lru_cache
-from urllib.parse import urlparse
 
-import boto3
-from botocore.client import Config
+from botocore.exceptions import ClientError
 
 from app.core.config import settings
 from app.core import error_codes as codes
+from app.core.storage.client import get_client, run_io, timed
 
 
 ALLOWED_CONTENT_TYPES = {t.strip() for t in settings.STORAGE_ALLOWED_CONTENT_TYPES.split(",") if t.strip()}
@@ -20,6 +18,13 @@ CONTENT_TYPE_EXT = {
 }
 
 
+@dataclass(slots=True)
+class ObjectStat:
+    key: str
+    size: int
+    etag: str
+
+
 @dataclass(slots=True)
 class PresignPutResult:
     key: str
@@ -39,88 +44,12 @@ class PresignPostResult:
     max_size_bytes: int
 
 
-def _get_s3_client():
-    endpoint = _resolve_working_storage_endpoint()
-    if not endpoint or not settings.STORAGE_ACCESS_KEY or not settings.STORAGE_SECRET_KEY:
-        return None
-    scheme = urlparse(endpoint).scheme.lower()
-    use_ssl = scheme == "https" if scheme in {"http", "https"} else settings.STORAGE_USE_SSL
-    return boto3.client(
-        "s3",
-        endpoint_url=endpoint,
-        aws_access_key_id=settings.STORAGE_ACCESS_KEY,
-        aws_secret_access_key=settings.STORAGE_SECRET_KEY,
-        region_name=settings.STORAGE_REGION,
-        use_ssl=use_ssl,
-        config=Config(signature_version="s3v4"),
-    )
-
-
-def _endpoint_candidates() -> list[str]:
-    candidates: list[str] = []
-    configured = (settings.STORAGE_ENDPOINT or "").strip()
-    if configured:
-        candidates.append(configured)
-        parsed = urlparse(configured)
-        host = (parsed.hostname or "").lower()
-        scheme = (parsed.scheme or ("https" if settings.STORAGE_USE_SSL else "http")).lower()
-        alt_scheme = "http" if scheme == "https" else "https"
-        port = parsed.port or (443 if scheme == "https" else 80)
-        if host not in {"minio", "localhost", "127.0.0.1"}:
-            candidates.extend(
-                [
-                    f"{scheme}://minio:9000",
-                    f"http://minio:9000",
-                    f"https://minio:9000",
-                    f"{scheme}://127.0.0.1:{port}",
-                    f"{alt_scheme}://127.0.0.1:{port}",
-                    f"{scheme}://localhost:{port}",
-                    f"{alt_scheme}://localhost:{port}",
-                ]
-            )
-        else:
-            candidates.extend(
-                [
-                    f"{alt_scheme}://{host}:{port}",
-                    "http://minio:9000",
-                    "https://minio:9000",
-                ]
-            )
-    else:
-        candidates.extend(["http://minio:9000", "https://minio:9000"])
-
-    unique: list[str] = []
-    seen: set[str] = set()
-    for candidate in candidates:
-        if candidate in seen:
-            continue
-        seen.add(candidate)
-        unique.append(candidate)
-    return unique
-
-
-@lru_cache(maxsize=1)
-def _resolve_working_storage_endpoint() -> str | None:
-    if not settings.STORAGE_ACCESS_KEY or not settings.STORAGE_SECRET_KEY:
-        return None
-    for endpoint in _endpoint_candidates():
-        scheme = urlparse(endpoint).scheme.lower()
-        use_ssl = scheme == "https" if scheme in {"http", "https"} else settings.STORAGE_USE_SSL
-        client = boto3.client(
-            "s3",
-            endpoint_url=endpoint,
-            aws_access_key_id=settings.STORAGE_ACCESS_KEY,
-            aws_secret_access_key=settings.STORAGE_SECRET_KEY,
-            region_name=settings.STORAGE_REGION,
-            use_ssl=use_ssl,
-            config=Config(signature_version="s3v4"),
-        )
-        try:
-            client.head_bucket(Bucket=settings.STORAGE_BUCKET)
-            return endpoint
-        except Exception:
-            continue
-    return None
+def _presign_client():
+    # подпись считается локально (HMAC) — на event loop сеть не трогаем
+    client = get_client(wait=False)
+    if client is None:
+        raise RuntimeError("storage_not_configured")
+    return client
 
 
 def _build_key(prefix: str, content_type: str) -> str:
@@ -140,9 +69,7 @@ def public_url_for_key(key: str) -> str | None:
 
 
 def presign_put(prefix: str, content_type: str) -> PresignPutResult:
-    client = _get_s3_client()
-    if client is None:
-        raise RuntimeError("storage_not_configured")
+    client = _presign_client()
     if content_type not in ALLOWED_CONTENT_TYPES:
         raise ValueError(codes.CONTENT_TYPE_NOT_ALLOWED)
 
@@ -152,7 +79,9 @@ def presign_put(prefix: str, content_type: str) -> PresignPutResult:
         "Key": key,
         "ContentType": content_type,
     }
-    upload_url = client.generate_presigned_url(
+    upload_url = timed(
+        "presign_put",
+        client.generate_presigned_url,
         "put_object",
         Params=params,
         ExpiresIn=settings.STORAGE_PRESIGN_EXPIRES_SEC,
@@ -167,9 +96,7 @@ def presign_put(prefix: str, content_type: str) -> PresignPutResult:
 
 
 def presign_post(prefix: str, content_type: str, max_size_bytes: int) -> PresignPostResult:
-    client = _get_s3_client()
-    if client is None:
-        raise RuntimeError("storage_not_configured")
+    client = _presign_client()
     if content_type not in ALLOWED_CONTENT_TYPES:
         raise ValueError(codes.CONTENT_TYPE_NOT_ALLOWED)
 
@@ -180,7 +107,9 @@ def presign_post(prefix: str, content_type: str, max_size_bytes: int) -> Presign
     ]
     fields = {"Content-Type": content_type}
 
-    response = client.generate_presigned_post(
+    response = timed(
+        "presign_post",
+        client.generate_presigned_post,
         Bucket=settings.STORAGE_BUCKET,
         Key=key,
         Fields=fields,
@@ -199,10 +128,10 @@ def presign_post(prefix: str, content_type: str, max_size_bytes: int) -> Presign
 
 
 def presign_get(key: str) -> str:
-    client = _get_s3_client()
-    if client is None:
-        raise RuntimeError("storage_not_configured")
-    return client.generate_presigned_url(
+    client = _presign_client()
+    return timed(
+        "presign_get",
+        client.generate_presigned_url,
         "get_object",
         Params={"Bucket": settings.STORAGE_BUCKET, "Key": key},
         ExpiresIn=settings.STORAGE_PRESIGN_EXPIRES_SEC,
@@ -210,21 +139,21 @@ def presign_get(key: str) -> str:
 
 
 def storage_health() -> bool:
-    client = _get_s3_client()
+    """Blocking ``head_bucket``; from async code use ``storage_health_async``."""
+    client = get_client()
     if client is None:
         return False
     try:
-        client.head_bucket(Bucket=settings.STORAGE_BUCKET)
+        timed("head_bucket", client.head_bucket, Bucket=settings.STORAGE_BUCKET)
         return True
     except Exception:
         return False
 
 
-def list_object_keys(prefix: str) -> list[str]:
-    client = _get_s3_client()
+def _iter_objects(prefix: str):
+    client = get_client()
     if client is None:
         raise RuntimeError("storage_not_configured")
-    keys: list[str] = []
     token: str | None = None
     while True:
         params = {
@@ -234,15 +163,80 @@ def list_object_keys(prefix: str) -> list[str]:
         }
         if token:
             params["ContinuationToken"] = token
-        response = client.list_objects_v2(**params)
+        response = timed("list_objects", client.list_objects_v2, **params)
         contents = response.get("Contents") or []
         for item in contents:
-            key = item.get("Key")
-            if isinstance(key, str):
-                keys.append(key)
+            if isinstance(item.get("Key"), str):
+                yield item
         if not response.get("IsTruncated"):
             break
         token = response.get("NextContinuationToken")
         if not token:
             break
-    return keys
+
+
+def list_object_keys(prefix: str) -> list[str]:
+    """Blocking paginated listing; from async code use ``list_object_keys_async``."""
+    return [item["Key"] for item in _iter_objects(prefix)]
+
+
+def list_object_stats(prefix: str) -> dict[str, ObjectStat]:
+    """Blocking listing with sizes and ETags (without quotes), keyed by object key."""
+    return {
+        item["Key"]: ObjectStat(
+            key=item["Key"],
+            size=int(item.get("Size") or 0),
+            etag=str(item.get("ETag") or "").strip('"'),
+        )
+        for item in _iter_objects(prefix)
+    }
+
+
+def object_exists(key: str) -> bool:
+    """Blocking ``head_object``; ``False`` only for a 404, other errors propagate."""
+    client = get_client()
+    if client is None:
+        raise RuntimeError("storage_not_configured")
+    try:
+        timed("head_object", client.head_object, Bucket=settings.STORAGE_BUCKET, Key=key)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in {"404", "NoSuchKey", "NotFound"}:
+            return False
+        raise
+    return True
+
+
+def read_object(key: str) -> bytes:
+    """Blocking download of a whole (small) object."""
+    client = get_client()
+    if client is None:
+        raise RuntimeError("storage_not_configured")
+    response = timed("get_object", client.get_object, Bucket=settings.STORAGE_BUCKET, Key=key)
+    return response["Body"].read()
+
+
+def put_object(key: str, data: bytes, content_type: str) -> None:
+    """Blocking upload of an in-memory object."""
+    client = get_client()
+    if client is None:
+        raise RuntimeError("storage_not_configured")
+    timed(
+        "put_object",
+        client.put_object,
+        Bucket=settings.STORAGE_BUCKET,
+        Key=key,
+        Body=data,
+        ContentType=content_type,
+    )
+
+
+async def storage_health_async() -> bool:
+    return await run_io("health", storage_health)
+
+
+async def object_exists_async(key: str) -> bool:
+    return await run_io("head_object", object_exists, key)
+
+
+async def list_object_keys_async(prefix: str) -> list[str]:
+    return await run_io("list_prefix", list_object_keys, prefix)
@@ -0,0 +1,67 @@
+"""Reuse of presigned GET URLs.
+
+A URL signed for an object key is handed out again until
+``STORAGE_PRESIGN_REUSE_RATIO`` of ``STORAGE_PRESIGN_EXPIRES_SEC`` has passed,
+so repeated clicks get the same URL and browser/CDN caches keep working; the
+rest of the lifetime is left for the client to follow the redirect. URLs are
+kept in process (L1) and in Redis (``presign:get:v1:{key}``) for all workers.
+"""
+from __future__ import annotations
+
+import json
+import time
+
+from redis.exceptions import RedisError
+
+from app.core.cache import LocalCache
+from app.core.config import settings
+from app.core.redis import mark_redis_down, redis_marked_down, safe_redis
+from app.core.storage.objects import presign_get
+
+PRESIGN_CACHE_PREFIX = "presign:get:v1:"
+
+
+def reuse_window_sec() -> int:
+    return int(settings.STORAGE_PRESIGN_EXPIRES_SEC * settings.STORAGE_PRESIGN_REUSE_RATIO)
+
+
+_local = LocalCache(maxsize=settings.STORAGE_PRESIGN_CACHE_MAX_ITEMS, ttl_sec=reuse_window_sec())
+
+
+def _cache_key(key: str) -> str:
+    return f"{PRESIGN_CACHE_PREFIX}{key}"
+
+
+async def presign_get_cached(key: str) -> str:
+    """``presign_get`` with reuse; raises ``RuntimeError`` like it when storage is not configured."""
+    window = reuse_window_sec()
+    if window <= 0:
+        return presign_get(key)
+    cache_key = _cache_key(key)
+    now = time.time()
+    item = _local.get(cache_key, cache="presign")
+    if item is not None and item[1] > now:
+        return item[0]
+
+    redis = None if redis_marked_down() else await safe_redis()
+    if redis is not None:
+        try:
+            raw = await redis.get(cache_key)
+        except (RedisError, OSError):
+            mark_redis_down()
+            redis, raw = None, None
+        if raw:
+            url, reuse_until = json.loads(raw)
+            if reuse_until > now:
+                _local.set(cache_key, (url, reuse_until))
+                return url
+
+    url = presign_get(key)
+    reuse_until = now + window
+    _local.set(cache_key, (url, reuse_until))
+    if redis is not None:
+        try:
+            await redis.set(cache_key, json.dumps([url, reuse_until]), ex=window)
+        except (RedisError, OSError):
+            mark_redis_down()
+    return url
@@ -1,19 +1,30 @@
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from prometheus_client import make_asgi_app
 import sentry_sdk
+from app.core.cache import run_invalidation_listener
 from app.core.config import settings, validate_required_settings
 from app.core.errors import api_error
+from app.core import error_codes as codes
 from app.core.logging import setup_logging
 from app.core.tracing import setup_tracing
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from app.core.request_id import get_request_id
+from app.core.security import PasswordHashBusy, password_pool
+from app.core import storage
 from app.middleware.audit import AuditMiddleware
+from app.middleware.auth_context import AuthContextMiddleware
 from app.middleware.rate_limit import GlobalRateLimitMiddleware
 from app.middleware.request_id import RequestIdMiddleware
 from app.api.v1.router import router as v1_router
+from app.services import answer_buffer, attempt_stats
+from app.services.audit_writer import audit_writer
 
 setup_logging()
 missing_settings = validate_required_settings()
@@ -52,12 +63,42 @@ APP_DESCRIPTION = """
 - `missing_token`, `invalid_token`, `invalid_token_type`
 - `forbidden`, `user_not_found`, `olympiad_not_found`, `task_not_found`
 - `rate_limited`, `attempt_expired`, `olympiad_not_available`
+- `auth_busy` (503, повторить после `Retry-After`)
 """
 
-app = FastAPI(title=settings.APP_NAME, description=APP_DESCRIPTION)
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    background = [
+        asyncio.create_task(run_invalidation_listener()),
+        asyncio.create_task(attempt_stats.run_flusher()),
+    ]
+    storage.start_endpoint_resolution()
+    if settings.AUDIT_LOG_ENABLED:
+        background.append(asyncio.create_task(audit_writer.run()))
+    if settings.ANSWERS_WRITE_BEHIND_ENABLED:
+        background.append(asyncio.create_task(answer_buffer.run_flusher()))
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        if settings.ANSWERS_WRITE_BEHIND_ENABLED:
+            await answer_buffer.drain()
+        if settings.AUDIT_LOG_ENABLED:
+            await audit_writer.drain()
+        await attempt_stats.drain()
+        password_pool.shutdown()
+        storage.shutdown()
+
+
+app = FastAPI(title=settings.APP_NAME, description=APP_DESCRIPTION, lifespan=lifespan)
 app.add_middleware(RequestIdMiddleware)
 app.add_middleware(GlobalRateLimitMiddleware)
 app.add_middleware(AuditMiddleware)
+app.add_middleware(AuthContextMiddleware)
 app.include_router(v1_router)
 if settings.OTEL_ENABLED:
     FastAPIInstrumentor.instrument_app(app)
@@ -93,6 +134,16 @@ async def validation_exception_handler(_request: Request, exc: RequestValidation
     )
 
 
+@app.exception_handler(PasswordHashBusy)
+async def password_hash_busy_handler(_request: Request, _exc: PasswordHashBusy):
+    payload = api_error(codes.AUTH_BUSY)
+    return JSONResponse(
+        status_code=503,
+        content={"error": payload, "request_id": get_request_id()},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(_request: Request, _exc: Exception):
     payload = api_error("internal_error")
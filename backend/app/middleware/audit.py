@@ -2,47 +2,46 @@ from datetime import datetime, timezone
 import time
 import logging
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.config import settings
-from app.core.security import decode_token
+from app.core.auth_context import cached_principal, current_auth_context, load_principal
 import sentry_sdk
 from app.db.session import SessionLocal
-from app.repos.audit_logs import AuditLogsRepo
-from app.repos.users import UsersRepo
-from app.core.metrics import REQUEST_LATENCY_SECONDS
+from app.core.metrics import AUDIT_LOG_DROPPED_TOTAL, REQUEST_LATENCY_SECONDS
 from app.core.request_id import get_request_id
+from app.services.audit_writer import audit_writer, should_record
 from opentelemetry import trace
 
 logger = logging.getLogger(__name__)
 
 
-class AuditMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if not settings.AUDIT_LOG_ENABLED:
-            return await call_next(request)
+class AuditMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        path = request.url.path
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.AUDIT_LOG_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
         if path.endswith("/health") or path.endswith("/health/ready"):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
-        user_id = None
-        auth = request.headers.get("authorization") or ""
-        if auth.lower().startswith("bearer "):
-            token = auth.split(" ", 1)[1].strip()
-            try:
-                payload = decode_token(token)
-                if payload.get("type") == "access" and payload.get("sub"):
-                    user_id = int(payload.get("sub"))
-            except Exception:
-                pass
+        await self._handle(scope, receive, send, path, Headers(scope=scope))
+
+    async def _handle(self, scope: Scope, receive: Receive, send: Send, path: str, headers: Headers) -> None:
+        method = scope["method"]
+        user_id = current_auth_context().user_id
 
         if settings.SENTRY_DSN:
             sentry_sdk.set_tag("env", settings.ENV)
             sentry_sdk.set_tag("version", settings.APP_VERSION)
             sentry_sdk.set_tag("path", path)
-            sentry_sdk.set_tag("method", request.method)
+            sentry_sdk.set_tag("method", method)
             req_id = get_request_id()
             if req_id:
                 sentry_sdk.set_tag("request_id", req_id)
@@ -53,51 +52,71 @@ class AuditMiddleware(BaseHTTPMiddleware):
             if user_id is not None:
                 sentry_sdk.set_user({"id": user_id})
                 try:
-                    async with SessionLocal() as session:
-                        user = await UsersRepo(session).get_by_id(user_id)
-                    if user:
-                        sentry_sdk.set_tag("role", user.role.value)
+                    principal = cached_principal(user_id)
+                    if principal is None:
+                        async with SessionLocal() as session:
+                            principal = await load_principal(session, user_id)
+                    if principal:
+                        sentry_sdk.set_tag("role", principal.role.value)
                 except Exception:
                     pass
 
         status_code = 500
+        response_request_id: str | None = None
         start = time.perf_counter()
         action = "request"
-        if path.startswith("/api/v1/admin/users/") and request.method == "PUT":
+        if path.startswith("/api/v1/admin/users/") and method == "PUT":
             action = "admin_update_user"
-        elif path.endswith("/temp-password") and request.method == "POST":
+        elif path.endswith("/temp-password") and method == "POST":
             action = "admin_set_temp_password"
-        elif path.endswith("/temp-password/generate") and request.method == "POST":
+        elif path.endswith("/temp-password/generate") and method == "POST":
             action = "admin_generate_temp_password"
-        elif path == "/api/v1/auth/password/change" and request.method == "POST":
+        elif path == "/api/v1/auth/password/change" and method == "POST":
             action = "auth_password_change"
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code, response_request_id
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # RequestIdMiddleware стоит внутри — id берём из ответа
+                response_request_id = Headers(raw=message.get("headers") or []).get("x-request-id")
+            await send(message)
+
         try:
-            response = await call_next(request)
-            status_code = response.status_code
-            return response
+            await self.app(scope, receive, send_with_status)
         finally:
+            route = scope.get("route")
+            path_label = route.path if route is not None and hasattr(route, "path") else path
             try:
-                route = request.scope.get("route")
-                path_label = route.path if route is not None and hasattr(route, "path") else path
-                REQUEST_LATENCY_SECONDS.labels(path=path_label, method=request.method).observe(
+                REQUEST_LATENCY_SECONDS.labels(path=path_label, method=method).observe(
                     time.perf_counter() - start
                 )
             except Exception:
                 pass
             try:
-                async with SessionLocal() as session:
-                    repo = AuditLogsRepo(session)
-                    await repo.create(
-                        user_id=user_id,
-                        action=action,
-                        method=request.method,
-                        path=path,
-                        status_code=status_code,
-                        ip=request.client.host if request.client else None,
-                        user_agent=request.headers.get("user-agent"),
-                        request_id=get_request_id(),
-                        details=None,
-                        created_at=datetime.now(timezone.utc),
+                if should_record(
+                    method=method,
+                    route_path=path_label,
+                    action=action,
+                    status_code=status_code,
+                ):
+                    user_agent = headers.get("user-agent")
+                    client = scope.get("client")
+                    audit_writer.enqueue(
+                        {
+                            "user_id": user_id,
+                            "action": action,
+                            "method": method,
+                            "path": path[:255],
+                            "status_code": status_code,
+                            "ip": client[0] if client else None,
+                            "user_agent": user_agent[:255] if user_agent else None,
+                            "request_id": response_request_id or get_request_id(),
+                            "details": None,
+                            "created_at": datetime.now(timezone.utc),
+                        }
                     )
+                else:
+                    AUDIT_LOG_DROPPED_TOTAL.labels(reason="sampled").inc()
             except Exception:
                 logger.exception("audit_log_failed")
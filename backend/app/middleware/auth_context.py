@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.auth_context import bearer_token, reset_auth_context, set_auth_context
+
+
+class AuthContextMiddleware:
+    """Outermost layer: decode the bearer token once for the whole request."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = set_auth_context(bearer_token(Headers(scope=scope).get("authorization")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_auth_context(token)
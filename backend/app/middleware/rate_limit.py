@@ -1,15 +1,15 @@
 from __future__ import annotations
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers
 from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.core.config import settings
 from app.core.errors import api_error
 from app.core.metrics import RATE_LIMIT_BLOCKS
-from app.core.rate_limit import token_bucket_rate_limit
+from app.core.rate_limit import Bucket, token_bucket_rate_limit_many
 from app.core.redis import safe_redis
-from app.core.security import decode_token
+from app.core.auth_context import auth_context_for, bearer_token
 from app.core import error_codes as codes
 
 
@@ -30,57 +30,70 @@ def _rate_limit_response(retry_after_sec: int) -> Response:
     )
 
 
-def _extract_user_id(request: Request) -> str | None:
-    auth = request.headers.get("Authorization")
-    if not auth or not auth.startswith("Bearer "):
-        return None
-    token = auth.split(" ", 1)[1].strip()
+def _extract_user_id(headers: Headers) -> str | None:
+    token = bearer_token(headers.get("Authorization"))
     if not token:
         return None
-    try:
-        payload = decode_token(token)
-    except Exception:
-        return None
-    if payload.get("type") != "access":
-        return None
-    sub = payload.get("sub")
-    return str(sub) if sub else None
-
-
-class GlobalRateLimitMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
-        path = request.url.path
+    user_id = auth_context_for(token).user_id
+    return str(user_id) if user_id else None
+
+
+class GlobalRateLimitMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        response = await self._check(scope)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    async def _check(self, scope: Scope) -> Response | None:
+        path = scope["path"]
         if path.startswith("/api/v1/health") or path == "/metrics":
-            return await call_next(request)
+            return None
 
+        # при недоступном Redis решение принимает локальный limiter
         redis = await safe_redis()
-        if redis is None:
-            return await call_next(request)
 
+        scopes: list[str] = []
+        buckets: list[Bucket] = []
         if settings.GLOBAL_RL_LIMIT > 0 and settings.GLOBAL_RL_WINDOW_SEC > 0:
-            ip = request.client.host if request.client else "unknown"
-            res = await token_bucket_rate_limit(
-                redis,
-                key=f"rl:global:{ip}",
-                capacity=settings.GLOBAL_RL_LIMIT,
-                window_sec=settings.GLOBAL_RL_WINDOW_SEC,
+            client = scope.get("client")
+            ip = client[0] if client else "unknown"
+            scopes.append("global")
+            buckets.append(
+                Bucket(
+                    key=f"rl:global:{ip}",
+                    capacity=settings.GLOBAL_RL_LIMIT,
+                    window_sec=settings.GLOBAL_RL_WINDOW_SEC,
+                )
             )
-            if not res.allowed:
-                RATE_LIMIT_BLOCKS.labels(scope="global").inc()
-                return _rate_limit_response(res.retry_after_sec)
 
         if settings.CRITICAL_RL_USER_LIMIT > 0 and settings.CRITICAL_RL_USER_WINDOW_SEC > 0:
             if _is_critical_path(path):
-                user_id = _extract_user_id(request)
+                user_id = _extract_user_id(Headers(scope=scope))
                 if user_id:
-                    res = await token_bucket_rate_limit(
-                        redis,
-                        key=f"rl:critical:user:{user_id}",
-                        capacity=settings.CRITICAL_RL_USER_LIMIT,
-                        window_sec=settings.CRITICAL_RL_USER_WINDOW_SEC,
+                    scopes.append("critical_user")
+                    buckets.append(
+                        Bucket(
+                            key=f"rl:critical:user:{user_id}",
+                            capacity=settings.CRITICAL_RL_USER_LIMIT,
+                            window_sec=settings.CRITICAL_RL_USER_WINDOW_SEC,
+                        )
                     )
-                    if not res.allowed:
-                        RATE_LIMIT_BLOCKS.labels(scope="critical_user").inc()
-                        return _rate_limit_response(res.retry_after_sec)
 
-        return await call_next(request)
+        if not buckets:
+            return None
+        # глобальная и пользовательская корзины — одним вызовом скрипта
+        results = await token_bucket_rate_limit_many(redis, buckets)
+        for scope_name, res in zip(scopes, results):
+            if not res.allowed:
+                RATE_LIMIT_BLOCKS.labels(scope=scope_name).inc()
+                return _rate_limit_response(res.retry_after_sec)
+
+        return None
@@ -1,25 +1,37 @@
 from __future__ import annotations
 
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.request_id import set_request_id, reset_request_id
 from opentelemetry import trace
 
 
-class RequestIdMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
-        header_name = "X-Request-ID"
-        request_id = request.headers.get(header_name) or str(uuid.uuid4())
+class RequestIdMiddleware:
+    header_name = "X-Request-ID"
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(self.header_name) or str(uuid.uuid4())
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[self.header_name] = request_id
+            await send(message)
+
         token = set_request_id(request_id)
         try:
             span = trace.get_current_span()
             if span.is_recording():
                 span.set_attribute("request_id", request_id)
-            response = await call_next(request)
-            response.headers[header_name] = request_id
-            return response
+            await self.app(scope, receive, send_with_request_id)
         finally:
             reset_request_id(token)
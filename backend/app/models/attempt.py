@@ -1,5 +1,6 @@
 """Attempt model."""
 import enum
+from dataclasses import dataclass
 from datetime import datetime
 from sqlalchemy import ForeignKey, DateTime, Integer, Enum, UniqueConstraint, Boolean
 from sqlalchemy.dialects.postgresql import JSONB
@@ -65,3 +66,25 @@ class AttemptTaskGrade(Base):
     __table_args__ = (
         UniqueConstraint("attempt_id", "task_id", name="uq_attempt_task_grade"),
     )
+
+
+@dataclass(frozen=True, slots=True)
+class TaskGrade:
+    """Computed grade of one task, persisted as an ``AttemptTaskGrade`` row."""
+
+    task_id: int
+    is_correct: bool
+    score: int
+    max_score: int
+
+
+@dataclass(frozen=True, slots=True)
+class AttemptGrade:
+    """Computed grade of a whole attempt (``app.services.grading``), saved by ``AttemptsRepo.save_grades``."""
+
+    attempt_id: int
+    score_total: int
+    score_max: int
+    passed: bool
+    graded_at: datetime
+    tasks: tuple[TaskGrade, ...]
@@ -0,0 +1,19 @@
+"""Pre-aggregated attempt statistics."""
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class AttemptStatsBucket(Base):
+    """Counters per 30-minute bucket, incremented by the stats rollup flusher."""
+
+    __tablename__ = "attempt_stats_buckets"
+
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    attempts_started: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    attempts_submitted: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    attempts_expired: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    diploma_downloads: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
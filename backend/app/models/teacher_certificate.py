@@ -0,0 +1,22 @@
+"""Index of teacher certificates stored in S3/MinIO."""
+from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TeacherCertificate(Base):
+    """One row per ``certificates/teachers/<season>/certificate_<teacher>_<season>_<seq>.jpg`` object.
+
+    Filled by the certificate uploader and rebuilt from a bucket listing by
+    ``maintenance.reconcile_teacher_certificates``.
+    """
+
+    __tablename__ = "teacher_certificates"
+
+    teacher_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    season: Mapped[str] = mapped_column(String(9), primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    key: Mapped[str] = mapped_column(String(512), nullable=False)
@@ -1,7 +1,7 @@
 """User model."""
 import enum
 from datetime import datetime
-from sqlalchemy import String, Boolean, Enum, Integer, DateTime, func
+from sqlalchemy import String, Boolean, Computed, Enum, Integer, DateTime, Text, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -19,8 +19,18 @@ class Gender(str, enum.Enum):
     female = "female"
 
 
+# склейка полей для поиска в админке; GIN-индекс pg_trgm создаётся миграцией
+SEARCH_TEXT_SQL = (
+    "coalesce(login, '') || ' ' || coalesce(email, '') || ' ' || coalesce(surname, '') || ' ' || "
+    "coalesce(name, '') || ' ' || coalesce(father_name, '') || ' ' || coalesce(city, '') || ' ' || "
+    "coalesce(school, '') || ' ' || coalesce(subject, '')"
+)
+
+
 class User(Base):
     __tablename__ = "users"
+    # search_text вычисляет Postgres; в ORM-объект не загружается, в запросах — users.c.search_text
+    __mapper_args__ = {"exclude_properties": ["search_text"]}
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -53,3 +63,5 @@ class User(Base):
 
     # teacher-only (MVP)
     subject: Mapped[str | None] = mapped_column(String(120), nullable=True)
+
+    search_text: Mapped[str | None] = mapped_column(Text, Computed(SEARCH_TEXT_SQL, persisted=True))
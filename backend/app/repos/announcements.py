@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterable, AsyncIterator
 from dataclasses import dataclass
 from datetime import datetime, timezone
 
-from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy import and_, func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.announcement import (
@@ -12,8 +13,9 @@ from app.models.announcement import (
     AnnouncementCampaignFallback,
     AnnouncementGroupMessage,
 )
-from app.models.user import User, UserRole
-from app.schemas.announcements import UserAnnouncementRead
+
+_STAGING_TABLE = "announcement_import_staging"
+_MAX_BIGINT = 2**63 - 1
 
 
 @dataclass(slots=True)
@@ -32,20 +34,6 @@ class AnnouncementsRepo:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    @staticmethod
-    def _is_time_active(now: datetime):
-        return and_(
-            or_(AnnouncementCampaign.starts_at.is_(None), AnnouncementCampaign.starts_at <= now),
-            or_(AnnouncementCampaign.ends_at.is_(None), AnnouncementCampaign.ends_at > now),
-        )
-
-    @staticmethod
-    def _is_group_time_active(now: datetime):
-        return and_(
-            or_(AnnouncementGroupMessage.starts_at.is_(None), AnnouncementGroupMessage.starts_at <= now),
-            or_(AnnouncementGroupMessage.ends_at.is_(None), AnnouncementGroupMessage.ends_at > now),
-        )
-
     async def list_campaigns(self) -> list[AnnouncementCampaign]:
         result = await self.db.execute(select(AnnouncementCampaign).order_by(AnnouncementCampaign.id.desc()))
         return list(result.scalars().all())
@@ -128,156 +116,152 @@ class AnnouncementsRepo:
         self,
         campaign_id: int,
         subject: str,
-        rows: list[tuple[int, int]],
+        rows: AsyncIterable[tuple[int, int]],
         source_file: str,
     ) -> AnnouncementImportStats:
-        stats = AnnouncementImportStats(total_rows=len(rows))
-        if not rows:
-            await self.db.execute(
-                delete(AnnouncementAssignment).where(
-                    AnnouncementAssignment.campaign_id == campaign_id,
-                    AnnouncementAssignment.subject == subject,
-                )
-            )
-            await self.db.commit()
-            return stats
-
-        last_by_user: dict[int, int] = {}
-        for user_id, group_number in rows:
-            if group_number < 1 or group_number > 21:
-                stats.skipped_group_out_of_range += 1
-                continue
-            if user_id in last_by_user:
-                stats.skipped_duplicate_rows += 1
-            last_by_user[user_id] = group_number
-        if not last_by_user:
-            await self.db.execute(
-                delete(AnnouncementAssignment).where(
-                    AnnouncementAssignment.campaign_id == campaign_id,
-                    AnnouncementAssignment.subject == subject,
-                )
-            )
-            await self.db.commit()
-            return stats
-
-        user_ids = list(last_by_user.keys())
-        existing_result = await self.db.execute(select(User.id, User.role).where(User.id.in_(user_ids)))
-        role_by_user_id = {int(row[0]): row[1] for row in existing_result.all()}
-
-        valid_rows: list[tuple[int, int]] = []
-        for user_id, group_number in last_by_user.items():
-            role = role_by_user_id.get(user_id)
-            if role is None:
-                stats.skipped_unknown_user += 1
-                continue
-            if role != UserRole.student:
-                stats.skipped_not_student += 1
-                continue
-            valid_rows.append((user_id, group_number))
-
-        stats.valid_rows = len(valid_rows)
+        """Replace the (campaign, subject) assignments with the uploaded rows.
+
+        Rows are streamed with ``COPY`` into a temporary staging table; the last
+        row per user wins, unknown users and non-students are skipped, and the
+        old assignments are swapped for the new ones in a single statement.
+        """
+        stats = AnnouncementImportStats()
+
+        async def _records() -> AsyncIterator[tuple[int, int, int]]:
+            async for user_id, group_number in rows:
+                stats.total_rows += 1
+                if group_number < 1 or group_number > 21:
+                    stats.skipped_group_out_of_range += 1
+                    continue
+                if not 0 < user_id <= _MAX_BIGINT:
+                    # такого id в users быть не может — считаем как неизвестного пользователя
+                    stats.skipped_unknown_user += 1
+                    continue
+                yield stats.total_rows, user_id, group_number
 
         await self.db.execute(
-            delete(AnnouncementAssignment).where(
-                AnnouncementAssignment.campaign_id == campaign_id,
-                AnnouncementAssignment.subject == subject,
+            text(
+                f"CREATE TEMP TABLE {_STAGING_TABLE} "
+                "(seq BIGINT NOT NULL, user_id BIGINT NOT NULL, group_number INTEGER NOT NULL) ON COMMIT DROP"
             )
         )
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            _STAGING_TABLE,
+            records=_records(),
+            columns=["seq", "user_id", "group_number"],
+        )
 
-        for user_id, group_number in valid_rows:
-            self.db.add(
-                AnnouncementAssignment(
-                    campaign_id=campaign_id,
-                    user_id=user_id,
-                    subject=subject,
-                    group_number=group_number,
-                    source_file=source_file,
+        counts = (
+            await self.db.execute(
+                text(
+                    f"""
+                    WITH latest AS (
+                        SELECT DISTINCT ON (user_id) user_id FROM {_STAGING_TABLE} ORDER BY user_id, seq DESC
+                    )
+                    SELECT
+                        (SELECT count(*) FROM {_STAGING_TABLE}) - (SELECT count(*) FROM latest),
+                        count(*) FILTER (WHERE u.id IS NULL),
+                        count(*) FILTER (WHERE u.id IS NOT NULL AND u.role <> 'student')
+                    FROM latest l
+                    LEFT JOIN users u ON u.id = l.user_id
+                    """
                 )
             )
-            stats.inserted_rows += 1
-
+        ).one()
+        stats.skipped_duplicate_rows += int(counts[0])
+        stats.skipped_unknown_user += int(counts[1])
+        stats.skipped_not_student += int(counts[2])
+
+        inserted = await self.db.scalar(
+            text(
+                f"""
+                WITH latest AS (
+                    SELECT DISTINCT ON (user_id) user_id, group_number
+                    FROM {_STAGING_TABLE}
+                    ORDER BY user_id, seq DESC
+                ),
+                valid AS (
+                    SELECT l.user_id, l.group_number
+                    FROM latest l
+                    JOIN users u ON u.id = l.user_id AND u.role = 'student'
+                ),
+                removed AS (
+                    DELETE FROM announcement_assignments a
+                    WHERE a.campaign_id = :campaign_id
+                      AND a.subject = :subject
+                      AND NOT EXISTS (SELECT 1 FROM valid v WHERE v.user_id = a.user_id)
+                ),
+                upserted AS (
+                    INSERT INTO announcement_assignments
+                        (campaign_id, user_id, subject, group_number, source_file, assigned_at)
+                    SELECT :campaign_id, v.user_id, :subject, v.group_number, :source_file, now()
+                    FROM valid v
+                    ON CONFLICT (campaign_id, user_id, subject) DO UPDATE
+                    SET group_number = EXCLUDED.group_number,
+                        source_file = EXCLUDED.source_file,
+                        assigned_at = EXCLUDED.assigned_at
+                    RETURNING 1
+                )
+                SELECT count(*) FROM upserted
+                """
+            ),
+            {"campaign_id": campaign_id, "subject": subject, "source_file": source_file},
+        )
+        stats.valid_rows = stats.inserted_rows = int(inserted or 0)
         await self.db.commit()
         return stats
 
-    async def get_user_announcements(self, user_id: int) -> list[UserAnnouncementRead]:
-        now = datetime.now(timezone.utc)
-        campaigns_result = await self.db.execute(
-            select(AnnouncementCampaign)
-            .where(AnnouncementCampaign.is_active.is_(True), self._is_time_active(now))
-            .order_by(func.coalesce(AnnouncementCampaign.starts_at, AnnouncementCampaign.created_at).desc())
+    async def list_active_campaign_rows(
+        self,
+    ) -> list[tuple[AnnouncementCampaign, AnnouncementGroupMessage | None, AnnouncementCampaignFallback | None]]:
+        """Active campaigns with their active group messages and enabled fallback, one joined query."""
+        result = await self.db.execute(
+            select(AnnouncementCampaign, AnnouncementGroupMessage, AnnouncementCampaignFallback)
+            .outerjoin(
+                AnnouncementGroupMessage,
+                and_(
+                    AnnouncementGroupMessage.campaign_id == AnnouncementCampaign.id,
+                    AnnouncementGroupMessage.is_active.is_(True),
+                ),
+            )
+            .outerjoin(
+                AnnouncementCampaignFallback,
+                and_(
+                    AnnouncementCampaignFallback.campaign_id == AnnouncementCampaign.id,
+                    AnnouncementCampaignFallback.enabled.is_(True),
+                ),
+            )
+            .where(AnnouncementCampaign.is_active.is_(True))
+            .order_by(
+                func.coalesce(AnnouncementCampaign.starts_at, AnnouncementCampaign.created_at).desc(),
+                AnnouncementCampaign.id.desc(),
+            )
         )
-        campaigns = list(campaigns_result.scalars().all())
-        if not campaigns:
-            return []
-
-        announcements_by_subject: dict[str, UserAnnouncementRead] = {}
-        fallback_item: UserAnnouncementRead | None = None
+        return [tuple(row) for row in result.all()]
 
-        for campaign in campaigns:
-            assignments_result = await self.db.execute(
-                select(AnnouncementAssignment).where(
-                    AnnouncementAssignment.campaign_id == campaign.id,
-                    AnnouncementAssignment.user_id == user_id,
-                    AnnouncementAssignment.subject.in_(("math", "cs")),
-                )
+    async def list_user_assignments(self, user_id: int, campaign_ids: list[int]) -> list[tuple[int, str, int]]:
+        if not campaign_ids:
+            return []
+        result = await self.db.execute(
+            select(
+                AnnouncementAssignment.campaign_id,
+                AnnouncementAssignment.subject,
+                AnnouncementAssignment.group_number,
+            ).where(
+                AnnouncementAssignment.user_id == user_id,
+                AnnouncementAssignment.campaign_id.in_(campaign_ids),
+                AnnouncementAssignment.subject.in_(("math", "cs")),
             )
-            assignments = list(assignments_result.scalars().all())
-            for assignment in assignments:
-                if assignment.subject in announcements_by_subject:
-                    continue
-                group_result = await self.db.execute(
-                    select(AnnouncementGroupMessage).where(
-                        AnnouncementGroupMessage.campaign_id == campaign.id,
-                        AnnouncementGroupMessage.subject == assignment.subject,
-                        AnnouncementGroupMessage.group_number == assignment.group_number,
-                        AnnouncementGroupMessage.is_active.is_(True),
-                        self._is_group_time_active(now),
-                    )
-                )
-                group = group_result.scalar_one_or_none()
-                if group is None:
-                    continue
-                text = campaign.common_text.strip()
-                if group.group_text.strip():
-                    text = f"{text}\n\n{group.group_text.strip()}" if text else group.group_text.strip()
-                announcements_by_subject[assignment.subject] = UserAnnouncementRead(
-                    campaign_code=campaign.code,
-                    subject=assignment.subject,  # type: ignore[arg-type]
-                    group_number=assignment.group_number,
-                    title=group.group_title.strip(),
-                    text=text,
-                    starts_at=group.starts_at or campaign.starts_at,
-                    ends_at=group.ends_at or campaign.ends_at,
-                )
-
-            if announcements_by_subject:
-                continue
-
-            if fallback_item is None:
-                fallback_result = await self.db.execute(
-                    select(AnnouncementCampaignFallback).where(
-                        AnnouncementCampaignFallback.campaign_id == campaign.id,
-                        AnnouncementCampaignFallback.enabled.is_(True),
-                    )
-                )
-                fallback = fallback_result.scalar_one_or_none()
-                if fallback:
-                    fallback_item = UserAnnouncementRead(
-                        campaign_code=campaign.code,
-                        subject=None,
-                        group_number=None,
-                        title=fallback.title.strip(),
-                        text=fallback.text.strip(),
-                        starts_at=campaign.starts_at,
-                        ends_at=campaign.ends_at,
-                    )
-
-        if announcements_by_subject:
-            ordered: list[UserAnnouncementRead] = []
-            for subject in ("math", "cs"):
-                item = announcements_by_subject.get(subject)
-                if item:
-                    ordered.append(item)
-            return ordered[:2]
+        )
+        return [tuple(row) for row in result.all()]
 
-        return [fallback_item] if fallback_item else []
+    async def list_assignment_groups(self, campaign_id: int, subject: str) -> list[tuple[int, int]]:
+        result = await self.db.execute(
+            select(AnnouncementAssignment.user_id, AnnouncementAssignment.group_number).where(
+                AnnouncementAssignment.campaign_id == campaign_id,
+                AnnouncementAssignment.subject == subject,
+            )
+        )
+        return [tuple(row) for row in result.all()]
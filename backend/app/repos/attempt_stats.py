@@ -0,0 +1,65 @@
+from collections.abc import Mapping
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.attempt import Attempt, AttemptStatus
+from app.models.attempt_stats import AttemptStatsBucket
+
+COUNTERS = ("attempts_started", "attempts_submitted", "attempts_expired", "diploma_downloads")
+
+
+class AttemptStatsRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add_deltas(self, deltas: Mapping[tuple[datetime, str], int]) -> None:
+        """Add counter deltas keyed by (bucket_start, counter); one upsert for all buckets."""
+        rows: dict[datetime, dict] = {}
+        for (bucket_start, counter), delta in deltas.items():
+            row = rows.setdefault(bucket_start, {"bucket_start": bucket_start, **dict.fromkeys(COUNTERS, 0)})
+            row[counter] += delta
+        if not rows:
+            return
+        stmt = insert(AttemptStatsBucket).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bucket_start"],
+            set_={
+                counter: getattr(AttemptStatsBucket, counter) + getattr(stmt.excluded, counter)
+                for counter in COUNTERS
+            },
+        )
+        await self.db.execute(stmt)
+        await self.db.commit()
+
+    async def list_buckets(self, start: datetime, end: datetime) -> list[AttemptStatsBucket]:
+        res = await self.db.execute(
+            select(AttemptStatsBucket)
+            .where(AttemptStatsBucket.bucket_start >= start, AttemptStatsBucket.bucket_start <= end)
+            .order_by(AttemptStatsBucket.bucket_start.asc())
+        )
+        return list(res.scalars().all())
+
+    async def total(self, counter: str) -> int:
+        value = await self.db.scalar(select(func.coalesce(func.sum(getattr(AttemptStatsBucket, counter)), 0)))
+        return int(value or 0)
+
+    async def list_active_attempts(self) -> list[tuple[int, int, datetime]]:
+        res = await self.db.execute(
+            select(Attempt.id, Attempt.user_id, Attempt.deadline_at).where(Attempt.status == AttemptStatus.active)
+        )
+        return [tuple(row) for row in res.all()]
+
+    async def count_active(self, now: datetime) -> tuple[int, int, int]:
+        """(active, active with open deadline, distinct users with an open attempt) straight from attempts."""
+        open_filter = (Attempt.status == AttemptStatus.active, Attempt.deadline_at > now)
+        active = await self.db.scalar(
+            select(func.count()).select_from(Attempt).where(Attempt.status == AttemptStatus.active)
+        )
+        active_open = await self.db.scalar(select(func.count()).select_from(Attempt).where(*open_filter))
+        users_open = await self.db.scalar(
+            select(func.count(func.distinct(Attempt.user_id))).select_from(Attempt).where(*open_filter)
+        )
+        return int(active or 0), int(active_open or 0), int(users_open or 0)
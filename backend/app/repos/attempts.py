@@ -1,13 +1,15 @@
 """Attempt repository."""
+from collections.abc import Sequence
 from datetime import datetime
-from sqlalchemy import select, update, delete
+from sqlalchemy import and_, delete, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
 
-from app.models.attempt import Attempt, AttemptAnswer, AttemptStatus, AttemptTaskGrade
+from app.models.attempt import Attempt, AttemptAnswer, AttemptGrade, AttemptStatus, AttemptTaskGrade
 from app.models.olympiad import Olympiad
 from app.models.olympiad_task import OlympiadTask
 from app.models.task import Task
+from app.models.user import User
 
 
 class AttemptsRepo:
@@ -37,6 +39,10 @@ class AttemptsRepo:
         res = await self.db.execute(select(Attempt).where(Attempt.id == attempt_id))
         return res.scalar_one_or_none()
 
+    async def get_attempt_status(self, attempt_id: int) -> AttemptStatus | None:
+        res = await self.db.execute(select(Attempt.status).where(Attempt.id == attempt_id))
+        return res.scalar_one_or_none()
+
     async def get_attempt_by_user_olympiad(self, user_id: int, olympiad_id: int) -> Attempt | None:
         res = await self.db.execute(
             select(Attempt).where(Attempt.user_id == user_id, Attempt.olympiad_id == olympiad_id)
@@ -65,28 +71,6 @@ class AttemptsRepo:
         )
         await self.db.commit()
 
-    async def mark_submitted_with_grade(
-        self,
-        *,
-        attempt_id: int,
-        score_total: int,
-        score_max: int,
-        passed: bool,
-        graded_at: datetime,
-    ) -> None:
-        await self.db.execute(
-            update(Attempt)
-            .where(Attempt.id == attempt_id)
-            .values(
-                status=AttemptStatus.submitted,
-                score_total=score_total,
-                score_max=score_max,
-                passed=passed,
-                graded_at=graded_at,
-            )
-        )
-        await self.db.commit()
-
     async def mark_expired(self, attempt_id: int) -> None:
         await self.db.execute(
             update(Attempt)
@@ -95,32 +79,18 @@ class AttemptsRepo:
         )
         await self.db.commit()
 
-    async def mark_expired_with_grade(
-        self,
-        *,
-        attempt_id: int,
-        score_total: int,
-        score_max: int,
-        passed: bool,
-        graded_at: datetime,
-    ) -> None:
-        await self.db.execute(
-            update(Attempt)
-            .where(Attempt.id == attempt_id)
-            .values(
-                status=AttemptStatus.expired,
-                score_total=score_total,
-                score_max=score_max,
-                passed=passed,
-                graded_at=graded_at,
-            )
-        )
-        await self.db.commit()
-
     async def list_answers(self, attempt_id: int) -> list[AttemptAnswer]:
         res = await self.db.execute(select(AttemptAnswer).where(AttemptAnswer.attempt_id == attempt_id))
         return list(res.scalars().all())
 
+    async def list_answers_for_attempts(self, attempt_ids: Sequence[int]) -> list[AttemptAnswer]:
+        if not attempt_ids:
+            return []
+        res = await self.db.execute(
+            select(AttemptAnswer).where(AttemptAnswer.attempt_id.in_(attempt_ids))
+        )
+        return list(res.scalars().all())
+
     async def upsert_answer(self, *, attempt_id: int, task_id: int, answer_payload: dict, updated_at: datetime) -> AttemptAnswer:
         stmt = insert(AttemptAnswer).values(
             attempt_id=attempt_id,
@@ -137,40 +107,125 @@ class AttemptsRepo:
         row = res.scalar_one()
         return row
 
+    async def upsert_answers(self, rows: Sequence[dict], *, chunk_size: int = 1000) -> None:
+        """Multi-row upsert; an older ``updated_at`` never overwrites a newer answer."""
+        for start in range(0, len(rows), chunk_size):
+            stmt = insert(AttemptAnswer).values(list(rows[start:start + chunk_size]))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["attempt_id", "task_id"],
+                set_={
+                    "answer_payload": stmt.excluded.answer_payload,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+                where=AttemptAnswer.updated_at <= stmt.excluded.updated_at,
+            )
+            await self.db.execute(stmt)
+        await self.db.commit()
+
     async def list_grades(self, attempt_id: int) -> list[AttemptTaskGrade]:
         res = await self.db.execute(
             select(AttemptTaskGrade).where(AttemptTaskGrade.attempt_id == attempt_id)
         )
         return list(res.scalars().all())
 
-    async def delete_grades(self, attempt_id: int) -> None:
+    async def save_grades(self, grades: Sequence[AttemptGrade], *, status: AttemptStatus) -> list[int]:
+        """Replace task grades and attempt scores in a single transaction.
+
+        Only attempts that are still open (``active``, or ``expired`` without a
+        grade) are written; their rows are locked first, so of two concurrent
+        graders (submit, expire-on-read, the overdue sweep) only the first one
+        closes an attempt. Returns the ids that were graded.
+        """
+        if not grades:
+            return []
+        res = await self.db.execute(
+            select(Attempt.id)
+            .where(
+                Attempt.id.in_([g.attempt_id for g in grades]),
+                or_(
+                    Attempt.status == AttemptStatus.active,
+                    and_(
+                        Attempt.status == AttemptStatus.expired,
+                        or_(Attempt.graded_at.is_(None), Attempt.score_max == 0),
+                    ),
+                ),
+            )
+            .with_for_update()
+        )
+        open_ids = set(res.scalars().all())
+        grades = [g for g in grades if g.attempt_id in open_ids]
+        if not grades:
+            await self.db.commit()
+            return []
+        attempt_ids = [g.attempt_id for g in grades]
         await self.db.execute(
-            delete(AttemptTaskGrade).where(AttemptTaskGrade.attempt_id == attempt_id)
+            delete(AttemptTaskGrade).where(AttemptTaskGrade.attempt_id.in_(attempt_ids))
         )
+        rows = [
+            {
+                "attempt_id": g.attempt_id,
+                "task_id": t.task_id,
+                "is_correct": t.is_correct,
+                "score": t.score,
+                "max_score": t.max_score,
+                "graded_at": g.graded_at,
+            }
+            for g in grades
+            for t in g.tasks
+        ]
+        if rows:
+            await self.db.execute(insert(AttemptTaskGrade), rows)
+
+        if len(grades) == 1:
+            # одиночное обновление синхронизирует загруженный в сессию Attempt
+            g = grades[0]
+            await self.db.execute(
+                update(Attempt)
+                .where(Attempt.id == g.attempt_id)
+                .values(
+                    status=status,
+                    score_total=g.score_total,
+                    score_max=g.score_max,
+                    passed=g.passed,
+                    graded_at=g.graded_at,
+                )
+            )
+        else:
+            await self.db.execute(
+                update(Attempt),
+                [
+                    {
+                        "id": g.attempt_id,
+                        "status": status,
+                        "score_total": g.score_total,
+                        "score_max": g.score_max,
+                        "passed": g.passed,
+                        "graded_at": g.graded_at,
+                    }
+                    for g in grades
+                ],
+            )
         await self.db.commit()
+        return attempt_ids
 
-    async def add_grade(
-        self,
-        *,
-        attempt_id: int,
-        task_id: int,
-        is_correct: bool,
-        score: int,
-        max_score: int,
-        graded_at: datetime,
-    ) -> AttemptTaskGrade:
-        obj = AttemptTaskGrade(
-            attempt_id=attempt_id,
-            task_id=task_id,
-            is_correct=is_correct,
-            score=score,
-            max_score=max_score,
-            graded_at=graded_at,
+    async def list_overdue_attempts(self, *, now: datetime, after_id: int, limit: int) -> list[Attempt]:
+        # active с истёкшим дедлайном и expired без оценки; keyset по id
+        res = await self.db.execute(
+            select(Attempt)
+            .where(
+                Attempt.id > after_id,
+                or_(
+                    and_(Attempt.status == AttemptStatus.active, Attempt.deadline_at < now),
+                    and_(
+                        Attempt.status == AttemptStatus.expired,
+                        or_(Attempt.graded_at.is_(None), Attempt.score_max == 0),
+                    ),
+                ),
+            )
+            .order_by(Attempt.id.asc())
+            .limit(limit)
         )
-        self.db.add(obj)
-        await self.db.commit()
-        await self.db.refresh(obj)
-        return obj
+        return list(res.scalars().all())
 
     async def list_attempts_for_olympiad(self, olympiad_id: int) -> list[Attempt]:
         res = await self.db.execute(
@@ -182,6 +237,47 @@ class AttemptsRepo:
         # Оставим на будущее join с users; сейчас минимально — попытки.
         return await self.list_attempts_for_olympiad(olympiad_id)
 
+    async def list_diploma_rows(self, olympiad_id: int) -> list[dict]:
+        """Passed attempts with the student's name/school and the place among all finished attempts."""
+        finished = (
+            select(
+                Attempt.id,
+                Attempt.user_id,
+                Attempt.score_total,
+                Attempt.score_max,
+                Attempt.passed,
+                func.rank().over(order_by=Attempt.score_total.desc()).label("place"),
+            )
+            .where(Attempt.olympiad_id == olympiad_id, Attempt.status != AttemptStatus.active)
+            .subquery()
+        )
+        res = await self.db.execute(
+            select(
+                finished.c.id,
+                finished.c.score_total,
+                finished.c.score_max,
+                finished.c.place,
+                User.surname,
+                User.name,
+                User.father_name,
+                User.school,
+            )
+            .join(User, User.id == finished.c.user_id)
+            .where(finished.c.passed.is_(True))
+            .order_by(finished.c.id.asc())
+        )
+        return [
+            {
+                "attempt_id": row.id,
+                "name": " ".join(part for part in (row.surname, row.name, row.father_name) if part),
+                "school": row.school or "",
+                "score": row.score_total,
+                "score_max": row.score_max,
+                "place": row.place,
+            }
+            for row in res.all()
+        ]
+
     async def list_attempts_for_user(self, user_id: int) -> list[Attempt]:
         res = await self.db.execute(
             select(Attempt).where(Attempt.user_id == user_id).order_by(Attempt.id.desc())
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.audit_log import AuditLog
@@ -40,6 +40,12 @@ class AuditLogsRepo:
         await self.db.refresh(obj)
         return obj
 
+    async def create_many(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+        await self.db.execute(insert(AuditLog), rows)
+        await self.db.commit()
+
     async def list(
         self,
         *,
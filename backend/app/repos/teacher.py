@@ -1,5 +1,7 @@
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import String, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+from sqlalchemy.orm import aliased
 
 from app.models.user import User
 from app.models.olympiad import Olympiad
@@ -52,17 +54,39 @@ class TeacherRepo:
         )
         return list(res.scalars().all())
 
-    async def list_attempts_for_olympiad_with_users(self, olympiad_id: int):
+    @staticmethod
+    def _page(stmt, *, limit: int | None, before_id: int | None):
+        # keyset-пагинация: попытки идут по убыванию id
+        if before_id is not None:
+            stmt = stmt.where(Attempt.id < before_id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+    async def list_attempts_for_olympiad_with_users(
+        self,
+        olympiad_id: int,
+        *,
+        limit: int | None = None,
+        before_id: int | None = None,
+    ):
         stmt = (
             select(Attempt, User)
             .join(User, User.id == Attempt.user_id)
             .where(Attempt.olympiad_id == olympiad_id)
             .order_by(Attempt.id.desc())
         )
-        res = await self.db.execute(stmt)
+        res = await self.db.execute(self._page(stmt, limit=limit, before_id=before_id))
         return res.all()  # list[tuple[Attempt, User]]
 
-    async def list_attempts_for_olympiad_with_users_for_teacher(self, olympiad_id: int, teacher_id: int):
+    async def list_attempts_for_olympiad_with_users_for_teacher(
+        self,
+        olympiad_id: int,
+        teacher_id: int,
+        *,
+        limit: int | None = None,
+        before_id: int | None = None,
+    ):
         stmt = (
             select(Attempt, User)
             .join(User, User.id == Attempt.user_id)
@@ -74,5 +98,61 @@ class TeacherRepo:
             )
             .order_by(Attempt.id.desc())
         )
-        res = await self.db.execute(stmt)
+        res = await self.db.execute(self._page(stmt, limit=limit, before_id=before_id))
         return res.all()
+
+    async def stream_olympiad_export(self, olympiad_id: int, *, yield_per: int) -> AsyncResult:
+        """Server-side cursor over all attempts of an olympiad with teachers and per-task scores."""
+        teacher = aliased(User)
+        teacher_names = (
+            select(
+                func.array_agg(
+                    aggregate_order_by(
+                        func.concat_ws(" ", teacher.surname, teacher.name, teacher.father_name),
+                        TeacherStudent.id.desc(),
+                    ),
+                    type_=ARRAY(String),
+                )
+            )
+            .select_from(TeacherStudent)
+            .join(teacher, teacher.id == TeacherStudent.teacher_id)
+            .where(
+                TeacherStudent.student_id == Attempt.user_id,
+                TeacherStudent.status == TeacherStudentStatus.confirmed,
+            )
+            .correlate(Attempt)
+            .scalar_subquery()
+        )
+        task_scores = (
+            select(func.jsonb_object_agg(AttemptTaskGrade.task_id, AttemptTaskGrade.score, type_=JSONB))
+            .where(AttemptTaskGrade.attempt_id == Attempt.id)
+            .correlate(Attempt)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(
+                Attempt.id,
+                Attempt.user_id,
+                User.login,
+                User.surname,
+                User.name,
+                User.father_name,
+                User.gender,
+                User.class_grade,
+                User.city,
+                User.school,
+                User.manual_teachers,
+                Attempt.started_at,
+                Attempt.graded_at,
+                Attempt.duration_sec,
+                Attempt.score_total,
+                Attempt.score_max,
+                teacher_names.label("teacher_names"),
+                task_scores.label("task_scores"),
+            )
+            .join(User, User.id == Attempt.user_id)
+            .where(Attempt.olympiad_id == olympiad_id)
+            .order_by(Attempt.id.asc())
+            .execution_options(yield_per=yield_per)
+        )
+        return await self.db.stream(stmt)
@@ -0,0 +1,63 @@
+from collections.abc import Sequence
+
+from sqlalchemy import delete, exists, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.teacher_certificate import TeacherCertificate
+from app.models.user import User, UserRole
+
+INSERT_CHUNK_SIZE = 5000
+
+
+class TeacherCertificatesRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_for_teacher(self, teacher_id: int, season: str) -> list[TeacherCertificate]:
+        res = await self.db.execute(
+            select(TeacherCertificate)
+            .where(TeacherCertificate.teacher_id == teacher_id, TeacherCertificate.season == season)
+            .order_by(TeacherCertificate.seq.asc())
+        )
+        return list(res.scalars().all())
+
+    async def season_indexed(self, season: str) -> bool:
+        res = await self.db.execute(select(exists().where(TeacherCertificate.season == season)))
+        return bool(res.scalar())
+
+    async def _teacher_ids(self, ids: set[int]) -> set[int]:
+        if not ids:
+            return set()
+        res = await self.db.execute(select(User.id).where(User.id.in_(ids), User.role == UserRole.teacher))
+        return set(res.scalars().all())
+
+    async def _insert(self, rows: Sequence[dict], *, upsert: bool) -> None:
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            stmt = insert(TeacherCertificate).values(list(rows[start:start + INSERT_CHUNK_SIZE]))
+            if upsert:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["teacher_id", "season", "seq"],
+                    set_={"key": stmt.excluded.key},
+                )
+            await self.db.execute(stmt)
+
+    async def add_many(self, rows: Sequence[dict]) -> int:
+        """Upsert rows ``{teacher_id, season, seq, key}``; rows of unknown teachers are dropped."""
+        teacher_ids = await self._teacher_ids({row["teacher_id"] for row in rows})
+        rows = [row for row in rows if row["teacher_id"] in teacher_ids]
+        await self._insert(rows, upsert=True)
+        await self.db.commit()
+        return len(rows)
+
+    async def replace_all(self, rows: Sequence[dict]) -> int:
+        """Replace the whole index with ``rows`` in one transaction."""
+        teacher_ids = await self._teacher_ids({row["teacher_id"] for row in rows})
+        unique: dict[tuple[int, str, int], dict] = {}
+        for row in rows:
+            if row["teacher_id"] in teacher_ids:
+                unique[(row["teacher_id"], row["season"], row["seq"])] = row
+        await self.db.execute(delete(TeacherCertificate))
+        await self._insert(list(unique.values()), upsert=False)
+        await self.db.commit()
+        return len(unique)
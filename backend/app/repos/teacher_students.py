@@ -88,6 +88,31 @@ class TeacherStudentsRepo:
         res = await self.db.execute(stmt.order_by(TeacherStudent.id.desc()))
         return res.all()
 
+    async def list_teacher_names_for_students(
+        self,
+        student_ids: list[int],
+        status: TeacherStudentStatus | None,
+        *,
+        chunk_size: int = 1000,
+    ) -> dict[int, list[str]]:
+        """Teacher full names per student, newest link first; one query per chunk of ids."""
+        ids = list(dict.fromkeys(student_ids))
+        names: dict[int, list[str]] = {}
+        for start in range(0, len(ids), chunk_size):
+            stmt = (
+                select(TeacherStudent.student_id, User.surname, User.name, User.father_name)
+                .join(User, User.id == TeacherStudent.teacher_id)
+                .where(TeacherStudent.student_id.in_(ids[start : start + chunk_size]))
+            )
+            if status is not None:
+                stmt = stmt.where(TeacherStudent.status == status)
+            res = await self.db.execute(stmt.order_by(TeacherStudent.id.desc()))
+            for student_id, surname, name, father_name in res.all():
+                full_name = " ".join(filter(None, [surname, name, father_name]))
+                if full_name:
+                    names.setdefault(student_id, []).append(full_name)
+        return names
+
     async def delete_link(self, link: TeacherStudent) -> None:
         await self.db.delete(link)
         await self.db.commit()
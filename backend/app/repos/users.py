@@ -1,11 +1,36 @@
 from __future__ import annotations
 
-from sqlalchemy import select, func
+import json
+
+from sqlalchemy import ClauseElement, Executable, and_, select, func
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
 from app.core import error_codes as codes
+from app.core.auth_context import invalidate_user
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User, Gender
 
+_SEARCH_TEXT = User.__table__.c.search_text
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _ilike_indexed(column, value: str):
+    # search_text содержит значение колонки, поэтому условие по нему лишь сужает
+    # выборку через GIN-индекс, а точную проверку делает ILIKE по самой колонке
+    pattern = f"%{value}%"
+    return and_(_SEARCH_TEXT.ilike(pattern), column.ilike(pattern))
+
 
 class UsersRepo:
     def __init__(self, db: AsyncSession):
@@ -72,10 +97,14 @@ class UsersRepo:
         subject: str | None = None,
         gender: str | None = None,
         subscription: int | None = None,
+        q: str | None = None,
+        after_id: int | None = None,
         limit: int = 50,
         offset: int = 0,
     ) -> list[User]:
         stmt = select(User).order_by(User.id).limit(limit).offset(offset)
+        if after_id is not None:
+            stmt = stmt.where(User.id > after_id)
         stmt = self._apply_filters(
             stmt,
             user_id=user_id,
@@ -97,6 +126,7 @@ class UsersRepo:
             subject=subject,
             gender=gender,
             subscription=subscription,
+            q=q,
         )
         res = await self.db.execute(stmt)
         return list(res.scalars().all())
@@ -123,6 +153,7 @@ class UsersRepo:
         subject: str | None = None,
         gender: str | None = None,
         subscription: int | None = None,
+        q: str | None = None,
     ) -> int:
         stmt = select(func.count()).select_from(User)
         stmt = self._apply_filters(
@@ -146,33 +177,52 @@ class UsersRepo:
             subject=subject,
             gender=gender,
             subscription=subscription,
+            q=q,
         )
         res = await self.db.execute(stmt)
         return int(res.scalar_one())
 
+    async def estimate_count(self, *, estimate_above: int | None, **filters) -> tuple[int, bool]:
+        """``(count, is_estimate)`` for the filters.
+
+        The planner estimate from ``EXPLAIN`` is returned as is when it reaches
+        ``estimate_above``; smaller results (or ``estimate_above=None``) are
+        counted exactly.
+        """
+        if estimate_above is None:
+            return await self.count(**filters), False
+        plan = (await self.db.execute(_Explain(self._apply_filters(select(User.id), **filters)))).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimated = int(plan[0]["Plan"]["Plan Rows"])
+        if estimated < estimate_above:
+            return await self.count(**filters), False
+        return estimated, True
+
     def _apply_filters(
         self,
         stmt,
         *,
-        user_id: int | None,
-        role,
-        is_active: bool | None,
-        is_email_verified: bool | None,
-        must_change_password: bool | None,
-        is_moderator: bool | None,
-        moderator_requested: bool | None,
-        login: str | None,
-        email: str | None,
-        surname: str | None,
-        name: str | None,
-        father_name: str | None,
-        country: str | None,
-        city: str | None,
-        school: str | None,
-        class_grade: int | None,
-        subject: str | None,
-        gender: str | None,
-        subscription: int | None,
+        user_id: int | None = None,
+        role=None,
+        is_active: bool | None = None,
+        is_email_verified: bool | None = None,
+        must_change_password: bool | None = None,
+        is_moderator: bool | None = None,
+        moderator_requested: bool | None = None,
+        login: str | None = None,
+        email: str | None = None,
+        surname: str | None = None,
+        name: str | None = None,
+        father_name: str | None = None,
+        country: str | None = None,
+        city: str | None = None,
+        school: str | None = None,
+        class_grade: int | None = None,
+        subject: str | None = None,
+        gender: str | None = None,
+        subscription: int | None = None,
+        q: str | None = None,
     ):
         if user_id is not None:
             stmt = stmt.where(User.id == user_id)
@@ -189,25 +239,25 @@ class UsersRepo:
         if moderator_requested is not None:
             stmt = stmt.where(User.moderator_requested == moderator_requested)
         if login:
-            stmt = stmt.where(User.login.ilike(f"%{login}%"))
+            stmt = stmt.where(_ilike_indexed(User.login, login))
         if email:
-            stmt = stmt.where(User.email.ilike(f"%{email}%"))
+            stmt = stmt.where(_ilike_indexed(User.email, email))
         if surname:
-            stmt = stmt.where(User.surname.ilike(f"%{surname}%"))
+            stmt = stmt.where(_ilike_indexed(User.surname, surname))
         if name:
-            stmt = stmt.where(User.name.ilike(f"%{name}%"))
+            stmt = stmt.where(_ilike_indexed(User.name, name))
         if father_name:
-            stmt = stmt.where(User.father_name.ilike(f"%{father_name}%"))
+            stmt = stmt.where(_ilike_indexed(User.father_name, father_name))
         if country:
             stmt = stmt.where(User.country.ilike(f"%{country}%"))
         if city:
-            stmt = stmt.where(User.city.ilike(f"%{city}%"))
+            stmt = stmt.where(_ilike_indexed(User.city, city))
         if school:
-            stmt = stmt.where(User.school.ilike(f"%{school}%"))
+            stmt = stmt.where(_ilike_indexed(User.school, school))
         if class_grade is not None:
             stmt = stmt.where(User.class_grade == class_grade)
         if subject:
-            stmt = stmt.where(User.subject.ilike(f"%{subject}%"))
+            stmt = stmt.where(_ilike_indexed(User.subject, subject))
         if gender:
             try:
                 stmt = stmt.where(User.gender == Gender(gender))
@@ -215,6 +265,9 @@ class UsersRepo:
                 stmt = stmt.where(User.gender == gender)
         if subscription is not None:
             stmt = stmt.where(User.subscription == subscription)
+        if q:
+            for term in q.split():
+                stmt = stmt.where(_SEARCH_TEXT.icontains(term, autoescape=True))
         return stmt
 
     async def create(
@@ -278,12 +331,14 @@ class UsersRepo:
         for k, v in data.items():
             setattr(user, k, v)
         await self.db.commit()
+        await invalidate_user(user.id)
         await self.db.refresh(user)
         return user
 
     async def set_email_verified(self, user: User) -> User:
         user.is_email_verified = True
         await self.db.commit()
+        await invalidate_user(user.id)
         await self.db.refresh(user)
         return user
 
@@ -301,12 +356,14 @@ class UsersRepo:
         if temp_password_expires_at is not None:
             user.temp_password_expires_at = temp_password_expires_at
         await self.db.commit()
+        await invalidate_user(user.id)
         await self.db.refresh(user)
         return user
 
     async def set_moderator_request(self, user: User, requested: bool) -> User:
         user.moderator_requested = requested
         await self.db.commit()
+        await invalidate_user(user.id)
         await self.db.refresh(user)
         return user
 
@@ -314,5 +371,6 @@ class UsersRepo:
         user.is_moderator = is_moderator
         user.moderator_requested = False
         await self.db.commit()
+        await invalidate_user(user.id)
         await self.db.refresh(user)
         return user
@@ -1,7 +1,7 @@
 """Attempt schemas."""
 from datetime import datetime
 from typing import Any, List, Optional
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, ConfigDict
 from app.models.task import TaskType
 
 from app.models.attempt import AttemptStatus
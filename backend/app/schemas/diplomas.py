@@ -0,0 +1,54 @@
+from datetime import datetime
+from string import Formatter
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator
+
+PLACEHOLDERS = {"name", "school", "score", "score_max", "place"}
+
+
+class DiplomaTextField(BaseModel):
+    text: str = Field(min_length=1, max_length=500)
+    x: int = Field(ge=0)
+    y: int = Field(ge=0)
+    font_size: int = Field(default=48, ge=8, le=400)
+    bold: bool = False
+    color: str = Field(default="#000000", pattern=r"^#[0-9a-fA-F]{6}$")
+    align: Literal["left", "center", "right"] = "center"
+    max_width: int | None = Field(default=None, ge=1)
+
+    @field_validator("text")
+    @classmethod
+    def validate_placeholders(cls, value: str) -> str:
+        try:
+            names = [name for _, name, _, _ in Formatter().parse(value) if name is not None]
+        except ValueError as exc:
+            raise ValueError("invalid_placeholder") from exc
+        if any(name not in PLACEHOLDERS for name in names):
+            raise ValueError("invalid_placeholder")
+        return value
+
+
+class DiplomaTemplate(BaseModel):
+    """Background image already uploaded to storage plus where to draw each value.
+
+    ``text`` may use ``{name}``, ``{school}``, ``{score}``, ``{score_max}`` and ``{place}``.
+    """
+
+    background_key: str = Field(min_length=1, max_length=512)
+    name: DiplomaTextField | None = None
+    school: DiplomaTextField | None = None
+    score: DiplomaTextField | None = None
+    place: DiplomaTextField | None = None
+    jpeg_quality: int = Field(default=90, ge=50, le=100)
+
+
+class DiplomaRenderStatus(BaseModel):
+    job_id: str
+    olympiad_id: int
+    status: Literal["queued", "running", "done", "failed"]
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    error: str | None = None
+    updated_at: datetime
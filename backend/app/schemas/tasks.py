@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Literal, Optional
+from typing import Any, Optional
 from pydantic import BaseModel, Field, model_validator, ConfigDict
 
 from app.models.task import Subject, TaskType
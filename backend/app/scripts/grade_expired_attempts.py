@@ -3,16 +3,15 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-import math
 from datetime import datetime, timezone
 from typing import Sequence
 
-from sqlalchemy import delete, select, update, or_
+from sqlalchemy import select, or_
 
 from app.db.session import SessionLocal
-from app.models.attempt import Attempt, AttemptStatus, AttemptTaskGrade
+from app.models.attempt import Attempt, AttemptStatus
 from app.repos.attempts import AttemptsRepo
-from app.services.attempts import AttemptsService
+from app.services import answer_buffer, grading
 
 
 def _now_utc() -> datetime:
@@ -36,7 +35,6 @@ async def _load_attempts(repo: AttemptsRepo, limit: int | None) -> Sequence[Atte
 
 async def _grade_attempt(
     repo: AttemptsRepo,
-    service: AttemptsService,
     attempt: Attempt,
     *,
     use_now: bool,
@@ -47,61 +45,24 @@ async def _grade_attempt(
         raise RuntimeError(f"Olympiad {attempt.olympiad_id} not found for attempt {attempt.id}")
 
     tasks = await repo.list_tasks_full(attempt.olympiad_id)
-    answers = await repo.list_answers(attempt.id)
-    answers_by_task = {a.task_id: a for a in answers}
-
-    score_total = 0
-    score_max = 0
-    graded_at = _now_utc() if use_now else (attempt.deadline_at or _now_utc())
-
-    grades: list[AttemptTaskGrade] = []
-    for olymp_task, task in tasks:
-        score_max += int(olymp_task.max_score)
-        answer = answers_by_task.get(task.id)
-        answer_payload = None if answer is None else answer.answer_payload
-        is_correct = service._grade_task(task.task_type, task.payload, answer_payload)
-        score = int(olymp_task.max_score) if is_correct else 0
-        score_total += score
-        grades.append(
-            AttemptTaskGrade(
-                attempt_id=attempt.id,
-                task_id=task.id,
-                is_correct=is_correct,
-                score=score,
-                max_score=int(olymp_task.max_score),
-                graded_at=graded_at,
-            )
-        )
-
-    pass_score = math.ceil(score_max * int(olympiad.pass_percent) / 100) if score_max > 0 else 0
-    passed = score_total >= pass_score
-
-    if dry_run:
-        return score_total, score_max, passed, graded_at
-
-    await repo.db.execute(delete(AttemptTaskGrade).where(AttemptTaskGrade.attempt_id == attempt.id))
-    for grade in grades:
-        repo.db.add(grade)
-
-    await repo.db.execute(
-        update(Attempt)
-        .where(Attempt.id == attempt.id)
-        .values(
-            status=AttemptStatus.expired,
-            score_total=score_total,
-            score_max=score_max,
-            passed=passed,
-            graded_at=graded_at,
-        )
+    # автосохранения из write-behind буфера; в dry-run только читаем, не сбрасывая в БД
+    answers = await answer_buffer.load_answers(repo, attempt.id, flush=not dry_run, close=not dry_run)
+    grade = grading.compute_attempt_grade(
+        attempt_id=attempt.id,
+        answer_key=grading.AnswerKey(tasks),
+        answers_by_task=grading.answers_payload_map(answers),
+        pass_percent=olympiad.pass_percent,
+        graded_at=_now_utc() if use_now else (attempt.deadline_at or _now_utc()),
     )
-    await repo.db.commit()
-    return score_total, score_max, passed, graded_at
+
+    if not dry_run:
+        await repo.save_grades([grade], status=AttemptStatus.expired)
+    return grade.score_total, grade.score_max, grade.passed, grade.graded_at
 
 
 async def _run(limit: int | None, dry_run: bool, use_now: bool) -> int:
     async with SessionLocal() as session:
         repo = AttemptsRepo(session)
-        service = AttemptsService(repo)
 
         attempts = await _load_attempts(repo, limit)
         print(f"Found {len(attempts)} expired attempts without grades.")
@@ -113,7 +74,6 @@ async def _run(limit: int | None, dry_run: bool, use_now: bool) -> int:
             try:
                 score_total, score_max, passed, graded_at = await _grade_attempt(
                     repo,
-                    service,
                     attempt,
                     use_now=use_now,
                     dry_run=dry_run,
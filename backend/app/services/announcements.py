@@ -0,0 +1,272 @@
+"""Announcement resolution for the student cabinet.
+
+Active campaigns with their group messages and fallbacks are loaded with one
+joined query and kept in the process L1 cache (``local_cache``); the admin
+endpoints drop the snapshot on every change. Per-user group numbers are read
+from compact Redis hashes ``ann:assign:{campaign_id}:{subject}`` (field =
+user id, value = group number) that are written when a CSV is imported and
+live for a day; if a hash is missing, the first request to notice it queues
+the ``announcements.load_assignments`` Celery task and, until the worker has
+swapped the hash in or while Redis is down, the assignments come from one SQL
+query.
+"""
+from __future__ import annotations
+
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import invalidate_keys, local_cache
+from app.core.celery_app import celery_app
+from app.core.redis import mark_redis_down, redis_marked_down, safe_redis
+from app.repos.announcements import AnnouncementsRepo
+from app.schemas.announcements import UserAnnouncementRead
+
+logger = logging.getLogger(__name__)
+
+SUBJECTS = ("math", "cs")
+ACTIVE_CAMPAIGNS_KEY = "cache:announcements:active:v1"
+# служебное поле: хэш загружен целиком, отсутствие user_id означает «нет назначения»
+LOADED_FIELD = "_loaded"
+HASH_CHUNK_SIZE = 5000
+ASSIGNMENTS_TTL_SEC = 24 * 3600
+REBUILD_LOCK_TTL_SEC = 60
+# KEYS: временный хэш, рабочий хэш, поколение; ARGV[1] — поколение, под которым читали таблицу
+SWAP_ASSIGNMENTS_LUA = """
+if (redis.call("GET", KEYS[3]) or "0") ~= ARGV[1] then
+  redis.call("DEL", KEYS[1])
+  return 0
+end
+redis.call("RENAME", KEYS[1], KEYS[2])
+return 1
+"""
+
+# по имени, а не импортом: app.tasks.announcements сам импортирует этот модуль
+LOAD_ASSIGNMENTS_TASK = "announcements.load_assignments"
+
+
+@dataclass(slots=True)
+class GroupSnapshot:
+    title: str
+    text: str
+    starts_at: datetime | None
+    ends_at: datetime | None
+
+
+@dataclass(slots=True)
+class CampaignSnapshot:
+    id: int
+    code: str
+    common_text: str
+    starts_at: datetime | None
+    ends_at: datetime | None
+    groups: dict[tuple[str, int], GroupSnapshot] = field(default_factory=dict)
+    fallback: tuple[str, str] | None = None
+
+
+def assignments_key(campaign_id: int, subject: str) -> str:
+    return f"ann:assign:{campaign_id}:{subject}"
+
+
+def _in_window(starts_at: datetime | None, ends_at: datetime | None, now: datetime) -> bool:
+    return (starts_at is None or starts_at <= now) and (ends_at is None or ends_at > now)
+
+
+async def _redis() -> Redis | None:
+    return None if redis_marked_down() else await safe_redis()
+
+
+async def _active_campaigns(repo: AnnouncementsRepo) -> list[CampaignSnapshot]:
+    cached = local_cache.get(ACTIVE_CAMPAIGNS_KEY, cache="announcements")
+    if cached is not None:
+        return cached
+    campaigns: dict[int, CampaignSnapshot] = {}
+    for campaign, group, fallback in await repo.list_active_campaign_rows():
+        snapshot = campaigns.get(campaign.id)
+        if snapshot is None:
+            snapshot = campaigns[campaign.id] = CampaignSnapshot(
+                id=campaign.id,
+                code=campaign.code,
+                common_text=campaign.common_text,
+                starts_at=campaign.starts_at,
+                ends_at=campaign.ends_at,
+                fallback=(fallback.title, fallback.text) if fallback is not None else None,
+            )
+        if group is not None:
+            snapshot.groups[(group.subject, group.group_number)] = GroupSnapshot(
+                title=group.group_title,
+                text=group.group_text,
+                starts_at=group.starts_at,
+                ends_at=group.ends_at,
+            )
+    result = list(campaigns.values())
+    local_cache.set(ACTIVE_CAMPAIGNS_KEY, result)
+    return result
+
+
+async def _cached_assignments(
+    redis: Redis,
+    user_id: int,
+    campaign_ids: list[int],
+) -> tuple[dict[tuple[int, str], int], list[tuple[int, str]]] | None:
+    """Assignments from the Redis hashes plus the (campaign, subject) pairs whose hash is not loaded."""
+    pairs = [(campaign_id, subject) for campaign_id in campaign_ids for subject in SUBJECTS]
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for campaign_id, subject in pairs:
+            pipe.hmget(assignments_key(campaign_id, subject), str(user_id), LOADED_FIELD)
+        replies = await pipe.execute()
+    except (RedisError, OSError):
+        mark_redis_down()
+        return None
+    assignments: dict[tuple[int, str], int] = {}
+    missing: list[tuple[int, str]] = []
+    for pair, (group_number, loaded) in zip(pairs, replies):
+        if loaded is None:
+            missing.append(pair)
+        elif group_number is not None:
+            assignments[pair] = int(group_number)
+    return assignments, missing
+
+
+def _schedule_assignments_load(campaign_id: int, subject: str) -> None:
+    # хэш на 30-60k строк собирает воркер, а не запрос студента; блокировка не снимается
+    # и при ошибке брокера — повторная попытка не раньше чем через REBUILD_LOCK_TTL_SEC
+    try:
+        celery_app.send_task(LOAD_ASSIGNMENTS_TASK, args=[campaign_id, subject])
+    except Exception:
+        logger.warning("announcement_assignments_schedule_failed campaign_id=%s subject=%s", campaign_id, subject, exc_info=True)
+
+
+async def _user_assignments(
+    repo: AnnouncementsRepo,
+    user_id: int,
+    campaign_ids: list[int],
+) -> dict[tuple[int, str], int]:
+    redis = await _redis()
+    cached = await _cached_assignments(redis, user_id, campaign_ids) if redis is not None else None
+    if cached is not None:
+        assignments, missing = cached
+        if not missing:
+            return assignments
+        for campaign_id, subject in missing:
+            lock_key = f"lock:{assignments_key(campaign_id, subject)}"
+            try:
+                acquired = await redis.set(lock_key, "1", nx=True, ex=REBUILD_LOCK_TTL_SEC)
+            except (RedisError, OSError):
+                mark_redis_down()
+                break
+            if acquired:
+                _schedule_assignments_load(campaign_id, subject)
+    rows = await repo.list_user_assignments(user_id, campaign_ids)
+    return {(campaign_id, subject): group_number for campaign_id, subject, group_number in rows}
+
+
+async def get_user_announcements(db: AsyncSession, user_id: int) -> list[UserAnnouncementRead]:
+    repo = AnnouncementsRepo(db)
+    now = datetime.now(timezone.utc)
+    campaigns = [c for c in await _active_campaigns(repo) if _in_window(c.starts_at, c.ends_at, now)]
+    if not campaigns:
+        return []
+    assignments = await _user_assignments(repo, user_id, [c.id for c in campaigns])
+
+    announcements_by_subject: dict[str, UserAnnouncementRead] = {}
+    fallback_item: UserAnnouncementRead | None = None
+    for campaign in campaigns:
+        for subject in SUBJECTS:
+            group_number = assignments.get((campaign.id, subject))
+            if group_number is None or subject in announcements_by_subject:
+                continue
+            group = campaign.groups.get((subject, group_number))
+            if group is None or not _in_window(group.starts_at, group.ends_at, now):
+                continue
+            text = campaign.common_text.strip()
+            if group.text.strip():
+                text = f"{text}\n\n{group.text.strip()}" if text else group.text.strip()
+            announcements_by_subject[subject] = UserAnnouncementRead(
+                campaign_code=campaign.code,
+                subject=subject,  # type: ignore[arg-type]
+                group_number=group_number,
+                title=group.title.strip(),
+                text=text,
+                starts_at=group.starts_at or campaign.starts_at,
+                ends_at=group.ends_at or campaign.ends_at,
+            )
+
+        if announcements_by_subject:
+            continue
+        if fallback_item is None and campaign.fallback is not None:
+            title, text = campaign.fallback
+            fallback_item = UserAnnouncementRead(
+                campaign_code=campaign.code,
+                subject=None,
+                group_number=None,
+                title=title.strip(),
+                text=text.strip(),
+                starts_at=campaign.starts_at,
+                ends_at=campaign.ends_at,
+            )
+
+    if announcements_by_subject:
+        return [announcements_by_subject[s] for s in SUBJECTS if s in announcements_by_subject]
+    return [fallback_item] if fallback_item else []
+
+
+async def invalidate_announcements() -> None:
+    """Drop the active-campaign snapshot in every worker."""
+    redis = await _redis()
+    try:
+        await invalidate_keys(redis, [ACTIVE_CAMPAIGNS_KEY])
+    except (RedisError, OSError):
+        mark_redis_down()
+        logger.warning("announcements_invalidation_failed", exc_info=True)
+
+
+def generation_key(campaign_id: int, subject: str) -> str:
+    return f"{assignments_key(campaign_id, subject)}:gen"
+
+
+async def load_assignments_hash(db: AsyncSession, campaign_id: int, subject: str, *, new_import: bool = False) -> bool:
+    """Rebuild ``ann:assign:{campaign_id}:{subject}`` from the table; swapped in atomically.
+
+    ``new_import`` bumps the generation first: a build that read the table
+    before the bump (e.g. a queued worker rebuild) is then dropped instead of
+    renamed over the fresher hash.
+    """
+    redis = await _redis()
+    if redis is None:
+        return False
+    key = assignments_key(campaign_id, subject)
+    gen_key = generation_key(campaign_id, subject)
+    # у каждой сборки свой временный ключ: импорт и задача воркера не портят друг другу хэш
+    tmp_key = f"{key}:loading:{uuid.uuid4().hex}"
+    try:
+        if new_import:
+            generation = str(await redis.incr(gen_key))
+        else:
+            generation = await redis.get(gen_key) or "0"
+        rows = await AnnouncementsRepo(db).list_assignment_groups(campaign_id, subject)
+        await redis.hset(tmp_key, LOADED_FIELD, "1")
+        await redis.expire(tmp_key, ASSIGNMENTS_TTL_SEC)
+        for start in range(0, len(rows), HASH_CHUNK_SIZE):
+            chunk = rows[start : start + HASH_CHUNK_SIZE]
+            await redis.hset(tmp_key, mapping={str(user_id): str(group) for user_id, group in chunk})
+        swapped = await redis.eval(SWAP_ASSIGNMENTS_LUA, 3, tmp_key, key, gen_key, generation)
+    except (RedisError, OSError):
+        mark_redis_down()
+        logger.warning("announcement_assignments_hash_failed campaign_id=%s subject=%s", campaign_id, subject)
+        try:
+            await redis.delete(tmp_key, key)
+        except (RedisError, OSError):
+            pass
+        return False
+    if not swapped:
+        # после чтения таблицы был новый импорт — его сборка свежее, эту отбрасываем
+        logger.info("announcement_assignments_hash_superseded campaign_id=%s subject=%s", campaign_id, subject)
+        return False
+    return True
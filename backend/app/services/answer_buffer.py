@@ -0,0 +1,258 @@
+"""Write-behind buffer for attempt answers.
+
+With ``ANSWERS_WRITE_BEHIND_ENABLED`` an autosave only lands in a Redis hash
+``answers:buf:{attempt_id}`` (field = task_id) and the attempt id is added to
+``answers:dirty``. A per-worker flusher claims dirty attempts with ``SPOP``
+and writes their answers with one multi-row upsert. Submit, the expire
+grading paths and the overdue sweep flush the attempt synchronously before
+grading.
+
+Nothing acknowledged is dropped: a field is removed from the hash only if it
+still holds the exact value that was written to the DB, and the DB upsert
+never replaces a newer ``updated_at`` with an older one. Grading paths mark
+the attempt closed (``answers:closed:{attempt_id}``) before their flush, and
+an answer is buffered only while neither that marker nor the submit lock
+exists; otherwise the caller writes it through to the DB. Buffer hashes expire
+``ANSWERS_WRITE_BEHIND_TTL_GRACE_SEC`` after the attempt deadline.
+
+Redis errors never fail a read: ``load_answers`` and ``flush_before_read``
+fall back to the DB copy, as if the buffer were disabled.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from types import SimpleNamespace
+
+from redis.asyncio import Redis
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.core.redis import mark_redis_down, redis_marked_down, safe_redis
+from app.db.session import SessionLocal
+from app.repos.attempts import AttemptsRepo
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = "answers:dirty"
+# дольше любого запроса автосохранения, начатого до закрытия попытки
+CLOSED_MARKER_TTL_SEC = 600
+
+# KEYS[1] = buffer hash, KEYS[2] = dirty set, KEYS[3] = submit lock, KEYS[4] = closed marker
+# ARGV[1] = task_id, ARGV[2] = value, ARGV[3] = attempt_id, ARGV[4] = ttl_sec
+BUFFER_ANSWER_LUA = r"""
+if redis.call("EXISTS", KEYS[3], KEYS[4]) > 0 then
+  return 0
+end
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+redis.call("SADD", KEYS[2], ARGV[3])
+return 1
+"""
+
+# KEYS[1] = buffer hash; ARGV = field1, value1, field2, value2, ...
+DELETE_IF_UNCHANGED_LUA = r"""
+for i = 1, #ARGV, 2 do
+  if redis.call("HGET", KEYS[1], ARGV[i]) == ARGV[i + 1] then
+    redis.call("HDEL", KEYS[1], ARGV[i])
+  end
+end
+return redis.call("HLEN", KEYS[1])
+"""
+
+
+def buffer_key(attempt_id: int) -> str:
+    return f"answers:buf:{attempt_id}"
+
+
+def closed_key(attempt_id: int) -> str:
+    return f"answers:closed:{attempt_id}"
+
+
+async def buffer_answer(
+    redis: Redis,
+    *,
+    attempt_id: int,
+    task_id: int,
+    answer_payload: dict,
+    updated_at: datetime,
+    deadline_at: datetime,
+    lock_key: str,
+) -> bool:
+    """Buffer one answer; ``False`` if the attempt is being submitted or already closed."""
+    value = json.dumps({"answer_payload": answer_payload, "updated_at": updated_at.isoformat()})
+    ttl_sec = max(int((deadline_at - updated_at).total_seconds()), 0) + settings.ANSWERS_WRITE_BEHIND_TTL_GRACE_SEC
+    buffered = await redis.eval(
+        BUFFER_ANSWER_LUA,
+        4,
+        buffer_key(attempt_id),
+        DIRTY_KEY,
+        lock_key,
+        closed_key(attempt_id),
+        str(task_id),
+        value,
+        str(attempt_id),
+        str(ttl_sec),
+    )
+    return bool(int(buffered))
+
+
+def _decode(attempt_id: int, field: str, value: str) -> SimpleNamespace:
+    data = json.loads(value)
+    return SimpleNamespace(
+        attempt_id=attempt_id,
+        task_id=int(field),
+        answer_payload=data["answer_payload"],
+        updated_at=datetime.fromisoformat(data["updated_at"]),
+    )
+
+
+async def pending_answers(redis: Redis, attempt_id: int) -> list[SimpleNamespace]:
+    raw = await redis.hgetall(buffer_key(attempt_id))
+    return [_decode(attempt_id, field, value) for field, value in raw.items()]
+
+
+def merge_answers(stored: Iterable, pending: Iterable) -> list:
+    """Overlay buffered answers on top of DB rows, newest ``updated_at`` wins."""
+    merged = {a.task_id: a for a in stored}
+    for answer in pending:
+        current = merged.get(answer.task_id)
+        if current is None or current.updated_at <= answer.updated_at:
+            merged[answer.task_id] = answer
+    return list(merged.values())
+
+
+async def flush_attempts(redis: Redis, repo: AttemptsRepo, attempt_ids: Sequence[int]) -> int:
+    if not attempt_ids:
+        return 0
+    pipe = redis.pipeline(transaction=False)
+    for attempt_id in attempt_ids:
+        pipe.hgetall(buffer_key(attempt_id))
+    snapshots = dict(zip(attempt_ids, await pipe.execute()))
+
+    rows = []
+    for attempt_id, raw in snapshots.items():
+        for field, value in raw.items():
+            answer = _decode(attempt_id, field, value)
+            rows.append(
+                {
+                    "attempt_id": attempt_id,
+                    "task_id": answer.task_id,
+                    "answer_payload": answer.answer_payload,
+                    "updated_at": answer.updated_at,
+                }
+            )
+    if not rows:
+        return 0
+    await repo.upsert_answers(rows)
+
+    pipe = redis.pipeline(transaction=False)
+    flushed_ids = [attempt_id for attempt_id, raw in snapshots.items() if raw]
+    for attempt_id in flushed_ids:
+        args = [item for pair in snapshots[attempt_id].items() for item in pair]
+        pipe.eval(DELETE_IF_UNCHANGED_LUA, 1, buffer_key(attempt_id), *args)
+    remaining = await pipe.execute()
+    # новые ответы пришли во время сброса — оставляем попытку «грязной»
+    still_dirty = [str(attempt_id) for attempt_id, left in zip(flushed_ids, remaining) if int(left) > 0]
+    if still_dirty:
+        await redis.sadd(DIRTY_KEY, *still_dirty)
+    return len(rows)
+
+
+async def _usable_redis() -> Redis | None:
+    if not settings.ANSWERS_WRITE_BEHIND_ENABLED or redis_marked_down():
+        return None
+    return await safe_redis()
+
+
+def _buffer_unavailable() -> None:
+    mark_redis_down()
+    logger.warning("answers_buffer_unavailable", exc_info=True)
+
+
+async def flush_before_read(repo: AttemptsRepo, attempt_ids: Sequence[int], *, close: bool = False) -> None:
+    """Write buffered answers of ``attempt_ids`` to the DB before reading them from there.
+
+    With ``close`` the attempts are marked closed first, so an autosave that
+    races with grading is written through to the DB instead of the buffer.
+    Redis errors are logged and the DB copy is used; DB errors propagate.
+    """
+    redis = await _usable_redis()
+    if redis is None or not attempt_ids:
+        return
+    try:
+        if close:
+            pipe = redis.pipeline(transaction=False)
+            for attempt_id in attempt_ids:
+                pipe.set(closed_key(attempt_id), "1", ex=CLOSED_MARKER_TTL_SEC)
+            await pipe.execute()
+        await flush_attempts(redis, repo, attempt_ids)
+    except SQLAlchemyError:
+        raise
+    except Exception:
+        _buffer_unavailable()
+
+
+async def load_answers(repo: AttemptsRepo, attempt_id: int, *, flush: bool = False, close: bool = False) -> list:
+    """Answers of an attempt including buffered ones.
+
+    ``flush`` writes the buffer to the DB first (grading); otherwise buffered
+    answers are only overlaid on the DB rows.
+    """
+    if flush:
+        await flush_before_read(repo, [attempt_id], close=close)
+        return await repo.list_answers(attempt_id)
+    stored = await repo.list_answers(attempt_id)
+    redis = await _usable_redis()
+    if redis is None:
+        return stored
+    try:
+        pending = await pending_answers(redis, attempt_id)
+    except Exception:
+        _buffer_unavailable()
+        return stored
+    return merge_answers(stored, pending)
+
+
+async def flush_dirty(*, redis: Redis, session_maker=SessionLocal, batch_size: int) -> int:
+    claimed = await redis.spop(DIRTY_KEY, batch_size)
+    if not claimed:
+        return 0
+    attempt_ids = [int(attempt_id) for attempt_id in claimed]
+    try:
+        async with session_maker() as session:
+            return await flush_attempts(redis, AttemptsRepo(session), attempt_ids)
+    except Exception:
+        await redis.sadd(DIRTY_KEY, *claimed)
+        raise
+
+
+async def run_flusher() -> None:
+    interval = max(settings.ANSWERS_WRITE_BEHIND_FLUSH_MS, 10) / 1000
+    while True:
+        await asyncio.sleep(interval)
+        redis = await safe_redis()
+        if redis is None:
+            continue
+        try:
+            while await flush_dirty(redis=redis, batch_size=settings.ANSWERS_WRITE_BEHIND_BATCH_SIZE):
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("answers_flush_failed")
+
+
+async def drain() -> None:
+    """Final flush on shutdown."""
+    redis = await safe_redis()
+    if redis is None:
+        return
+    try:
+        while await flush_dirty(redis=redis, batch_size=settings.ANSWERS_WRITE_BEHIND_BATCH_SIZE):
+            pass
+    except Exception:
+        logger.exception("answers_flush_failed")
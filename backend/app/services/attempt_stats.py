@@ -0,0 +1,274 @@
+"""Attempt statistics rollup for the admin dashboard.
+
+Start, submit, expire and diploma download only bump Redis: the counter delta
+goes to the ``stats:pending`` hash (field ``{bucket_epoch}:{counter}``) and
+the active-attempt gauge lives in the ``stats:active`` sorted set (member =
+attempt id, score = deadline) plus ``stats:active:users`` (attempt id ->
+user id). A per-worker flusher moves pending deltas into
+``attempt_stats_buckets`` with one additive upsert, so the dashboard reads
+O(buckets) rows instead of scanning ``attempts`` and ``audit_logs``.
+
+While Redis is down deltas are kept in process memory and flushed the same
+way. The gauge is rebuilt from ``attempts`` every ``STATS_ACTIVE_RESYNC_SEC``
+by one worker; until it is seeded the dashboard falls back to SQL counts.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta, timezone
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import mark_redis_down, redis_marked_down, safe_redis
+from app.db.session import SessionLocal
+from app.models.attempt import AttemptStatus
+from app.repos.attempt_stats import COUNTERS, AttemptStatsRepo
+
+logger = logging.getLogger(__name__)
+
+BUCKET_STEP = timedelta(minutes=30)
+PENDING_KEY = "stats:pending"
+ACTIVE_KEY = "stats:active"
+ACTIVE_USERS_KEY = "stats:active:users"
+ACTIVE_SEEDED_KEY = "stats:active:seeded"
+RESYNC_LOCK_KEY = "lock:stats:active_resync"
+
+# KEYS[1] = active zset, KEYS[2] = attempt -> user hash; ARGV[1] = now (epoch)
+ACTIVE_OVERVIEW_LUA = r"""
+local total = redis.call("ZCARD", KEYS[1])
+local open = redis.call("ZRANGEBYSCORE", KEYS[1], "(" .. ARGV[1], "+inf")
+local seen, users = {}, 0
+for _, attempt_id in ipairs(open) do
+  local user_id = redis.call("HGET", KEYS[2], attempt_id)
+  if user_id and not seen[user_id] then
+    seen[user_id] = true
+    users = users + 1
+  end
+end
+return {total, #open, users}
+"""
+
+_FINISHED_COUNTERS = {
+    AttemptStatus.submitted: "attempts_submitted",
+    AttemptStatus.expired: "attempts_expired",
+}
+
+_local_pending: Counter[tuple[int, str]] = Counter()
+_active_stale = False
+
+
+def bucket_start(at: datetime) -> datetime:
+    epoch = int(at.timestamp())
+    step = int(BUCKET_STEP.total_seconds())
+    return datetime.fromtimestamp(epoch - epoch % step, tz=timezone.utc)
+
+
+def _field(at: datetime, counter: str) -> str:
+    return f"{int(bucket_start(at).timestamp())}:{counter}"
+
+
+def _parse_field(field: str) -> tuple[int, str]:
+    epoch, _, counter = field.partition(":")
+    return int(epoch), counter
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def _redis() -> Redis | None:
+    if redis_marked_down():
+        return None
+    return await safe_redis()
+
+
+async def _record(counter: str | None, count: int, at: datetime, gauge) -> None:
+    global _active_stale
+    redis = await _redis()
+    if redis is not None:
+        try:
+            pipe = redis.pipeline(transaction=False)
+            if counter is not None and count:
+                pipe.hincrby(PENDING_KEY, _field(at, counter), count)
+            gauge(pipe)
+            await pipe.execute()
+            return
+        except (RedisError, OSError):
+            mark_redis_down()
+    if counter is not None and count:
+        _local_pending[_parse_field(_field(at, counter))] += count
+    _active_stale = True
+
+
+async def record_started(*, attempt_id: int, user_id: int, deadline_at: datetime, started_at: datetime) -> None:
+    def _gauge(pipe) -> None:
+        pipe.zadd(ACTIVE_KEY, {str(attempt_id): deadline_at.timestamp()})
+        pipe.hset(ACTIVE_USERS_KEY, str(attempt_id), str(user_id))
+
+    await _record("attempts_started", 1, started_at, _gauge)
+
+
+async def record_closed(
+    attempt_ids: Sequence[int],
+    *,
+    status: AttemptStatus | None = None,
+    at: datetime | None = None,
+) -> None:
+    """Attempts left ``active``; ``status`` also counts them as submitted/expired."""
+    if not attempt_ids:
+        return
+    members = [str(attempt_id) for attempt_id in attempt_ids]
+
+    def _gauge(pipe) -> None:
+        pipe.zrem(ACTIVE_KEY, *members)
+        pipe.hdel(ACTIVE_USERS_KEY, *members)
+
+    counter = _FINISHED_COUNTERS.get(status) if status is not None else None
+    await _record(counter, len(members), at or _now(), _gauge)
+
+
+async def record_diploma_download(at: datetime | None = None) -> None:
+    await _record("diploma_downloads", 1, at or _now(), lambda _pipe: None)
+
+
+def _to_deltas(items: Iterable[tuple[tuple[int, str], int]]) -> dict[tuple[datetime, str], int]:
+    deltas: Counter[tuple[datetime, str]] = Counter()
+    for (epoch, counter), value in items:
+        if counter in COUNTERS and value:
+            deltas[(datetime.fromtimestamp(epoch, tz=timezone.utc), counter)] += int(value)
+    return dict(deltas)
+
+
+async def _take_pending(redis: Redis | None) -> Counter[tuple[int, str]]:
+    taken = Counter(_local_pending)
+    _local_pending.clear()
+    if redis is None:
+        return taken
+    try:
+        pipe = redis.pipeline(transaction=True)
+        pipe.hgetall(PENDING_KEY)
+        pipe.delete(PENDING_KEY)
+        raw, _ = await pipe.execute()
+    except (RedisError, OSError):
+        mark_redis_down()
+        return taken
+    for field, value in raw.items():
+        taken[_parse_field(field)] += int(value)
+    return taken
+
+
+async def flush(*, session_maker=SessionLocal) -> int:
+    """Move pending deltas into ``attempt_stats_buckets``; on failure they are kept for the next run."""
+    taken = await _take_pending(await _redis())
+    deltas = _to_deltas(taken.items())
+    if not deltas:
+        return 0
+    try:
+        async with session_maker() as session:
+            await AttemptStatsRepo(session).add_deltas(deltas)
+    except Exception:
+        _local_pending.update(taken)
+        raise
+    return len(deltas)
+
+
+async def resync_active(*, session_maker=SessionLocal, force: bool = False) -> bool:
+    """Rebuild the active-attempt gauge from ``attempts``; one worker per interval."""
+    global _active_stale
+    redis = await _redis()
+    if redis is None:
+        return False
+    interval = max(settings.STATS_ACTIVE_RESYNC_SEC, 1)
+    try:
+        if not force and not await redis.set(RESYNC_LOCK_KEY, "1", nx=True, ex=interval):
+            return False
+        async with session_maker() as session:
+            rows = await AttemptStatsRepo(session).list_active_attempts()
+        pipe = redis.pipeline(transaction=True)
+        pipe.delete(ACTIVE_KEY, ACTIVE_USERS_KEY)
+        if rows:
+            pipe.zadd(ACTIVE_KEY, {str(attempt_id): deadline_at.timestamp() for attempt_id, _, deadline_at in rows})
+            pipe.hset(ACTIVE_USERS_KEY, mapping={str(attempt_id): str(user_id) for attempt_id, user_id, _ in rows})
+        pipe.set(ACTIVE_SEEDED_KEY, "1", ex=interval * 2)
+        await pipe.execute()
+    except (RedisError, OSError):
+        mark_redis_down()
+        return False
+    _active_stale = False
+    return True
+
+
+async def active_overview(db, now: datetime) -> tuple[int, int, int]:
+    """(active, active with open deadline, distinct users with an open attempt)."""
+    redis = await _redis()
+    if redis is not None and not _active_stale:
+        try:
+            if await redis.exists(ACTIVE_SEEDED_KEY):
+                total, active_open, users_open = await redis.eval(
+                    ACTIVE_OVERVIEW_LUA, 2, ACTIVE_KEY, ACTIVE_USERS_KEY, now.timestamp()
+                )
+                return int(total), int(active_open), int(users_open)
+        except (RedisError, OSError):
+            mark_redis_down()
+    return await AttemptStatsRepo(db).count_active(now)
+
+
+async def _pending_snapshot() -> Counter[tuple[int, str]]:
+    pending = Counter(_local_pending)
+    redis = await _redis()
+    if redis is not None:
+        try:
+            for field, value in (await redis.hgetall(PENDING_KEY)).items():
+                pending[_parse_field(field)] += int(value)
+        except (RedisError, OSError):
+            mark_redis_down()
+    return pending
+
+
+async def counter_total(db, counter: str) -> int:
+    pending = await _pending_snapshot()
+    unflushed = sum(value for (_epoch, name), value in pending.items() if name == counter)
+    return await AttemptStatsRepo(db).total(counter) + unflushed
+
+
+async def counter_series(db, counter: str, start: datetime, end: datetime) -> list[tuple[datetime, int]]:
+    """Value per bucket from ``start`` to ``end`` inclusive, zero-filled."""
+    values: Counter[datetime] = Counter()
+    for bucket in await AttemptStatsRepo(db).list_buckets(start, end):
+        values[bucket.bucket_start] += getattr(bucket, counter)
+    for (epoch, name), value in (await _pending_snapshot()).items():
+        if name == counter:
+            values[datetime.fromtimestamp(epoch, tz=timezone.utc)] += value
+
+    points = []
+    bucket = bucket_start(start)
+    while bucket <= end:
+        points.append((bucket, values.get(bucket, 0)))
+        bucket += BUCKET_STEP
+    return points
+
+
+async def run_flusher() -> None:
+    interval = max(settings.STATS_ROLLUP_FLUSH_SEC, 1)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush()
+            await resync_active(force=_active_stale)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("attempt_stats_flush_failed")
+
+
+async def drain() -> None:
+    """Final flush on shutdown."""
+    try:
+        await flush()
+    except Exception:
+        logger.exception("attempt_stats_flush_failed")
@@ -1,9 +1,7 @@
 """Attempts service."""
 from datetime import datetime, timedelta, timezone
-import math
 import json
 import time
-import re
 from types import SimpleNamespace
 
 from app.core.config import settings
@@ -14,17 +12,23 @@ from app.core.metrics import (
     REDIS_CACHE_MISSES_TOTAL,
     REDIS_OP_LATENCY_SECONDS,
 )
-from app.core.redis import get_redis, safe_redis
-from app.core.cache import olympiad_tasks_key, olympiad_meta_key
+from app.core.redis import get_redis, mark_redis_down, redis_marked_down, safe_redis
+from app.core.cache import local_cache, olympiad_tasks_key, olympiad_meta_key
 from app.core.age_groups import class_grades_allow, normalize_age_group
+from app.core.auth_context import Principal
 from app.core.security import generate_token
 from app.models.attempt import AttemptStatus
 from app.models.task import TaskType
 from app.models.user import User, UserRole
 from app.repos.attempts import AttemptsRepo
+from app.services import answer_buffer, attempt_stats, grading
 from app.core import error_codes as codes
 
 
+def submit_lock_key(attempt_id: int) -> str:
+    return f"lock:submit:{attempt_id}"
+
+
 class AttemptsService:
     def __init__(self, repo: AttemptsRepo):
         self.repo = repo
@@ -136,11 +140,15 @@ class AttemptsService:
         return payload
 
     async def _get_olympiad_cached(self, olympiad_id: int):
+        cache_key = olympiad_meta_key(olympiad_id)
+        local = local_cache.get(cache_key, cache="olympiad_meta")
+        if local is not None:
+            return local
+
         redis = await safe_redis()
         if redis is None:
             return await self.repo.get_olympiad(olympiad_id)
 
-        cache_key = olympiad_meta_key(olympiad_id)
         cached = None
         start = time.perf_counter()
         try:
@@ -178,7 +186,9 @@ class AttemptsService:
                     data["results_released"] = bool(data.get("results_released"))
                 data["available_from"] = datetime.fromisoformat(data["available_from"])
                 data["available_to"] = datetime.fromisoformat(data["available_to"])
-                return SimpleNamespace(**data)
+                olympiad = SimpleNamespace(**data)
+                local_cache.set(cache_key, olympiad)
+                return olympiad
             except Exception:
                 pass
         else:
@@ -215,7 +225,20 @@ class AttemptsService:
 
         payload["available_from"] = olympiad.available_from
         payload["available_to"] = olympiad.available_to
-        return SimpleNamespace(**payload)
+        meta = SimpleNamespace(**payload)
+        local_cache.set(cache_key, meta)
+        return meta
+
+    async def _get_answer_key(self, olympiad_id: int) -> grading.AnswerKey:
+        cache_key = olympiad_tasks_key(olympiad_id)
+        answer_key = local_cache.get(cache_key, cache="olympiad_tasks")
+        if answer_key is None:
+            answer_key = grading.AnswerKey(self._inflate_tasks(await self._get_tasks_cached(olympiad_id)))
+            local_cache.set(cache_key, answer_key)
+        return answer_key
+
+    async def _get_tasks_inflated(self, olympiad_id: int) -> tuple[tuple, ...]:
+        return (await self._get_answer_key(olympiad_id)).tasks
 
     @staticmethod
     def _inflate_tasks(
@@ -248,99 +271,36 @@ class AttemptsService:
     def _validate_answer_payload(task_type: TaskType, task_payload: dict, answer_payload: dict) -> dict:
         if not isinstance(answer_payload, dict):
             raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-
-        if task_type == TaskType.single_choice:
-            choice_id = answer_payload.get("choice_id")
-            if not isinstance(choice_id, str):
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            options = task_payload.get("options") or []
-            ids = {o.get("id") for o in options if isinstance(o, dict)}
-            if choice_id not in ids:
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            return {"choice_id": choice_id}
-
-        if task_type == TaskType.multi_choice:
-            choice_ids = answer_payload.get("choice_ids")
-            if not isinstance(choice_ids, list) or len(choice_ids) == 0:
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            if any(not isinstance(cid, str) for cid in choice_ids):
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            if len(set(choice_ids)) != len(choice_ids):
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            options = task_payload.get("options") or []
-            ids = {o.get("id") for o in options if isinstance(o, dict)}
-            if any(cid not in ids for cid in choice_ids):
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            return {"choice_ids": choice_ids}
-
-        if task_type == TaskType.short_text:
-            text = answer_payload.get("text")
-            if not isinstance(text, str):
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            trimmed = text.strip()
-            if trimmed == "":
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            subtype = task_payload.get("subtype")
-            if subtype == "int" and not re.fullmatch(r"-?\d+", trimmed):
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            if subtype == "float" and not re.fullmatch(r"-?\d+(?:[.,]\d+)?", trimmed):
-                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
-            return {"text": trimmed}
-
-        raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+        return grading.compile_validator(task_type, task_payload)(answer_payload)
 
     @staticmethod
-    def _normalize_spaces(value: str) -> str:
-        return " ".join(value.split())
-
-    def _grade_task(self, task_type: TaskType, task_payload: dict, answer_payload: dict | None) -> bool:
-        if answer_payload is None:
-            return False
+    def _grade_task(task_type: TaskType, task_payload: dict, answer_payload: dict | None) -> bool:
+        return grading.grade_task(task_type, task_payload, answer_payload)
 
-        if task_type == TaskType.single_choice:
-            correct_id = task_payload.get("correct_option_id")
-            return answer_payload.get("choice_id") == correct_id
+    async def _list_answers(self, attempt_id: int, *, flush: bool = False) -> list:
+        # flush — перед оценкой: буфер в БД, попытка помечается закрытой для автосохранений
+        return await answer_buffer.load_answers(self.repo, attempt_id, flush=flush, close=flush)
 
-        if task_type == TaskType.multi_choice:
-            correct_ids = set(task_payload.get("correct_option_ids") or [])
-            choice_ids = set(answer_payload.get("choice_ids") or [])
-            return choice_ids == correct_ids
-
-        if task_type == TaskType.short_text:
-            subtype = task_payload.get("subtype")
-            expected = task_payload.get("expected")
-            raw_text = (answer_payload.get("text") or "").strip()
+    async def get_grading_context(self, olympiad_id: int) -> tuple[SimpleNamespace | None, grading.AnswerKey | None]:
+        """Cached olympiad meta and compiled answer key, as used by submit (``None`` if no olympiad)."""
+        olympiad = await self._get_olympiad_cached(olympiad_id)
+        if olympiad is None:
+            return None, None
+        return olympiad, await self._get_answer_key(olympiad_id)
 
-            if subtype == "int":
-                try:
-                    got = int(raw_text)
-                    exp = int(expected)
-                except (TypeError, ValueError):
-                    return False
-                return got == exp
-
-            if subtype == "float":
-                eps = task_payload.get("epsilon", 0.01)
-                try:
-                    got = float(raw_text.replace(",", "."))
-                    exp = float(str(expected).replace(",", "."))
-                    eps_val = float(eps)
-                except (TypeError, ValueError):
-                    return False
-                return abs(got - exp) <= eps_val
-
-            if subtype == "text":
-                exp = str(expected).strip()
-                got = raw_text
-                if task_payload.get("case_insensitive", True):
-                    exp = exp.lower()
-                    got = got.lower()
-                if task_payload.get("collapse_spaces", False):
-                    exp = self._normalize_spaces(exp)
-                    got = self._normalize_spaces(got)
-                return got == exp
-
-        return False
+    async def _grade_attempt(self, *, attempt, olympiad, answer_key, answers, status: AttemptStatus) -> bool:
+        grade = grading.compute_attempt_grade(
+            attempt_id=attempt.id,
+            answer_key=answer_key,
+            answers_by_task=grading.answers_payload_map(answers),
+            pass_percent=olympiad.pass_percent,
+            graded_at=self._now_utc(),
+        )
+        if not await self.repo.save_grades([grade], status=status):
+            return False  # попытку уже закрыл другой путь оценки
+        ATTEMPTS_SUBMITTED_TOTAL.labels(status=status.value).inc()
+        await attempt_stats.record_closed([attempt.id], status=status, at=grade.graded_at)
+        return True
 
     async def start_attempt(self, *, user: User, olympiad_id: int):
         olympiad = await self._get_olympiad_cached(olympiad_id)
@@ -362,8 +322,7 @@ class AttemptsService:
         if not self._age_group_allows(class_grade=user.class_grade, age_group=olympiad.age_group):
             raise ValueError(codes.OLYMPIAD_AGE_GROUP_MISMATCH)
 
-        cached = await self._get_tasks_cached(olympiad_id)
-        tasks = self._inflate_tasks(cached)
+        tasks = await self._get_tasks_inflated(olympiad_id)
         if len(tasks) == 0:
             # защищаемся от "пустой" опубликованной олимпиады
             raise ValueError(codes.OLYMPIAD_HAS_NO_TASKS)
@@ -377,9 +336,15 @@ class AttemptsService:
             duration_sec=int(olympiad.duration_sec),
         )
         ATTEMPTS_STARTED_TOTAL.inc()
+        await attempt_stats.record_started(
+            attempt_id=attempt.id,
+            user_id=user.id,
+            deadline_at=deadline,
+            started_at=now,
+        )
         return attempt, olympiad
 
-    async def _ensure_attempt_access(self, *, user: User, attempt_id: int):
+    async def _ensure_attempt_access(self, *, user: User | Principal, attempt_id: int):
         attempt = await self.repo.get_attempt(attempt_id)
         if not attempt:
             raise ValueError(codes.ATTEMPT_NOT_FOUND)
@@ -391,65 +356,33 @@ class AttemptsService:
             raise ValueError(codes.FORBIDDEN)
         return attempt
 
-    async def get_attempt_view(self, *, user: User, attempt_id: int):
+    async def get_attempt_view(self, *, user: User | Principal, attempt_id: int):
         attempt = await self._ensure_attempt_access(user=user, attempt_id=attempt_id)
 
         olympiad = await self._get_olympiad_cached(attempt.olympiad_id)
         if not olympiad:
             raise ValueError(codes.OLYMPIAD_NOT_FOUND)
 
-        cached = await self._get_tasks_cached(attempt.olympiad_id)
-        tasks = self._inflate_tasks(cached)
-        answers = await self.repo.list_answers(attempt.id)
-        answers_by_task = {a.task_id: a for a in answers}
-
+        answer_key = await self._get_answer_key(attempt.olympiad_id)
+        tasks = answer_key.tasks
         # авто-expire при чтении, если дедлайн прошёл или попытка expired без оценки
-        now = self._now_utc()
-        needs_expire_grade = False
-        if attempt.status == AttemptStatus.active and now > attempt.deadline_at:
-            needs_expire_grade = True
-        elif attempt.status == AttemptStatus.expired and (attempt.graded_at is None or attempt.score_max == 0):
-            needs_expire_grade = True
+        needs_expire_grade = grading.needs_expire_grade(attempt, self._now_utc())
+        answers = await self._list_answers(attempt.id, flush=needs_expire_grade)
+        answers_by_task = {a.task_id: a for a in answers}
 
         if needs_expire_grade:
-            score_total = 0
-            score_max = 0
-            now_ts = self._now_utc()
-
-            await self.repo.delete_grades(attempt.id)
-            for olymp_task, task in tasks:
-                score_max += int(olymp_task.max_score)
-                answer = answers_by_task.get(task.id)
-                answer_payload = None if answer is None else answer.answer_payload
-                is_correct = self._grade_task(task.task_type, task.payload, answer_payload)
-                score = int(olymp_task.max_score) if is_correct else 0
-                score_total += score
-
-                await self.repo.add_grade(
-                    attempt_id=attempt.id,
-                    task_id=task.id,
-                    is_correct=is_correct,
-                    score=score,
-                    max_score=int(olymp_task.max_score),
-                    graded_at=now_ts,
-                )
-
-            pass_score = math.ceil(score_max * int(olympiad.pass_percent) / 100) if score_max > 0 else 0
-            passed = score_total >= pass_score
-
-            await self.repo.mark_expired_with_grade(
-                attempt_id=attempt.id,
-                score_total=score_total,
-                score_max=score_max,
-                passed=passed,
-                graded_at=now_ts,
+            await self._grade_attempt(
+                attempt=attempt,
+                olympiad=olympiad,
+                answer_key=answer_key,
+                answers=answers,
+                status=AttemptStatus.expired,
             )
-            ATTEMPTS_SUBMITTED_TOTAL.labels(status="expired").inc()
             attempt = await self.repo.get_attempt(attempt.id)  # refresh
 
         return attempt, olympiad, tasks, answers_by_task
 
-    async def upsert_answer(self, *, user: User, attempt_id: int, task_id: int, answer_payload: dict):
+    async def upsert_answer(self, *, user: User | Principal, attempt_id: int, task_id: int, answer_payload: dict):
         attempt = await self._ensure_attempt_access(user=user, attempt_id=attempt_id)
 
         now = self._now_utc()
@@ -459,17 +392,35 @@ class AttemptsService:
 
         if now > attempt.deadline_at:
             await self.repo.mark_expired(attempt.id)
+            await attempt_stats.record_closed([attempt.id])
             raise ValueError(codes.ATTEMPT_EXPIRED)
 
         # убедимся, что task принадлежит олимпиаде попытки
-        cached = await self._get_tasks_cached(attempt.olympiad_id)
-        tasks = self._inflate_tasks(cached)
-        match = next(((ot, t) for ot, t in tasks if ot.task_id == task_id), None)
-        if not match:
-            raise ValueError(codes.TASK_NOT_FOUND)
-        _olymp_task, task = match
+        answer_key = await self._get_answer_key(attempt.olympiad_id)
+        normalized = answer_key.validate(task_id, answer_payload)
 
-        normalized = self._validate_answer_payload(task.task_type, task.payload, answer_payload)
+        if settings.ANSWERS_WRITE_BEHIND_ENABLED and not redis_marked_down():
+            redis = await safe_redis()
+            buffered = None
+            if redis is not None:
+                try:
+                    buffered = await answer_buffer.buffer_answer(
+                        redis,
+                        attempt_id=attempt.id,
+                        task_id=task_id,
+                        answer_payload=normalized,
+                        updated_at=now,
+                        deadline_at=attempt.deadline_at,
+                        lock_key=submit_lock_key(attempt.id),
+                    )
+                except Exception:
+                    mark_redis_down()  # Redis недоступен — пишем напрямую в БД
+            if buffered:
+                return {"status": attempt.status}
+            if buffered is False:
+                # идёт submit или попытка уже закрыта: в буфере ответ не попал бы в оценку
+                if await self.repo.get_attempt_status(attempt.id) != AttemptStatus.active:
+                    raise ValueError(codes.ATTEMPT_NOT_ACTIVE)
 
         await self.repo.upsert_answer(
             attempt_id=attempt.id,
@@ -480,13 +431,13 @@ class AttemptsService:
 
         return {"status": attempt.status}
 
-    async def submit(self, *, user: User, attempt_id: int):
+    async def submit(self, *, user: User | Principal, attempt_id: int):
         attempt = await self._ensure_attempt_access(user=user, attempt_id=attempt_id)
 
         if attempt.status == AttemptStatus.submitted:
             return attempt.status  # идемпотентно
 
-        lock_key = f"lock:submit:{attempt.id}"
+        lock_key = submit_lock_key(attempt.id)
         lock_token = generate_token()
         redis = None
         locked = False
@@ -514,7 +465,7 @@ class AttemptsService:
             ):
                 elapsed_sec = (now - attempt.started_at).total_seconds()
                 if elapsed_sec < min_submit_age_sec:
-                    prefetched_answers = await self.repo.list_answers(attempt.id)
+                    prefetched_answers = await self._list_answers(attempt.id, flush=True)
                     if len(prefetched_answers) == 0:
                         raise ValueError(codes.ATTEMPT_SUBMIT_TOO_EARLY)
 
@@ -523,48 +474,20 @@ class AttemptsService:
                 if not olympiad:
                     raise ValueError(codes.OLYMPIAD_NOT_FOUND)
 
-                cached = await self._get_tasks_cached(attempt.olympiad_id)
-                tasks = self._inflate_tasks(cached)
+                answer_key = await self._get_answer_key(attempt.olympiad_id)
                 answers = (
                     prefetched_answers
                     if prefetched_answers is not None
-                    else await self.repo.list_answers(attempt.id)
+                    else await self._list_answers(attempt.id, flush=True)
                 )
-                answers_by_task = {a.task_id: a for a in answers}
-
-                score_total = 0
-                score_max = 0
-                now_ts = self._now_utc()
-
-                await self.repo.delete_grades(attempt.id)
-                for olymp_task, task in tasks:
-                    score_max += int(olymp_task.max_score)
-                    answer = answers_by_task.get(task.id)
-                    answer_payload = None if answer is None else answer.answer_payload
-                    is_correct = self._grade_task(task.task_type, task.payload, answer_payload)
-                    score = int(olymp_task.max_score) if is_correct else 0
-                    score_total += score
-
-                    await self.repo.add_grade(
-                        attempt_id=attempt.id,
-                        task_id=task.id,
-                        is_correct=is_correct,
-                        score=score,
-                        max_score=int(olymp_task.max_score),
-                        graded_at=now_ts,
-                    )
-
-                pass_score = math.ceil(score_max * int(olympiad.pass_percent) / 100) if score_max > 0 else 0
-                passed = score_total >= pass_score
-
-                await self.repo.mark_expired_with_grade(
-                    attempt_id=attempt.id,
-                    score_total=score_total,
-                    score_max=score_max,
-                    passed=passed,
-                    graded_at=now_ts,
-                )
-                ATTEMPTS_SUBMITTED_TOTAL.labels(status="expired").inc()
+                if not await self._grade_attempt(
+                    attempt=attempt,
+                    olympiad=olympiad,
+                    answer_key=answer_key,
+                    answers=answers,
+                    status=AttemptStatus.expired,
+                ):
+                    return await self.repo.get_attempt_status(attempt.id)
                 return AttemptStatus.expired
 
             # иначе закрываем как submitted + оцениваем
@@ -573,48 +496,20 @@ class AttemptsService:
                 if not olympiad:
                     raise ValueError(codes.OLYMPIAD_NOT_FOUND)
 
-                cached = await self._get_tasks_cached(attempt.olympiad_id)
-                tasks = self._inflate_tasks(cached)
+                answer_key = await self._get_answer_key(attempt.olympiad_id)
                 answers = (
                     prefetched_answers
                     if prefetched_answers is not None
-                    else await self.repo.list_answers(attempt.id)
-                )
-                answers_by_task = {a.task_id: a for a in answers}
-
-                score_total = 0
-                score_max = 0
-                now_ts = self._now_utc()
-
-                await self.repo.delete_grades(attempt.id)
-                for olymp_task, task in tasks:
-                    score_max += int(olymp_task.max_score)
-                    answer = answers_by_task.get(task.id)
-                    answer_payload = None if answer is None else answer.answer_payload
-                    is_correct = self._grade_task(task.task_type, task.payload, answer_payload)
-                    score = int(olymp_task.max_score) if is_correct else 0
-                    score_total += score
-
-                    await self.repo.add_grade(
-                        attempt_id=attempt.id,
-                        task_id=task.id,
-                        is_correct=is_correct,
-                        score=score,
-                        max_score=int(olymp_task.max_score),
-                        graded_at=now_ts,
-                    )
-
-                pass_score = math.ceil(score_max * int(olympiad.pass_percent) / 100) if score_max > 0 else 0
-                passed = score_total >= pass_score
-
-                await self.repo.mark_submitted_with_grade(
-                    attempt_id=attempt.id,
-                    score_total=score_total,
-                    score_max=score_max,
-                    passed=passed,
-                    graded_at=now_ts,
+                    else await self._list_answers(attempt.id, flush=True)
                 )
-                ATTEMPTS_SUBMITTED_TOTAL.labels(status="submitted").inc()
+                if not await self._grade_attempt(
+                    attempt=attempt,
+                    olympiad=olympiad,
+                    answer_key=answer_key,
+                    answers=answers,
+                    status=AttemptStatus.submitted,
+                ):
+                    return await self.repo.get_attempt_status(attempt.id)
                 return AttemptStatus.submitted
 
             return attempt.status
@@ -633,7 +528,7 @@ class AttemptsService:
             return 0
         return int(round((score_total / score_max) * 100))
 
-    async def get_result(self, *, user: User, attempt_id: int):
+    async def get_result(self, *, user: User | Principal, attempt_id: int):
         attempt_tuple = await self.repo.get_attempt_with_olympiad(attempt_id)
         if not attempt_tuple:
             raise ValueError(codes.ATTEMPT_NOT_FOUND)
@@ -654,19 +549,14 @@ class AttemptsService:
             "results_released": olympiad.results_released,
         }
 
-    async def list_results(self, *, user: User):
+    async def list_results(self, *, user: User | Principal):
         if user.role != UserRole.student:
             raise ValueError(codes.FORBIDDEN)
         attempts = await self.repo.list_attempts_with_olympiads_for_user(user.id)
         results = []
         now = self._now_utc()
         for attempt, olympiad in attempts:
-            needs_grade = False
-            if attempt.status == AttemptStatus.active and now > attempt.deadline_at:
-                needs_grade = True
-            elif attempt.status == AttemptStatus.expired and (attempt.graded_at is None or attempt.score_max == 0):
-                needs_grade = True
-            if needs_grade:
+            if grading.needs_expire_grade(attempt, now):
                 attempt, olympiad, _tasks, _answers = await self.get_attempt_view(
                     user=user,
                     attempt_id=attempt.id,
@@ -0,0 +1,136 @@
+"""Batched audit-log writer.
+
+``AuditMiddleware`` only enqueues a row; a background flusher writes the
+queue with one multi-row ``INSERT`` every ``AUDIT_LOG_FLUSH_MS`` or as soon as
+``AUDIT_LOG_BATCH_SIZE`` rows are waiting. The queue is bounded by
+``AUDIT_LOG_QUEUE_MAX``: when it is full new rows are dropped and counted in
+``audit_log_dropped_total`` instead of growing memory.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+from app.core.config import settings
+from app.core.metrics import AUDIT_LOG_DROPPED_TOTAL, AUDIT_LOG_WRITTEN_TOTAL
+from app.db.session import SessionLocal
+from app.repos.audit_logs import AuditLogsRepo
+
+logger = logging.getLogger(__name__)
+
+WriteBatch = Callable[[list[dict]], Awaitable[None]]
+
+
+def _parse_sample_rules(raw: str) -> dict[tuple[str, str], float]:
+    # "POST /api/v1/attempts/{attempt_id}/answers=0.01,GET /api/v1/lookup/cities=0.1"
+    rules: dict[tuple[str, str], float] = {}
+    for item in raw.split(","):
+        route, sep, rate = item.strip().rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        if not sep or not path:
+            continue
+        try:
+            rules[(method.upper(), path.strip())] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            logger.warning("audit_sample_rule_invalid:%s", item)
+    return rules
+
+
+_sample_rules_cache: tuple[str, dict[tuple[str, str], float]] | None = None
+
+
+def _sample_rules() -> dict[tuple[str, str], float]:
+    global _sample_rules_cache
+    raw = settings.AUDIT_LOG_SAMPLE_RULES
+    if _sample_rules_cache is None or _sample_rules_cache[0] != raw:
+        _sample_rules_cache = (raw, _parse_sample_rules(raw))
+    return _sample_rules_cache[1]
+
+
+def should_record(*, method: str, route_path: str, action: str, status_code: int) -> bool:
+    """Per-route sampling; admin actions and error responses are always kept."""
+    if action != "request" or status_code >= 400:
+        return True
+    rate = _sample_rules().get((method.upper(), route_path), settings.AUDIT_LOG_DEFAULT_SAMPLE_RATE)
+    if rate >= 1.0:
+        return True
+    return rate > 0.0 and random.random() < rate
+
+
+async def _insert_rows(rows: list[dict]) -> None:
+    async with SessionLocal() as session:
+        await AuditLogsRepo(session).create_many(rows)
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        *,
+        max_queue: int,
+        batch_size: int,
+        flush_ms: int,
+        write: WriteBatch = _insert_rows,
+    ):
+        self.max_queue = max_queue
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = max(flush_ms, 10) / 1000
+        self._write = write
+        self._queue: deque[dict] = deque()
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, row: dict) -> bool:
+        if len(self._queue) >= self.max_queue:
+            AUDIT_LOG_DROPPED_TOTAL.labels(reason="queue_full").inc()
+            return False
+        self._queue.append(row)
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> int:
+        """Write everything queued so far, one INSERT per batch."""
+        written = 0
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            try:
+                await self._write(batch)
+            except asyncio.CancelledError:
+                # строки уже извлечены — вернём их, чтобы drain() их записал
+                self._queue.extendleft(reversed(batch))
+                raise
+            except Exception:
+                AUDIT_LOG_DROPPED_TOTAL.labels(reason="write_failed").inc(len(batch))
+                logger.exception("audit_log_flush_failed")
+                continue
+            AUDIT_LOG_WRITTEN_TOTAL.inc(len(batch))
+            written += len(batch)
+        return written
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def drain(self) -> None:
+        """Final flush on shutdown."""
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("audit_log_flush_failed")
+
+
+audit_writer = AuditWriter(
+    max_queue=settings.AUDIT_LOG_QUEUE_MAX,
+    batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+    flush_ms=settings.AUDIT_LOG_FLUSH_MS,
+)
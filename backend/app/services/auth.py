@@ -3,8 +3,8 @@ from datetime import datetime, timedelta, timezone
 from app.core.config import settings
 from app.core.email import build_reset_link, build_verify_link
 from app.core.security import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
     decode_token,
@@ -12,7 +12,7 @@ from app.core.security import (
     hash_token,
     validate_password_policy,
 )
-from app.models.user import UserRole, Gender
+from app.models.user import UserRole
 from app.repos.auth_tokens import AuthTokensRepo
 from app.repos.users import UsersRepo
 from app.tasks.email import send_email_task
@@ -78,7 +78,7 @@ class AuthService:
         except Exception:
             raise ValueError(codes.VALIDATION_ERROR)
         validate_password_policy(password)
-        password_hash = hash_password(password)
+        password_hash = await hash_password_async(password)
         user = await self.users_repo.create(
             login=login,
             email=email,
@@ -108,7 +108,7 @@ class AuthService:
         if not user or not user.is_active:
             raise ValueError(codes.INVALID_CREDENTIALS)
 
-        if not verify_password(password, user.password_hash):
+        if not await verify_password_async(password, user.password_hash):
             raise ValueError(codes.INVALID_CREDENTIALS)
 
         if user.must_change_password:
@@ -284,8 +284,8 @@ class AuthService:
         if not user:
             raise ValueError(codes.INVALID_TOKEN)
 
+        password_hash = await hash_password_async(new_password)
         await self.tokens_repo.mark_password_reset_used(record, now)
-        password_hash = hash_password(new_password)
         await self.users_repo.set_password(
             user,
             password_hash,
@@ -4,7 +4,7 @@ from app.models.user import UserRole
 from app.repos.users import UsersRepo
 from app.repos.social_accounts import SocialAccountsRepo
 from app.core.security import create_access_token, create_refresh_token
-from app.core.security import hash_password
+from app.core.security import hash_password_async
 from app.core import error_codes as codes
 
 
@@ -31,7 +31,7 @@ class AuthVKService:
         user = await self.users.get_by_email(norm_email)
         if not user:
             # пароль не нужен, но поле обязательное — кладём случайный хэш
-            password_hash = hash_password("vk:" + provider_user_id)
+            password_hash = await hash_password_async("vk:" + provider_user_id)
             login = f"vk{provider_user_id}"
             if len(login) < 5:
                 login = login.ljust(5, "0")
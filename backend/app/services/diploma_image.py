@@ -0,0 +1,84 @@
+"""Drawing one diploma JPEG with Pillow.
+
+Runs inside ``ProcessPoolExecutor`` workers started with ``spawn``, so it
+imports nothing from the app besides the fonts directory: ``init_renderer``
+decodes the background and loads the template once per process, then
+``render_diploma`` draws the text fields on a copy for every attempt.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+FIELDS = ("name", "school", "score", "place")
+ANCHORS = {"left": "ls", "center": "ms", "right": "rs"}
+MIN_FONT_SIZE = 8
+
+_background: Image.Image | None = None
+_template: dict | None = None
+
+
+def _font_path(bold: bool) -> Path | None:
+    name = "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"
+    for directory in (
+        Path(__file__).resolve().parent.parent / "assets" / "fonts",
+        Path("/usr/share/fonts/truetype/dejavu"),
+    ):
+        if (directory / name).exists():
+            return directory / name
+    if bold:
+        return _font_path(False)
+    return None
+
+
+@lru_cache(maxsize=256)
+def _font(size: int, bold: bool) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    path = _font_path(bold)
+    if path is None:
+        return ImageFont.load_default(size)
+    return ImageFont.truetype(str(path), size)
+
+
+def format_field(text: str, row: dict) -> str:
+    return text.format(
+        name=row["name"],
+        school=row["school"],
+        score=row["score"],
+        score_max=row["score_max"],
+        place=row["place"],
+    )
+
+
+def init_renderer(background: bytes, template: dict) -> None:
+    global _background, _template
+    image = Image.open(BytesIO(background))
+    _background = image.convert("RGB")
+    _template = template
+
+
+def render_diploma(row: dict) -> bytes:
+    """JPEG bytes of the diploma for one ``row`` (attempt_id, name, school, score, score_max, place)."""
+    if _background is None or _template is None:
+        raise RuntimeError("renderer_not_initialized")
+    image = _background.copy()
+    draw = ImageDraw.Draw(image)
+    for field in FIELDS:
+        spec = _template.get(field)
+        if not spec:
+            continue
+        text = format_field(spec["text"], row).strip()
+        if not text:
+            continue
+        size = spec["font_size"]
+        font = _font(size, spec["bold"])
+        # длинные ФИО и названия школ уменьшаем, пока не влезут в max_width
+        while spec.get("max_width") and size > MIN_FONT_SIZE and draw.textlength(text, font=font) > spec["max_width"]:
+            size = max(MIN_FONT_SIZE, int(size * 0.9))
+            font = _font(size, spec["bold"])
+        draw.text((spec["x"], spec["y"]), text, font=font, fill=spec["color"], anchor=ANCHORS[spec["align"]])
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=_template["jpeg_quality"], optimize=True)
+    return buffer.getvalue()
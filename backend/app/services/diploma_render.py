@@ -0,0 +1,276 @@
+"""Batch rendering of olympiad diplomas into storage.
+
+A job renders ``attempt_{id}.jpg`` for every passed attempt of an olympiad:
+the background is downloaded once, drawing runs in a ``ProcessPoolExecutor``
+(``app.services.diploma_image``) and each JPEG is uploaded from the storage
+thread pool as soon as it is ready; at most ``2 * workers`` diplomas are in
+memory at a time. Progress is kept in Redis (``diplomas:render:v1:{olympiad}``)
+together with the set of attempts already rendered with this template, so a
+redelivered or restarted job continues where it stopped. Without Redis the job
+still runs, but starts from scratch on restart.
+
+The Celery task does not call this module in-process: children of the prefork
+pool are daemonic and may not start a process pool, so the job runs in a fresh
+interpreter (``python -m app.services.diploma_render``, see ``main``) that
+reports its states to the task as JSON lines on stdout.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import mark_redis_down, safe_redis
+from app.core.storage import put_object, read_object, run_io
+from app.db.session import SessionLocal
+from app.repos.attempts import AttemptsRepo
+from app.services.diploma_image import init_renderer, render_diploma
+from app.services.diplomas import diploma_key, mark_diplomas_uploaded
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY_PREFIX = "diplomas:render:v1:"
+FLUSH_EVERY = 200
+FLUSH_INTERVAL_SEC = 1.0
+ACTIVE_STATUSES = {"queued", "running"}
+# работающая задача пишет состояние хотя бы раз в FLUSH_INTERVAL_SEC; дольше — считаем брошенной
+STALE_AFTER_SEC = 600
+
+
+def template_hash(template: dict) -> str:
+    return hashlib.sha1(json.dumps(template, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def state_key(olympiad_id: int) -> str:
+    return f"{STATE_KEY_PREFIX}{olympiad_id}"
+
+
+def done_key(olympiad_id: int, template: dict) -> str:
+    return f"{STATE_KEY_PREFIX}{olympiad_id}:{template_hash(template)}:done"
+
+
+def render_workers() -> int:
+    return settings.DIPLOMA_RENDER_WORKERS if settings.DIPLOMA_RENDER_WORKERS > 0 else (os.cpu_count() or 1)
+
+
+def new_state(job_id: str, olympiad_id: int, status: str = "queued") -> dict:
+    return {
+        "job_id": job_id,
+        "olympiad_id": olympiad_id,
+        "status": status,
+        "total": 0,
+        "done": 0,
+        "failed": 0,
+        "error": None,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def is_active(state: dict) -> bool:
+    if state.get("status") not in ACTIVE_STATUSES:
+        return False
+    updated_at = datetime.fromisoformat(state["updated_at"])
+    return (datetime.now(timezone.utc) - updated_at).total_seconds() < STALE_AFTER_SEC
+
+
+async def mark_queued(job_id: str, olympiad_id: int) -> dict:
+    state = new_state(job_id, olympiad_id)
+    await save_state(await safe_redis(), state)
+    return state
+
+
+async def mark_failed(job_id: str, olympiad_id: int, error: str) -> dict:
+    """Mark a job failed, keeping the counters it already reported."""
+    redis = await safe_redis()
+    state = await get_state(olympiad_id)
+    if state is None or state.get("job_id") != job_id:
+        state = new_state(job_id, olympiad_id)
+    state["status"], state["error"] = "failed", error
+    await save_state(redis, state)
+    return state
+
+
+async def save_state(redis: Redis | None, state: dict) -> None:
+    if redis is None:
+        return
+    state["updated_at"] = datetime.now(timezone.utc).isoformat()
+    try:
+        await redis.set(
+            state_key(state["olympiad_id"]),
+            json.dumps(state),
+            ex=settings.DIPLOMA_RENDER_STATE_TTL_SEC,
+        )
+    except (RedisError, OSError):
+        mark_redis_down()
+
+
+async def get_state(olympiad_id: int) -> dict | None:
+    redis = await safe_redis()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(state_key(olympiad_id))
+    except (RedisError, OSError):
+        mark_redis_down()
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def _rendered_ids(redis: Redis | None, key: str) -> set[int]:
+    if redis is None:
+        return set()
+    try:
+        return {int(value) for value in await redis.smembers(key)}
+    except (RedisError, OSError):
+        mark_redis_down()
+        return set()
+
+
+async def _remember_rendered(redis: Redis | None, key: str, attempt_ids: list[int]) -> None:
+    if redis is None or not attempt_ids:
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        pipe.sadd(key, *attempt_ids)
+        pipe.expire(key, settings.DIPLOMA_RENDER_STATE_TTL_SEC)
+        await pipe.execute()
+    except (RedisError, OSError):
+        mark_redis_down()
+
+
+async def render_olympiad_diplomas(
+    olympiad_id: int,
+    template: dict,
+    *,
+    job_id: str,
+    session_maker=SessionLocal,
+    redis_getter=safe_redis,
+    workers: int | None = None,
+    on_progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """Render and upload diplomas of all passed attempts; returns the final job state."""
+    workers = workers or render_workers()
+    redis = await redis_getter()
+    state = new_state(job_id, olympiad_id, status="running")
+    rendered_key = done_key(olympiad_id, template)
+
+    async with session_maker() as session:
+        rows = await AttemptsRepo(session).list_diploma_rows(olympiad_id)
+    already = await _rendered_ids(redis, rendered_key)
+    todo = [row for row in rows if row["attempt_id"] not in already]
+    state["total"] = len(rows)
+    state["done"] = len(rows) - len(todo)
+    await save_state(redis, state)
+    if not todo:
+        state["status"] = "done"
+        await save_state(redis, state)
+        return state
+
+    try:
+        background = await run_io("get_object", read_object, template["background_key"])
+    except Exception as exc:
+        logger.warning("diploma_render_background_failed olympiad_id=%s", olympiad_id, exc_info=True)
+        state["status"], state["error"] = "failed", f"background_unavailable: {exc}"
+        await save_state(redis, state)
+        return state
+
+    pending: list[int] = []
+    last_flush = time.monotonic()
+
+    async def _flush() -> None:
+        nonlocal last_flush
+        last_flush = time.monotonic()
+        batch = pending[:]
+        pending.clear()
+        await _remember_rendered(redis, rendered_key, batch)
+        await mark_diplomas_uploaded(batch)
+        await save_state(redis, state)
+        if on_progress is not None:
+            on_progress(dict(state))
+
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(workers * 2)
+
+    async def _one(pool: ProcessPoolExecutor, row: dict) -> None:
+        async with in_flight:
+            try:
+                data = await loop.run_in_executor(pool, render_diploma, row)
+                await run_io("put_object", put_object, diploma_key(row["attempt_id"]), data, "image/jpeg")
+            except Exception:
+                logger.warning("diploma_render_failed attempt_id=%s", row["attempt_id"], exc_info=True)
+                state["failed"] += 1
+                return
+        state["done"] += 1
+        pending.append(row["attempt_id"])
+        if len(pending) >= FLUSH_EVERY or time.monotonic() - last_flush >= FLUSH_INTERVAL_SEC:
+            await _flush()
+
+    started_at = time.perf_counter()
+    try:
+        # spawn: форк воркера с открытыми соединениями и потоками пула хранилища небезопасен
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_renderer,
+            initargs=(background, template),
+        ) as pool:
+            await asyncio.gather(*(_one(pool, row) for row in todo))
+    except Exception as exc:
+        # пул не поднялся или упал целиком: отрисованное сохраняем, задание не висит в running
+        logger.warning("diploma_render_pool_failed olympiad_id=%s", olympiad_id, exc_info=True)
+        state["status"], state["error"] = "failed", f"render_pool_failed: {exc}"
+        await _flush()
+        return state
+
+    state["status"] = "failed" if state["failed"] else "done"
+    await _flush()
+    logger.info(
+        "diploma_render_finished olympiad_id=%s rendered=%s failed=%s seconds=%.1f",
+        olympiad_id,
+        len(todo) - state["failed"],
+        state["failed"],
+        time.perf_counter() - started_at,
+    )
+    return state
+
+
+def main() -> int:
+    """Entry point of the render process: ``<olympiad_id> <job_id>``, template JSON on stdin."""
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    olympiad_id, job_id = int(sys.argv[1]), sys.argv[2]
+    template = json.load(sys.stdin)
+    # stdout — канал состояний для задачи; случайный print из библиотек уходит в stderr
+    out, sys.stdout = sys.stdout, sys.stderr
+
+    def _report(state: dict) -> None:
+        out.write(json.dumps(state) + "\n")
+        out.flush()
+
+    state = asyncio.run(
+        render_olympiad_diplomas(
+            olympiad_id,
+            template,
+            job_id=job_id,
+            session_maker=SessionLocal,
+            redis_getter=safe_redis,
+            on_progress=_report,
+        )
+    )
+    _report(state)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,165 @@
+"""Which attempts have a diploma in storage.
+
+Diplomas are stored as ``attempt_{id}.jpg`` in the bucket root. Instead of
+redirecting every click to storage (and to a MinIO 404 for attempts without a
+diploma), the set of attempt ids is kept as a Redis bitmap
+``diplomas:exists:v1`` (bit = attempt id). The bitmap is rebuilt from one
+prefix listing by the ``maintenance.rebuild_diploma_index`` beat task and
+lives ``DIPLOMA_INDEX_TTL_SEC``; uploaders set bits for new diplomas with
+``mark_diplomas_uploaded``, and ids uploaded while a rebuild is listing are
+re-applied to the new bitmap when it is swapped in. Requests never list the bucket: while the index
+is cold or Redis is down, a request costs one HEAD of its own key.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Iterable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import mark_redis_down, redis_marked_down, safe_redis
+from app.core.storage import list_object_keys_async, object_exists_async
+
+logger = logging.getLogger(__name__)
+
+DIPLOMA_PREFIX = "attempt_"
+DIPLOMA_RE = re.compile(r"^attempt_(\d+)\.jpg$")
+INDEX_KEY = "diplomas:exists:v1"
+REBUILD_LOCK_KEY = "lock:diplomas:exists"
+REBUILD_LOCK_TTL_SEC = 120
+# id, загруженные, пока идёт пересборка: листинг их мог не застать
+UPLOADED_DURING_REBUILD_KEY = f"{INDEX_KEY}:uploaded"
+SETBIT_CHUNK_SIZE = 5000
+
+# KEYS: битмап, блокировка пересборки, id загрузок во время пересборки; ARGV: TTL, id...
+MARK_UPLOADED_LUA = """
+local rebuilding = redis.call("EXISTS", KEYS[2]) == 1
+local built = redis.call("EXISTS", KEYS[1]) == 1
+for i = 2, #ARGV do
+  if rebuilding then redis.call("SADD", KEYS[3], ARGV[i]) end
+  if built then redis.call("SETBIT", KEYS[1], ARGV[i], 1) end
+end
+if rebuilding then redis.call("EXPIRE", KEYS[3], ARGV[1]) end
+return 0
+"""
+
+# KEYS: собранный битмап, рабочий битмап, id загрузок во время пересборки
+SWAP_INDEX_LUA = """
+redis.call("RENAME", KEYS[1], KEYS[2])
+for _, attempt_id in ipairs(redis.call("SMEMBERS", KEYS[3])) do
+  redis.call("SETBIT", KEYS[2], attempt_id, 1)
+end
+redis.call("DEL", KEYS[3])
+return 0
+"""
+
+
+def diploma_key(attempt_id: int) -> str:
+    return f"{DIPLOMA_PREFIX}{attempt_id}.jpg"
+
+
+def attempt_ids_from_keys(keys: Iterable[str]) -> set[int]:
+    ids: set[int] = set()
+    for key in keys:
+        match = DIPLOMA_RE.match(key)
+        if match:
+            ids.add(int(match.group(1)))
+    return ids
+
+
+async def _redis() -> Redis | None:
+    return None if redis_marked_down() else await safe_redis()
+
+
+async def _list_attempt_ids() -> set[int]:
+    return attempt_ids_from_keys(await list_object_keys_async(DIPLOMA_PREFIX))
+
+
+async def _rebuild_bitmap(redis: Redis, ids: set[int]) -> None:
+    tmp_key = f"{INDEX_KEY}:building"
+    pipe = redis.pipeline(transaction=False)
+    pipe.delete(tmp_key)
+    # бит 0 всегда есть: пустой битмап в Redis не существует, а нам нужен признак «построен»
+    pipe.setbit(tmp_key, 0, 0)
+    for position, attempt_id in enumerate(sorted(ids), start=1):
+        pipe.setbit(tmp_key, attempt_id, 1)
+        if position % SETBIT_CHUNK_SIZE == 0:
+            await pipe.execute()
+    pipe.expire(tmp_key, settings.DIPLOMA_INDEX_TTL_SEC)
+    # вместе с заменой — биты дипломов, загруженных после начала листинга
+    pipe.eval(SWAP_INDEX_LUA, 3, tmp_key, INDEX_KEY, UPLOADED_DURING_REBUILD_KEY)
+    await pipe.execute()
+
+
+async def rebuild_diploma_index(redis: Redis | None = None) -> int | None:
+    """List the ``attempt_`` prefix and replace the bitmap; ``None`` if skipped (no Redis, another builder)."""
+    redis = redis or await _redis()
+    if redis is None or settings.DIPLOMA_INDEX_TTL_SEC <= 0:
+        return None
+    if not await redis.set(REBUILD_LOCK_KEY, "1", nx=True, ex=REBUILD_LOCK_TTL_SEC):
+        return None
+    try:
+        ids = await _list_attempt_ids()
+        await _rebuild_bitmap(redis, ids)
+    finally:
+        await redis.delete(REBUILD_LOCK_KEY)
+    logger.info("diploma_index_built diplomas=%s", len(ids))
+    return len(ids)
+
+
+async def _exists_in_index(redis: Redis, attempt_id: int) -> bool | None:
+    pipe = redis.pipeline(transaction=False)
+    pipe.exists(INDEX_KEY)
+    pipe.getbit(INDEX_KEY, attempt_id)
+    built, bit = await pipe.execute()
+    return bool(bit) if built else None
+
+
+async def diploma_exists(attempt_id: int) -> bool | None:
+    """``None`` when it cannot be told right now (storage unavailable)."""
+    if settings.DIPLOMA_INDEX_TTL_SEC <= 0:
+        return None
+    redis = await _redis()
+    if redis is not None:
+        try:
+            exists = await _exists_in_index(redis, attempt_id)
+            if exists is not None:
+                return exists
+        except (RedisError, OSError):
+            mark_redis_down()
+    # индекс ещё не построен (его строит beat) или Redis недоступен — HEAD только своего ключа
+    try:
+        return await object_exists_async(diploma_key(attempt_id))
+    except Exception:
+        logger.warning("diploma_head_failed attempt_id=%s", attempt_id, exc_info=True)
+        return None
+
+
+async def mark_diplomas_uploaded(attempt_ids: Iterable[int]) -> None:
+    """Set bits for freshly uploaded diplomas; during a rebuild also remember them for the new bitmap."""
+    ids = sorted(set(attempt_ids))
+    if not ids:
+        return
+    redis = await _redis()
+    if redis is None:
+        return
+    keys = (INDEX_KEY, REBUILD_LOCK_KEY, UPLOADED_DURING_REBUILD_KEY)
+    try:
+        for start in range(0, len(ids), SETBIT_CHUNK_SIZE):
+            chunk = ids[start : start + SETBIT_CHUNK_SIZE]
+            await redis.eval(MARK_UPLOADED_LUA, len(keys), *keys, REBUILD_LOCK_TTL_SEC, *chunk)
+    except (RedisError, OSError):
+        mark_redis_down()
+
+
+async def invalidate_diploma_index() -> None:
+    redis = await _redis()
+    if redis is None:
+        return
+    try:
+        await redis.delete(INDEX_KEY)
+    except (RedisError, OSError):
+        mark_redis_down()
@@ -0,0 +1,235 @@
+"""Attempt grading engine.
+
+Grades are computed purely in memory; persisting them is a single
+``AttemptsRepo.save_grades`` call (one transaction, one bulk insert).
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections.abc import Callable, Iterable, Mapping
+from datetime import datetime
+
+from app.core import error_codes as codes
+from app.models.attempt import AttemptGrade, AttemptStatus, TaskGrade
+from app.models.task import TaskType
+
+
+_INT_RE = re.compile(r"-?\d+")
+_FLOAT_RE = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+Validator = Callable[[dict], dict]
+Grader = Callable[[dict], bool]
+
+
+def _normalize_spaces(value: str) -> str:
+    return " ".join(value.split())
+
+
+def _invalid_answer(_answer_payload: dict) -> dict:
+    raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+
+
+def _never_correct(_answer_payload: dict) -> bool:
+    return False
+
+
+def _option_ids(task_payload: dict) -> frozenset:
+    options = task_payload.get("options") or []
+    return frozenset(o.get("id") for o in options if isinstance(o, dict))
+
+
+def compile_validator(task_type: TaskType, task_payload: dict) -> Validator:
+    """Build the answer validator for one task; payload checks are done once here."""
+    if task_type == TaskType.single_choice:
+        option_ids = _option_ids(task_payload)
+
+        def _validate_single(answer_payload: dict) -> dict:
+            choice_id = answer_payload.get("choice_id")
+            if not isinstance(choice_id, str) or choice_id not in option_ids:
+                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+            return {"choice_id": choice_id}
+
+        return _validate_single
+
+    if task_type == TaskType.multi_choice:
+        option_ids = _option_ids(task_payload)
+
+        def _validate_multi(answer_payload: dict) -> dict:
+            choice_ids = answer_payload.get("choice_ids")
+            if not isinstance(choice_ids, list) or len(choice_ids) == 0:
+                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+            if any(not isinstance(cid, str) for cid in choice_ids):
+                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+            if len(set(choice_ids)) != len(choice_ids):
+                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+            if any(cid not in option_ids for cid in choice_ids):
+                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+            return {"choice_ids": choice_ids}
+
+        return _validate_multi
+
+    if task_type == TaskType.short_text:
+        subtype = task_payload.get("subtype")
+        pattern = _INT_RE if subtype == "int" else _FLOAT_RE if subtype == "float" else None
+
+        def _validate_text(answer_payload: dict) -> dict:
+            text = answer_payload.get("text")
+            if not isinstance(text, str):
+                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+            trimmed = text.strip()
+            if trimmed == "":
+                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+            if pattern is not None and not pattern.fullmatch(trimmed):
+                raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+            return {"text": trimmed}
+
+        return _validate_text
+
+    return _invalid_answer
+
+
+def compile_grader(task_type: TaskType, task_payload: dict) -> Grader:
+    """Build the grader for one task with expected values parsed up front."""
+    if task_type == TaskType.single_choice:
+        correct_id = task_payload.get("correct_option_id")
+        return lambda answer_payload: answer_payload.get("choice_id") == correct_id
+
+    if task_type == TaskType.multi_choice:
+        correct_ids = frozenset(task_payload.get("correct_option_ids") or [])
+        return lambda answer_payload: set(answer_payload.get("choice_ids") or []) == correct_ids
+
+    if task_type != TaskType.short_text:
+        return _never_correct
+
+    subtype = task_payload.get("subtype")
+    expected = task_payload.get("expected")
+
+    if subtype == "int":
+        try:
+            exp_int = int(expected)
+        except (TypeError, ValueError):
+            return _never_correct
+
+        def _grade_int(answer_payload: dict) -> bool:
+            try:
+                return int((answer_payload.get("text") or "").strip()) == exp_int
+            except (TypeError, ValueError):
+                return False
+
+        return _grade_int
+
+    if subtype == "float":
+        try:
+            exp_float = float(str(expected).replace(",", "."))
+            eps_val = float(task_payload.get("epsilon", 0.01))
+        except (TypeError, ValueError):
+            return _never_correct
+
+        def _grade_float(answer_payload: dict) -> bool:
+            try:
+                got = float((answer_payload.get("text") or "").strip().replace(",", "."))
+            except (TypeError, ValueError):
+                return False
+            return abs(got - exp_float) <= eps_val
+
+        return _grade_float
+
+    if subtype == "text":
+        case_insensitive = task_payload.get("case_insensitive", True)
+        collapse_spaces = task_payload.get("collapse_spaces", False)
+
+        def _prepare(value: str) -> str:
+            if case_insensitive:
+                value = value.lower()
+            if collapse_spaces:
+                value = _normalize_spaces(value)
+            return value
+
+        exp_text = _prepare(str(expected).strip())
+        return lambda answer_payload: _prepare((answer_payload.get("text") or "").strip()) == exp_text
+
+    return _never_correct
+
+
+def grade_task(task_type: TaskType, task_payload: dict, answer_payload: dict | None) -> bool:
+    if answer_payload is None:
+        return False
+    return compile_grader(task_type, task_payload)(answer_payload)
+
+
+class AnswerKey:
+    """Compiled validators and graders for every task of one olympiad.
+
+    Built once per cached task set and stored next to it in the L1 cache.
+    """
+
+    __slots__ = ("tasks", "validators", "graders")
+
+    def __init__(self, tasks: Iterable[tuple]):
+        self.tasks: tuple[tuple, ...] = tuple(tasks)
+        self.validators: dict[int, Validator] = {}
+        self.graders: dict[int, Grader] = {}
+        for olymp_task, task in self.tasks:
+            self.validators[olymp_task.task_id] = compile_validator(task.task_type, task.payload)
+            self.graders[task.id] = compile_grader(task.task_type, task.payload)
+
+    def validate(self, task_id: int, answer_payload: dict) -> dict:
+        validator = self.validators.get(task_id)
+        if validator is None:
+            raise ValueError(codes.TASK_NOT_FOUND)
+        if not isinstance(answer_payload, dict):
+            raise ValueError(codes.INVALID_ANSWER_PAYLOAD)
+        return validator(answer_payload)
+
+    def grade(self, task_id: int, answer_payload: dict | None) -> bool:
+        if answer_payload is None:
+            return False
+        return self.graders[task_id](answer_payload)
+
+
+def pass_score_for(score_max: int, pass_percent: int) -> int:
+    return math.ceil(score_max * int(pass_percent) / 100) if score_max > 0 else 0
+
+
+def needs_expire_grade(attempt, now: datetime) -> bool:
+    # активная попытка с прошедшим дедлайном или expired без оценки
+    if attempt.status == AttemptStatus.active and now > attempt.deadline_at:
+        return True
+    return attempt.status == AttemptStatus.expired and (attempt.graded_at is None or attempt.score_max == 0)
+
+
+def compute_attempt_grade(
+    *,
+    attempt_id: int,
+    answer_key: AnswerKey,
+    answers_by_task: Mapping[int, dict | None],
+    pass_percent: int,
+    graded_at: datetime,
+) -> AttemptGrade:
+    """Grade one attempt; ``answers_by_task`` maps task_id to the stored answer payload."""
+    score_total = 0
+    score_max = 0
+    task_grades: list[TaskGrade] = []
+    for olymp_task, task in answer_key.tasks:
+        max_score = int(olymp_task.max_score)
+        is_correct = answer_key.grade(task.id, answers_by_task.get(task.id))
+        score = max_score if is_correct else 0
+        score_max += max_score
+        score_total += score
+        task_grades.append(
+            TaskGrade(task_id=task.id, is_correct=is_correct, score=score, max_score=max_score)
+        )
+
+    return AttemptGrade(
+        attempt_id=attempt_id,
+        score_total=score_total,
+        score_max=score_max,
+        passed=score_total >= pass_score_for(score_max, pass_percent),
+        graded_at=graded_at,
+        tasks=tuple(task_grades),
+    )
+
+
+def answers_payload_map(answers: Iterable) -> dict[int, dict]:
+    return {a.task_id: a.answer_payload for a in answers}
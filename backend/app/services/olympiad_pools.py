@@ -7,6 +7,7 @@ from app.core import error_codes as codes
 from app.core.age_groups import class_grades_allow
 from app.core.olympiad_pools import normalize_grade_group, normalize_subject
 from app.models.olympiad_pool import OlympiadPool, OlympiadPoolItem, OlympiadAssignment
+from app.models.user import User
 from app.repos.olympiad_assignments import OlympiadAssignmentsRepo
 from app.repos.olympiad_pools import OlympiadPoolsRepo
 from app.repos.olympiads import OlympiadsRepo
@@ -5,7 +5,7 @@ from app.models.olympiad_task import OlympiadTask
 from app.repos.olympiads import OlympiadsRepo
 from app.repos.olympiad_tasks import OlympiadTasksRepo
 from app.repos.tasks import TasksRepo
-from app.core.cache import olympiad_tasks_key, olympiad_meta_key
+from app.core.cache import invalidate_keys, olympiad_tasks_key, olympiad_meta_key
 from app.core.redis import safe_redis
 from app.core import error_codes as codes
 
@@ -18,12 +18,10 @@ class AdminOlympiadsService:
 
     async def _invalidate_cache(self, olympiad_id: int) -> None:
         redis = await safe_redis()
-        if redis is None:
-            return
         try:
-            await redis.delete(
-                olympiad_tasks_key(olympiad_id),
-                olympiad_meta_key(olympiad_id),
+            await invalidate_keys(
+                redis,
+                [olympiad_tasks_key(olympiad_id), olympiad_meta_key(olympiad_id)],
             )
         except Exception:
             pass
@@ -0,0 +1,154 @@
+"""Streaming export of olympiad results.
+
+Rows come from a server-side cursor (``yield_per``) and are written out one
+batch at a time, so memory stays flat regardless of the number of attempts.
+CSV is streamed directly; XLSX is built by openpyxl in write-only mode (rows
+go to a temporary file) and the finished file is streamed in chunks.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import os
+import tempfile
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import datetime, timezone
+from typing import Any
+
+from openpyxl import Workbook
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.repos.teacher import TeacherRepo
+
+BASE_COLUMNS = [
+    "id",
+    "user_id",
+    "user_login",
+    "user_full_name",
+    "gender",
+    "class_grade",
+    "city",
+    "school",
+    "teachers",
+    "started_at",
+    "completed_at",
+    "duration_sec",
+    "score_total",
+    "score_max",
+    "percent",
+]
+
+XLSX_CHUNK_SIZE = 64 * 1024
+
+
+def teachers_value(linked: Iterable[str], manual_teachers: list | None) -> str | None:
+    """Linked teacher names followed by manually entered ones, without duplicates."""
+    teachers = [name for name in linked if name]
+    for teacher in manual_teachers or []:
+        if isinstance(teacher, dict):
+            manual_name = str(teacher.get("full_name") or "").strip()
+            if manual_name:
+                teachers.append(manual_name)
+    deduped_teachers = list(dict.fromkeys(teachers))
+    return "; ".join(deduped_teachers) if deduped_teachers else None
+
+
+def header(task_ids: Sequence[int]) -> list[str]:
+    return BASE_COLUMNS + [f"task_{task_id}" for task_id in task_ids]
+
+
+def export_row(row, task_ids: Sequence[int]) -> list[Any]:
+    full_name = " ".join(filter(None, [row.surname, row.name, row.father_name])) or None
+    score_max = row.score_max or 0
+    percent = int(round(row.score_total / score_max * 100)) if score_max > 0 else 0
+    scores = row.task_scores or {}
+    return [
+        row.id,
+        row.user_id,
+        row.login,
+        full_name,
+        row.gender.value if row.gender else None,
+        row.class_grade,
+        row.city,
+        row.school,
+        teachers_value(row.teacher_names or [], row.manual_teachers),
+        row.started_at,
+        row.graded_at,
+        row.duration_sec,
+        row.score_total,
+        row.score_max,
+        percent,
+    ] + [scores.get(str(task_id)) for task_id in task_ids]
+
+
+async def _row_batches(
+    session_maker: async_sessionmaker[AsyncSession],
+    olympiad_id: int,
+    task_ids: Sequence[int],
+    batch_size: int,
+) -> AsyncIterator[list[list[Any]]]:
+    async with session_maker() as session:
+        result = await TeacherRepo(session).stream_olympiad_export(olympiad_id, yield_per=batch_size)
+        async for partition in result.partitions():
+            yield [export_row(row, task_ids) for row in partition]
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def iter_csv(
+    session_maker: async_sessionmaker[AsyncSession],
+    *,
+    olympiad_id: int,
+    task_ids: Sequence[int],
+    batch_size: int,
+) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM — чтобы Excel корректно открыл кириллицу
+    buf.write("\ufeff")
+    writer.writerow(header(task_ids))
+    yield buf.getvalue().encode("utf-8")
+    async for batch in _row_batches(session_maker, olympiad_id, task_ids, batch_size):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buf.getvalue().encode("utf-8")
+
+
+def _xlsx_value(value: Any) -> Any:
+    # Excel не хранит часовой пояс — пишем UTC без tzinfo
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+async def iter_xlsx(
+    session_maker: async_sessionmaker[AsyncSession],
+    *,
+    olympiad_id: int,
+    task_ids: Sequence[int],
+    batch_size: int,
+) -> AsyncIterator[bytes]:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("results")
+    sheet.append(header(task_ids))
+    async for batch in _row_batches(session_maker, olympiad_id, task_ids, batch_size):
+        for row in batch:
+            sheet.append([_xlsx_value(value) for value in row])
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(workbook.save, path)
+        with open(path, "rb") as fh:
+            while chunk := await asyncio.to_thread(fh.read, XLSX_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.unlink(path)
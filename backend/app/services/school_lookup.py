@@ -0,0 +1,166 @@
+"""Autocomplete index for ``/lookup/cities`` and ``/lookup/schools``.
+
+The schools directory is small and changes only when ``scripts/load_school.py``
+runs or an admin adds a school, so every worker keeps it in memory: a sorted
+array of normalized city names (prefix search via ``bisect``) and a trigram
+inverted index over school names (substring search). Names are normalized
+case-insensitively with ``ё`` folded to ``е``.
+
+Loaders bump the ``schools:index:version`` Redis key and publish an
+invalidation; workers also re-check the version every
+``SCHOOL_INDEX_CHECK_SEC`` and rebuild only when it changed.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LocalCache, invalidate_keys, register_local_cache
+from app.core.config import settings
+from app.core.redis import mark_redis_down, redis_marked_down, safe_redis
+from app.models.school import School
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY = "cache:schools:index:v1"
+VERSION_KEY = "schools:index:version"
+
+_index_cache = register_local_cache(LocalCache(maxsize=1, ttl_sec=settings.SCHOOL_INDEX_CHECK_SEC))
+_build_lock = asyncio.Lock()
+_index: SchoolIndex | None = None
+
+
+def normalize(value: str) -> str:
+    return " ".join(value.replace("ё", "е").replace("Ё", "Е").lower().split())
+
+
+def _trigrams(value: str) -> set[str]:
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
+class SchoolIndex:
+    def __init__(self, rows: Iterable[tuple[str, str]], *, version: str | None = None):
+        self.version = version
+        rows = sorted({(city, name) for city, name in rows}, key=lambda row: (normalize(row[1]), row[1], row[0]))
+
+        digest = hashlib.sha1()
+        cities: set[tuple[str, str]] = set()
+        self.names: list[str] = []
+        self.name_keys: list[str] = []
+        self.name_cities: list[str] = []
+        self.by_city: dict[str, list[int]] = {}
+        self.trigrams: dict[str, list[int]] = {}
+        for school_id, (city, name) in enumerate(rows):
+            digest.update(f"{city}\x1f{name}\x1e".encode())
+            city_key = normalize(city)
+            name_key = normalize(name)
+            cities.add((city_key, city))
+            self.names.append(name)
+            self.name_keys.append(name_key)
+            self.name_cities.append(city_key)
+            self.by_city.setdefault(city_key, []).append(school_id)
+            for trigram in _trigrams(name_key):
+                self.trigrams.setdefault(trigram, []).append(school_id)
+        self.digest = digest.hexdigest()
+
+        ordered = sorted(cities)
+        self.city_keys = [key for key, _ in ordered]
+        self.city_names = [city for _, city in ordered]
+
+    def cities(self, query: str, limit: int) -> list[str]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        result: list[str] = []
+        pos = bisect_left(self.city_keys, prefix)
+        while pos < len(self.city_keys) and len(result) < limit and self.city_keys[pos].startswith(prefix):
+            result.append(self.city_names[pos])
+            pos += 1
+        return result
+
+    def schools(self, city: str, query: str, limit: int) -> list[str]:
+        city_key = normalize(city)
+        candidates = self.by_city.get(city_key)
+        if not candidates:
+            return []
+        needle = normalize(query)
+        if len(needle) >= 3:
+            postings = [self.trigrams.get(trigram) for trigram in _trigrams(needle)]
+            if not all(postings):
+                return []
+            shortest = min(postings, key=len)
+            if len(shortest) < len(candidates):
+                candidates = shortest
+
+        result: list[str] = []
+        seen: set[str] = set()
+        for school_id in candidates:
+            if self.name_cities[school_id] != city_key or needle not in self.name_keys[school_id]:
+                continue
+            name = self.names[school_id]
+            if name in seen:
+                continue
+            seen.add(name)
+            result.append(name)
+            if len(result) >= limit:
+                break
+        return result
+
+    def etag(self, *parts: object) -> str:
+        key = "\x1f".join([self.digest, *(str(part) for part in parts)])
+        return '"' + hashlib.sha1(key.encode()).hexdigest()[:32] + '"'
+
+
+async def _redis() -> Redis | None:
+    return None if redis_marked_down() else await safe_redis()
+
+
+async def _current_version() -> str | None:
+    redis = await _redis()
+    if redis is None:
+        return None
+    try:
+        value = await redis.get(VERSION_KEY)
+    except (RedisError, OSError):
+        mark_redis_down()
+        return None
+    return str(value) if value is not None else "0"
+
+
+async def get_index(db: AsyncSession) -> SchoolIndex:
+    global _index
+    index = _index_cache.get(INDEX_KEY, cache="school_index")
+    if index is not None:
+        return index
+    async with _build_lock:
+        version = await _current_version()
+        # без Redis версию не узнать — перечитываем таблицу раз в SCHOOL_INDEX_CHECK_SEC
+        if _index is None or version is None or _index.version != version:
+            result = await db.execute(select(School.city, School.name))
+            _index = SchoolIndex(result.all(), version=version)
+            logger.info("school_index_built schools=%s version=%s", len(_index.names), version)
+        _index_cache.set(INDEX_KEY, _index)
+        return _index
+
+
+async def bump_index_version() -> None:
+    """Make every worker rebuild the index on its next lookup."""
+    global _index
+    _index = None
+    redis = await _redis()
+    try:
+        if redis is not None:
+            await redis.incr(VERSION_KEY)
+        await invalidate_keys(redis, [INDEX_KEY])
+    except (RedisError, OSError):
+        mark_redis_down()
+        _index_cache.invalidate(INDEX_KEY)
+        logger.warning("school_index_invalidation_failed", exc_info=True)
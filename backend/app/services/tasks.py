@@ -1,10 +1,10 @@
 from datetime import datetime, timezone
 
-from app.models.task import Task, TaskType
+from app.models.task import Task
 from app.repos.tasks import TasksRepo
 from app.schemas.tasks import TaskCreate
 from app.core.redis import safe_redis
-from app.core.cache import olympiad_tasks_key
+from app.core.cache import invalidate_keys, olympiad_tasks_key
 
 
 class TasksService:
@@ -53,14 +53,11 @@ class TasksService:
 
     async def _invalidate_task_cache(self, task_id: int) -> None:
         redis = await safe_redis()
-        if redis is None:
-            return
         try:
             olympiad_ids = await self.repo.list_olympiad_ids_for_task(task_id)
             if not olympiad_ids:
                 return
-            keys = [olympiad_tasks_key(oid) for oid in olympiad_ids]
-            await redis.delete(*keys)
+            await invalidate_keys(redis, [olympiad_tasks_key(oid) for oid in olympiad_ids])
         except Exception:
             pass
 
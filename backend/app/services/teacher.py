@@ -1,5 +1,4 @@
 from datetime import datetime, timezone
-import math
 
 from app.models.attempt import AttemptStatus
 from app.models.teacher_student import TeacherStudentStatus
@@ -8,7 +7,7 @@ from app.repos.attempts import AttemptsRepo
 from app.repos.olympiads import OlympiadsRepo
 from app.repos.teacher import TeacherRepo
 from app.repos.teacher_students import TeacherStudentsRepo
-from app.services.attempts import AttemptsService
+from app.services import answer_buffer, attempt_stats, grading
 from app.core import error_codes as codes
 
 
@@ -37,58 +36,44 @@ class TeacherService:
                 raise ValueError(codes.FORBIDDEN)
 
         tasks = await self.teacher_repo.list_tasks(attempt.olympiad_id)
+        now = datetime.now(timezone.utc)
+        needs_expire_grade = grading.needs_expire_grade(attempt, now)
+        await answer_buffer.flush_before_read(
+            AttemptsRepo(self.teacher_repo.db), [attempt.id], close=needs_expire_grade
+        )
         answers = await self.teacher_repo.list_answers(attempt.id)
         answers_by_task = {a.task_id: a for a in answers}
 
-        now = datetime.now(timezone.utc)
-        needs_expire_grade = False
-        if attempt.status == AttemptStatus.active and now > attempt.deadline_at:
-            needs_expire_grade = True
-        elif attempt.status == AttemptStatus.expired and (attempt.graded_at is None or attempt.score_max == 0):
-            needs_expire_grade = True
-
         if needs_expire_grade:
-            grader = AttemptsService(AttemptsRepo(self.teacher_repo.db))
-            score_total = 0
-            score_max = 0
-            now_ts = grader._now_utc()
-
-            await grader.repo.delete_grades(attempt.id)
-            for olymp_task, task in tasks:
-                score_max += int(olymp_task.max_score)
-                answer = answers_by_task.get(task.id)
-                answer_payload = None if answer is None else answer.answer_payload
-                is_correct = grader._grade_task(task.task_type, task.payload, answer_payload)
-                score = int(olymp_task.max_score) if is_correct else 0
-                score_total += score
-
-                await grader.repo.add_grade(
-                    attempt_id=attempt.id,
-                    task_id=task.id,
-                    is_correct=is_correct,
-                    score=score,
-                    max_score=int(olymp_task.max_score),
-                    graded_at=now_ts,
-                )
-
-            pass_score = math.ceil(score_max * int(olympiad.pass_percent) / 100) if score_max > 0 else 0
-            passed = score_total >= pass_score
-
-            await grader.repo.mark_expired_with_grade(
+            attempts_repo = AttemptsRepo(self.teacher_repo.db)
+            grade = grading.compute_attempt_grade(
                 attempt_id=attempt.id,
-                score_total=score_total,
-                score_max=score_max,
-                passed=passed,
-                graded_at=now_ts,
+                answer_key=grading.AnswerKey(tasks),
+                answers_by_task=grading.answers_payload_map(answers),
+                pass_percent=olympiad.pass_percent,
+                graded_at=now,
             )
-            attempt = await grader.repo.get_attempt(attempt.id)
+            if await attempts_repo.save_grades([grade], status=AttemptStatus.expired):
+                await attempt_stats.record_closed([attempt.id], status=AttemptStatus.expired, at=now)
+            attempt = await attempts_repo.get_attempt(attempt.id)
 
         return attempt, user, olympiad, tasks, answers_by_task
 
-    async def list_olympiad_attempts(self, *, teacher: User, olympiad_id: int):
+    async def list_olympiad_attempts(
+        self,
+        *,
+        teacher: User,
+        olympiad_id: int,
+        limit: int | None = None,
+        before_id: int | None = None,
+    ):
         olympiad = await self._ensure_olympiad(olympiad_id=olympiad_id)
         if teacher.role == UserRole.admin:
-            rows = await self.teacher_repo.list_attempts_for_olympiad_with_users(olympiad_id)
+            rows = await self.teacher_repo.list_attempts_for_olympiad_with_users(
+                olympiad_id, limit=limit, before_id=before_id
+            )
         else:
-            rows = await self.teacher_repo.list_attempts_for_olympiad_with_users_for_teacher(olympiad_id, teacher.id)
+            rows = await self.teacher_repo.list_attempts_for_olympiad_with_users_for_teacher(
+                olympiad_id, teacher.id, limit=limit, before_id=before_id
+            )
         return olympiad, rows
@@ -0,0 +1,73 @@
+"""Teacher certificates index.
+
+Certificates live in storage as
+``certificates/teachers/<YYYY>_<YYYY+1>/certificate_<teacher_id>_<YYYY>_<YYYY+1>_<seq>.jpg``.
+The ``teacher_certificates`` table maps (teacher_id, season) to these keys so
+the teacher page is one indexed lookup instead of a listing of the whole
+season prefix. The uploader adds rows for what it uploads;
+``reconcile_certificate_index`` rebuilds the table from one bucket listing.
+Until a season has any rows (e.g. right after the table was created), the
+page falls back to listing only this teacher's keys of that season.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+from collections.abc import Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.storage import list_object_keys_async
+from app.repos.teacher_certificates import TeacherCertificatesRepo
+
+logger = logging.getLogger(__name__)
+
+CERT_PREFIX = "certificates/teachers"
+CERT_RE = re.compile(r"^certificate_(\d+)_(\d{4})_(\d{4})_(\d{2})\.jpg$", re.IGNORECASE)
+
+
+def parse_certificate_key(key: str) -> dict | None:
+    """``{teacher_id, season, seq, key}`` for a certificate key, ``None`` for anything else."""
+    folder, file_name = os.path.split(key)
+    match = CERT_RE.match(file_name)
+    if not match:
+        return None
+    teacher_id, year_start, year_end, seq = match.groups()
+    season = f"{year_start}_{year_end}"
+    if int(year_end) != int(year_start) + 1 or folder != f"{CERT_PREFIX}/{season}":
+        return None
+    return {"teacher_id": int(teacher_id), "season": season, "seq": int(seq), "key": key}
+
+
+def certificate_rows(keys: Iterable[str]) -> list[dict]:
+    return [row for row in map(parse_certificate_key, keys) if row is not None]
+
+
+async def reconcile_certificate_index(db: AsyncSession) -> int:
+    """Rebuild ``teacher_certificates`` from a single listing of ``certificates/teachers/``."""
+    keys = await list_object_keys_async(f"{CERT_PREFIX}/")
+    rows = certificate_rows(keys)
+    indexed = await TeacherCertificatesRepo(db).replace_all(rows)
+    logger.info("teacher_certificates_reconciled keys=%s indexed=%s", len(keys), indexed)
+    return indexed
+
+
+async def teacher_certificate_rows(db: AsyncSession, teacher_id: int, season: str) -> list[dict]:
+    """``{teacher_id, season, seq, key}`` rows ordered by ``seq``; ``RuntimeError`` if the fallback listing fails."""
+    repo = TeacherCertificatesRepo(db)
+    certificates = await repo.list_for_teacher(teacher_id, season)
+    if certificates:
+        return [
+            {"teacher_id": c.teacher_id, "season": c.season, "seq": c.seq, "key": c.key}
+            for c in certificates
+        ]
+    if await repo.season_indexed(season):
+        return []
+    # сезон ещё не проиндексирован — листинг только ключей этого учителя, не всего сезона
+    try:
+        keys = await list_object_keys_async(f"{CERT_PREFIX}/{season}/certificate_{teacher_id}_")
+    except Exception as exc:
+        raise RuntimeError("storage_unavailable") from exc
+    rows = [row for row in certificate_rows(keys) if row["teacher_id"] == teacher_id and row["season"] == season]
+    return sorted(rows, key=lambda row: row["seq"])
@@ -1,3 +1,3 @@
 """Celery task package."""
 
-from app.tasks import email, maintenance  # noqa: F401
+from app.tasks import announcements, diplomas, email, maintenance  # noqa: F401
@@ -0,0 +1,15 @@
+import asyncio
+
+from app.core.celery_app import celery_app
+from app.db.session import SessionLocal
+from app.services.announcements import LOAD_ASSIGNMENTS_TASK, load_assignments_hash
+
+
+async def _load_assignments(campaign_id: int, subject: str, *, session_maker=SessionLocal) -> bool:
+    async with session_maker() as session:
+        return await load_assignments_hash(session, campaign_id, subject)
+
+
+@celery_app.task(name=LOAD_ASSIGNMENTS_TASK)
+def load_assignments(campaign_id: int, subject: str) -> bool:
+    return asyncio.run(_load_assignments(campaign_id, subject))
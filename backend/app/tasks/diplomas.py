@@ -0,0 +1,39 @@
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from app.core.celery_app import celery_app
+from app.services import diploma_render
+
+# дочерние процессы prefork-пула Celery — демоны и не могут заводить свой пул процессов,
+# поэтому рендер идёт в отдельном интерпретаторе (см. diploma_render.main)
+RENDER_COMMAND = [sys.executable, "-m", "app.services.diploma_render"]
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+
+# acks_late: если воркер упал посреди пачки, задача вернётся в очередь и продолжит
+# с уже отрисованных дипломов (см. diploma_render.done_key)
+@celery_app.task(name="diplomas.render", bind=True, acks_late=True, reject_on_worker_lost=True)
+def render_diplomas(self, olympiad_id: int, template: dict) -> dict:
+    job_id = self.request.id
+    proc = subprocess.Popen(
+        [*RENDER_COMMAND, str(olympiad_id), job_id],
+        cwd=BACKEND_ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    proc.stdin.write(json.dumps(template))
+    proc.stdin.close()
+    state = None
+    for line in proc.stdout:
+        state = json.loads(line)
+        self.update_state(state="PROGRESS", meta=state)
+    returncode = proc.wait()
+    if returncode != 0 or state is None or state["status"] in diploma_render.ACTIVE_STATUSES:
+        state = asyncio.run(
+            diploma_render.mark_failed(job_id, olympiad_id, f"render_process_exited: {returncode}")
+        )
+    return state
@@ -1,21 +1,30 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 from datetime import datetime, timedelta, timezone
 
+from redis.asyncio import Redis
 from sqlalchemy import delete, update, or_, select
 
 from app.core.celery_app import celery_app
 from app.core.config import settings
+from app.core.metrics import ATTEMPTS_SUBMITTED_TOTAL
 from app.core.redis import safe_redis
+from app.core.security import generate_token
 from app.core import redis as redis_module
+from app.models.attempt import AttemptStatus
 from app.models.auth_token import RefreshToken
 from app.models.audit_log import AuditLog
 from app.models.olympiad import Olympiad
 from app.models.user import User
 from app.db.session import SessionLocal
 from app.repos.attempts import AttemptsRepo
-from app.services.attempts import AttemptsService
+from app.services import answer_buffer, attempt_stats, diplomas, grading
+from app.services.teacher_certificates import reconcile_certificate_index
+from app.services.attempts import AttemptsService, submit_lock_key
+
+logger = logging.getLogger(__name__)
 
 
 async def _cleanup_expired_auth(
@@ -91,6 +100,134 @@ async def _warmup_olympiad_cache(
         redis_module.redis_client = prev_redis
 
 
+RELEASE_LOCK_LUA = r"""
+for i = 1, #KEYS do
+  if redis.call("GET", KEYS[i]) == ARGV[1] then
+    redis.call("DEL", KEYS[i])
+  end
+end
+return 1
+"""
+
+
+async def _lock_attempts(redis: Redis | None, attempt_ids: list[int], token: str) -> list[int]:
+    """Take the submit lock of each attempt; attempts being submitted right now are skipped."""
+    if redis is None or redis_module.redis_marked_down():
+        return attempt_ids  # как submit: без Redis защищает только условие в save_grades
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for attempt_id in attempt_ids:
+            pipe.set(submit_lock_key(attempt_id), token, nx=True, ex=settings.SUBMIT_LOCK_TTL_SEC)
+        acquired = await pipe.execute()
+    except Exception:
+        redis_module.mark_redis_down()
+        return attempt_ids
+    return [attempt_id for attempt_id, ok in zip(attempt_ids, acquired) if ok]
+
+
+async def _unlock_attempts(redis: Redis | None, attempt_ids: list[int], token: str) -> None:
+    if redis is None or not attempt_ids:
+        return
+    try:
+        await redis.eval(RELEASE_LOCK_LUA, len(attempt_ids), *(submit_lock_key(a) for a in attempt_ids), token)
+    except Exception:
+        logger.warning("grade_overdue_attempts_unlock_failed", exc_info=True)
+
+
+async def _grade_overdue_attempts(
+    *,
+    session_maker=SessionLocal,
+    redis_getter=safe_redis,
+    batch_size: int,
+) -> int:
+    redis = await redis_getter()
+    prev_redis = redis_module.redis_client
+    if redis is not None:
+        redis_module.redis_client = redis
+    now = datetime.now(timezone.utc)
+    token = generate_token()
+    graded = 0
+    try:
+        async with session_maker() as session:
+            repo = AttemptsRepo(session)
+            service = AttemptsService(repo)
+            contexts: dict[int, tuple] = {}
+            after_id = 0
+            while True:
+                attempts = await repo.list_overdue_attempts(now=now, after_id=after_id, limit=batch_size)
+                if not attempts:
+                    break
+                after_id = attempts[-1].id
+
+                # попытки, которые сейчас сдаются, подберёт следующий запуск
+                locked = set(await _lock_attempts(redis, [a.id for a in attempts], token))
+                attempts = [a for a in attempts if a.id in locked]
+                try:
+                    closed = await _grade_overdue_chunk(service, repo, attempts, contexts, now=now)
+                except Exception:
+                    await session.rollback()
+                    logger.exception("grade_overdue_attempts_chunk_failed after_id=%s", after_id)
+                    continue
+                finally:
+                    await _unlock_attempts(redis, [a.id for a in attempts], token)
+                ATTEMPTS_SUBMITTED_TOTAL.labels(status="expired").inc(len(closed))
+                await attempt_stats.record_closed(closed, status=AttemptStatus.expired, at=now)
+                graded += len(closed)
+        return graded
+    finally:
+        redis_module.redis_client = prev_redis
+
+
+async def _grade_overdue_chunk(
+    service: AttemptsService,
+    repo: AttemptsRepo,
+    attempts: list,
+    contexts: dict[int, tuple],
+    *,
+    now: datetime,
+) -> list[int]:
+    if not attempts:
+        return []
+    await answer_buffer.flush_before_read(repo, [a.id for a in attempts], close=True)
+    answers_by_attempt: dict[int, dict[int, dict]] = {}
+    for answer in await repo.list_answers_for_attempts([a.id for a in attempts]):
+        answers_by_attempt.setdefault(answer.attempt_id, {})[answer.task_id] = answer.answer_payload
+
+    grades = []
+    for attempt in attempts:
+        if attempt.olympiad_id not in contexts:
+            contexts[attempt.olympiad_id] = await service.get_grading_context(attempt.olympiad_id)
+        olympiad, answer_key = contexts[attempt.olympiad_id]
+        if olympiad is None:
+            continue
+        grades.append(
+            grading.compute_attempt_grade(
+                attempt_id=attempt.id,
+                answer_key=answer_key,
+                answers_by_task=answers_by_attempt.get(attempt.id, {}),
+                pass_percent=olympiad.pass_percent,
+                graded_at=now,
+            )
+        )
+    # save_grades пропускает попытки, которые успел закрыть submit/просмотр
+    return await repo.save_grades(grades, status=AttemptStatus.expired)
+
+
+async def _reconcile_teacher_certificates(
+    *,
+    session_maker=SessionLocal,
+) -> int:
+    async with session_maker() as session:
+        return await reconcile_certificate_index(session)
+
+
+async def _rebuild_diploma_index(*, redis_getter=safe_redis) -> int | None:
+    redis = await redis_getter()
+    if redis is None:
+        return None
+    return await diplomas.rebuild_diploma_index(redis)
+
+
 @celery_app.task(name="maintenance.cleanup_expired_auth")
 def cleanup_expired_auth() -> dict[str, int]:
     return asyncio.run(_cleanup_expired_auth())
@@ -104,3 +241,18 @@ def cleanup_audit_logs() -> int:
 @celery_app.task(name="maintenance.warmup_olympiad_cache")
 def warmup_olympiad_cache() -> int:
     return asyncio.run(_warmup_olympiad_cache())
+
+
+@celery_app.task(name="maintenance.grade_overdue_attempts")
+def grade_overdue_attempts() -> int:
+    return asyncio.run(_grade_overdue_attempts(batch_size=settings.OVERDUE_GRADE_BATCH_SIZE))
+
+
+@celery_app.task(name="maintenance.reconcile_teacher_certificates")
+def reconcile_teacher_certificates() -> int:
+    return asyncio.run(_reconcile_teacher_certificates())
+
+
+@celery_app.task(name="maintenance.rebuild_diploma_index")
+def rebuild_diploma_index() -> int | None:
+    return asyncio.run(_rebuild_diploma_index())
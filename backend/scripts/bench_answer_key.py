@@ -0,0 +1,88 @@
+"""Micro-benchmark: per-answer CPU time of the compiled answer key vs. per-call checks.
+
+The "before" path mirrors the old upsert/grade flow: linear scan for the task,
+then option sets / expected values derived from the payload on every call.
+
+    python scripts/bench_answer_key.py --tasks 40 --rounds 200
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.models.task import TaskType
+from app.services.attempts import AttemptsService
+from app.services.grading import AnswerKey, grade_task
+
+
+def _build_tasks(count: int):
+    tasks = []
+    for i in range(1, count + 1):
+        kind = i % 4
+        if kind == 0:
+            task_type = TaskType.single_choice
+            payload = {"options": [{"id": c, "text": c} for c in "ABCDE"], "correct_option_id": "C"}
+            answer = {"choice_id": "C"}
+        elif kind == 1:
+            task_type = TaskType.multi_choice
+            payload = {"options": [{"id": c, "text": c} for c in "ABCDE"], "correct_option_ids": ["A", "D"]}
+            answer = {"choice_ids": ["D", "A"]}
+        elif kind == 2:
+            task_type = TaskType.short_text
+            payload = {"subtype": "float", "expected": "2,5", "epsilon": 0.01}
+            answer = {"text": "2.5"}
+        else:
+            task_type = TaskType.short_text
+            payload = {"subtype": "text", "expected": "Ответ  здесь", "collapse_spaces": True}
+            answer = {"text": "ответ здесь"}
+        tasks.append(
+            (
+                SimpleNamespace(task_id=i, sort_order=i, max_score=1),
+                SimpleNamespace(id=i, task_type=task_type, payload=payload),
+                answer,
+            )
+        )
+    return tasks
+
+
+def _per_answer_before(tasks, rounds: int) -> float:
+    pairs = [(ot, t) for ot, t, _answer in tasks]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for ot, _t, answer in tasks:
+            _olymp_task, task = next((o, t) for o, t in pairs if o.task_id == ot.task_id)
+            AttemptsService._validate_answer_payload(task.task_type, task.payload, answer)
+            grade_task(task.task_type, task.payload, answer)
+    return (time.perf_counter() - start) / (rounds * len(tasks))
+
+
+def _per_answer_after(tasks, rounds: int) -> float:
+    key = AnswerKey((ot, t) for ot, t, _answer in tasks)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for ot, _t, answer in tasks:
+            key.validate(ot.task_id, answer)
+            key.grade(ot.task_id, answer)
+    return (time.perf_counter() - start) / (rounds * len(tasks))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-answer validate+grade CPU time, before/after AnswerKey.")
+    parser.add_argument("--tasks", type=int, default=40, help="Tasks in the olympiad")
+    parser.add_argument("--rounds", type=int, default=200, help="Answers per task per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs; the best one is reported")
+    args = parser.parse_args()
+
+    tasks = _build_tasks(args.tasks)
+    before = min(_per_answer_before(tasks, args.rounds) for _ in range(args.repeat))
+    after = min(_per_answer_after(tasks, args.rounds) for _ in range(args.repeat))
+    print(f"per-answer validate+grade: before={before * 1e6:.2f}us after={after * 1e6:.2f}us")
+    print(f"speedup: {before / after:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
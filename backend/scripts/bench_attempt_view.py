@@ -0,0 +1,96 @@
+"""Load benchmark for GET /api/v1/attempts/{id}.
+
+Run it against the same deployment before and after a change and compare
+the requests/sec and latency percentiles:
+
+    python scripts/bench_attempt_view.py --base-url http://localhost:8000 \
+        --login student01 --password StrongPass1 --attempt-id 1 --concurrency 50 --duration 30
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _get_token(client: httpx.AsyncClient, login: str, password: str) -> str:
+    resp = await client.post("/api/v1/auth/login", json={"login": login, "password": password})
+    resp.raise_for_status()
+    return resp.json()["access_token"]
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    url: str,
+    deadline: float,
+    latencies: list[float],
+    statuses: dict[int, int],
+) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            resp = await client.get(url)
+            status = resp.status_code
+        except httpx.HTTPError:
+            status = 0
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+async def run(args: argparse.Namespace) -> int:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        token = args.token or await _get_token(client, args.login, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        url = f"/api/v1/attempts/{args.attempt_id}"
+
+        warmup = await client.get(url)
+        if warmup.status_code != 200:
+            print(f"warmup request failed: {warmup.status_code} {warmup.text[:200]}", file=sys.stderr)
+            return 1
+
+        latencies: list[float] = []
+        statuses: dict[int, int] = {}
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(_worker(client, url, deadline, latencies, statuses) for _ in range(args.concurrency))
+        )
+        elapsed = time.perf_counter() - started
+
+    total = len(latencies)
+    print(f"requests:    {total}")
+    print(f"statuses:    {dict(sorted(statuses.items()))}")
+    print(f"rps:         {total / elapsed:.1f}")
+    print(f"mean ms:     {statistics.fmean(latencies) * 1000:.2f}" if latencies else "mean ms:     -")
+    for pct in (50, 95, 99):
+        print(f"p{pct} ms:      {_percentile(latencies, pct) * 1000:.2f}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark GET /api/v1/attempts/{id}.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--attempt-id", type=int, required=True)
+    parser.add_argument("--token", help="Access token; otherwise --login/--password are used")
+    parser.add_argument("--login", default="student01")
+    parser.add_argument("--password", default="StrongPass1")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import csv
 import os
 import sys
@@ -11,6 +12,7 @@ from sqlalchemy.dialects.postgresql import insert
 
 from app.core.config import settings
 from app.models.school import School
+from app.services.school_lookup import bump_index_version
 
 
 CITY_HEADERS = {"city", "город"}
@@ -152,6 +154,8 @@ def main() -> int:
         stmt = insert(School).values(items)
         stmt = stmt.on_conflict_do_nothing(index_elements=["city", "name"])
         conn.execute(stmt)
+    # воркеры API перестроят индекс /lookup/* при следующем запросе
+    asyncio.run(bump_index_version())
     return 0
 
 
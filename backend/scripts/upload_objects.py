@@ -0,0 +1,210 @@
+"""Bulk upload of diplomas and teacher certificates to S3/MinIO.
+
+  python scripts/upload_objects.py diplomas /data/diplomas --workers 32
+  python scripts/upload_objects.py certificates /data/teacher_certificates
+
+diplomas:     attempt_<id>.jpg -> attempt_<id>.jpg in the bucket root
+certificates: certificate_<teacher_id>_<YYYY>_<YYYY+1>_<seq>.jpg ->
+              certificates/teachers/<YYYY>_<YYYY+1>/<same name>
+
+The target prefix is listed once and unchanged objects (same size and ETag)
+are skipped, so an interrupted run is resumed by running the same command
+again. Local ETags are cached in --manifest. Files of unknown attempts or of
+users who are not teachers are skipped. After the upload the diploma index
+and the teacher_certificates table are updated.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.storage import list_object_stats, new_client
+from app.core.storage.bulk import (
+    DEFAULT_MULTIPART_THRESHOLD,
+    DEFAULT_PART_SIZE,
+    MB,
+    BulkUploader,
+    UploadItem,
+    UploadManifest,
+    UploadResult,
+    count_statuses,
+    write_report,
+)
+from app.db.session import SessionLocal
+from app.models.attempt import Attempt
+from app.models.user import User, UserRole
+from app.repos.teacher_certificates import TeacherCertificatesRepo
+from app.services.diplomas import DIPLOMA_PREFIX, diploma_key, mark_diplomas_uploaded
+from app.services.teacher_certificates import CERT_PREFIX, CERT_RE, parse_certificate_key
+
+DIPLOMA_FILE_RE = re.compile(r"^attempt_(\d+)\.jpe?g$", re.IGNORECASE)
+ID_CHUNK_SIZE = 5000
+PROGRESS_EVERY = 500
+
+
+def _scan(source_dir: Path, key_for) -> tuple[dict[str, Path], list[UploadResult]]:
+    found: dict[str, Path] = {}
+    skipped: list[UploadResult] = []
+    for path in sorted(source_dir.rglob("*")):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        key = key_for(path.name)
+        if key is None:
+            skipped.append(UploadResult(key="", source_path=str(path), status="skipped_invalid_name"))
+        elif key in found:
+            skipped.append(
+                UploadResult(
+                    key=key,
+                    source_path=str(path),
+                    status="skipped_duplicate",
+                    message=f"duplicate of {found[key]}",
+                )
+            )
+        else:
+            found[key] = path
+    return found, skipped
+
+
+def _diploma_key_for(file_name: str) -> str | None:
+    match = DIPLOMA_FILE_RE.match(file_name)
+    return diploma_key(int(match.group(1))) if match else None
+
+
+def _certificate_key_for(file_name: str) -> str | None:
+    match = CERT_RE.match(file_name)
+    if not match:
+        return None
+    key = f"{CERT_PREFIX}/{match.group(2)}_{match.group(3)}/{file_name}"
+    return key if parse_certificate_key(key) else None
+
+
+def _owner_id(kind: str, key: str) -> int:
+    if kind == "diplomas":
+        return int(key[len(DIPLOMA_PREFIX):-len(".jpg")])
+    return parse_certificate_key(key)["teacher_id"]
+
+
+async def _known_owner_ids(kind: str, ids: set[int]) -> set[int]:
+    if kind == "diplomas":
+        column, extra = Attempt.id, ()
+    else:
+        column, extra = User.id, (User.role == UserRole.teacher,)
+    known: set[int] = set()
+    ordered = sorted(ids)
+    async with SessionLocal() as session:
+        for start in range(0, len(ordered), ID_CHUNK_SIZE):
+            chunk = ordered[start:start + ID_CHUNK_SIZE]
+            res = await session.execute(select(column).where(column.in_(chunk), *extra))
+            known.update(res.scalars().all())
+    return known
+
+
+async def _update_indexes(kind: str, results: list[UploadResult]) -> None:
+    stored = [row.key for row in results if row.status in {"uploaded", "skipped_unchanged", "skipped_exists"}]
+    if not stored:
+        return
+    if kind == "diplomas":
+        await mark_diplomas_uploaded(_owner_id(kind, key) for key in stored)
+        return
+    async with SessionLocal() as session:
+        await TeacherCertificatesRepo(session).add_many([parse_certificate_key(key) for key in stored])
+
+
+def _print_progress(done: int, total: int) -> None:
+    if done % PROGRESS_EVERY == 0:
+        print(f"Processed {done}/{total} files...")
+
+
+async def run(args: argparse.Namespace) -> int:
+    kind = args.kind
+    source_dir = args.source_dir.expanduser().resolve()
+    if not source_dir.is_dir():
+        print(f"ERROR: source directory not found: {source_dir}", file=sys.stderr)
+        return 2
+
+    key_for = _diploma_key_for if kind == "diplomas" else _certificate_key_for
+    found, results = _scan(source_dir, key_for)
+    print(f"Source directory: {source_dir}")
+    print(f"Files found: {len(found)}, skipped by name: {len(results)}")
+
+    known = await _known_owner_ids(kind, {_owner_id(kind, key) for key in found})
+    items: list[UploadItem] = []
+    for key, path in sorted(found.items()):
+        if _owner_id(kind, key) in known:
+            items.append(UploadItem(key=key, source_path=path))
+        else:
+            status = "skipped_missing_attempt" if kind == "diplomas" else "skipped_user_not_teacher"
+            results.append(UploadResult(key=key, source_path=str(path), status=status))
+    print(f"Files to check: {len(items)}")
+
+    client = new_client(max_connections=args.workers)
+    if client is None:
+        print("ERROR: storage is not configured or not reachable", file=sys.stderr)
+        return 2
+    prefix = DIPLOMA_PREFIX if kind == "diplomas" else f"{CERT_PREFIX}/"
+    existing = await asyncio.to_thread(list_object_stats, prefix)
+    print(f"Objects under {prefix!r}: {len(existing)}")
+
+    manifest = UploadManifest(args.manifest or Path(f"{kind}_upload_manifest.jsonl"))
+    uploader = BulkUploader(
+        client,
+        bucket=settings.STORAGE_BUCKET,
+        workers=args.workers,
+        existing=existing,
+        manifest=manifest,
+        keep_existing=args.keep_existing,
+        dry_run=args.dry_run,
+        multipart_threshold=int(args.multipart_threshold_mb * MB),
+        part_size=int(args.part_size_mb * MB),
+        progress=lambda done: _print_progress(done, len(items)),
+    )
+    try:
+        results.extend(await asyncio.to_thread(uploader.run, items))
+    finally:
+        manifest.close()
+
+    if not args.dry_run:
+        await _update_indexes(kind, results)
+
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    report_path = args.report or Path(f"{kind}_upload_report_{ts}.csv")
+    write_report(results, report_path)
+    print("Summary:")
+    for status, count in sorted(count_statuses(results).items()):
+        print(f"  {status}: {count}")
+    print(f"Report: {report_path}")
+    return 1 if any(row.status == "error" for row in results) else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Upload diplomas or teacher certificates to S3/MinIO.")
+    parser.add_argument("kind", choices=["diplomas", "certificates"])
+    parser.add_argument("source_dir", type=Path, help="Directory with the files (searched recursively)")
+    parser.add_argument("--workers", type=int, default=16, help="Parallel uploads (default: 16)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be uploaded")
+    parser.add_argument(
+        "--keep-existing",
+        action="store_true",
+        help="Never replace an object that is already in the bucket, even if it differs",
+    )
+    parser.add_argument("--manifest", type=Path, help="ETag cache (default: ./<kind>_upload_manifest.jsonl)")
+    parser.add_argument("--report", type=Path, help="CSV report (default: ./<kind>_upload_report_<ts>.csv)")
+    parser.add_argument("--multipart-threshold-mb", type=float, default=DEFAULT_MULTIPART_THRESHOLD / MB)
+    parser.add_argument("--part-size-mb", type=float, default=DEFAULT_PART_SIZE / MB)
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be positive")
+    if args.part_size_mb < 5:
+        parser.error("--part-size-mb must be at least 5 (S3 minimum part size)")
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -13,20 +13,24 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 from redis.asyncio import Redis
 
 from app.core.config import settings
-from app.core.deps import get_db, get_read_db
+from app.core.deps import get_db, get_read_db, get_read_sessionmaker
 from app.core.security import hash_password
 from app.db.base import Base
 from app.main import app as fastapi_app
 from app.models.user import UserRole
 from app.repos.users import UsersRepo
 from app.core import redis as redis_module
+from app.core.auth_context import principals, verified_tokens
+from app.core.cache import local_cache
 
 import app.models.user  # noqa: F401
 import app.models.task  # noqa: F401
 import app.models.olympiad  # noqa: F401
 import app.models.olympiad_task  # noqa: F401
 import app.models.attempt  # noqa: F401
+import app.models.attempt_stats  # noqa: F401
 import app.models.teacher_student  # noqa: F401
+import app.models.teacher_certificate  # noqa: F401
 import app.models.social_account  # noqa: F401
 import app.models.auth_token  # noqa: F401
 import app.models.audit_log  # noqa: F401
@@ -49,6 +53,20 @@ def _get_test_redis_url() -> str:
     return url
 
 
+@pytest.fixture(autouse=True)
+def _clear_local_cache():
+    # L1-кэш и флаг «Redis недоступен» живут на уровне процесса, а id в тестовой БД переиспользуются
+    local_cache.clear()
+    principals.clear()
+    verified_tokens.clear()
+    redis_module._unavailable_until = 0.0
+    yield
+    local_cache.clear()
+    principals.clear()
+    verified_tokens.clear()
+    redis_module._unavailable_until = 0.0
+
+
 @pytest_asyncio.fixture
 async def db_engine():
     engine = create_async_engine(
@@ -90,6 +108,7 @@ async def client(db_session):
 
     fastapi_app.dependency_overrides[get_db] = _get_test_db
     fastapi_app.dependency_overrides[get_read_db] = _get_test_db
+    fastapi_app.dependency_overrides[get_read_sessionmaker] = lambda: session_maker
     prev_audit = settings.AUDIT_LOG_ENABLED
     settings.AUDIT_LOG_ENABLED = False
     transport = ASGITransport(app=fastapi_app)
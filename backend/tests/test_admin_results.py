@@ -0,0 +1,165 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app.models.attempt import Attempt, AttemptStatus
+from app.models.olympiad import Olympiad
+from app.models.teacher_student import TeacherStudent, TeacherStudentStatus
+from app.models.user import UserRole
+
+
+def _auth_headers(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _add_students(db_session, create_user, *, olympiad_id: int, teacher_id: int, start: int, count: int):
+    now = datetime.now(timezone.utc)
+    for i in range(start, start + count):
+        student = await create_user(
+            login=f"student{i:02d}",
+            email=f"student{i:02d}@example.com",
+            password="StrongPass1",
+            role=UserRole.student,
+        )
+        db_session.add(
+            Attempt(
+                olympiad_id=olympiad_id,
+                user_id=student.id,
+                started_at=now,
+                deadline_at=now + timedelta(minutes=10),
+                duration_sec=600,
+                status=AttemptStatus.submitted,
+                score_total=1,
+                score_max=2,
+            )
+        )
+        db_session.add(
+            TeacherStudent(
+                teacher_id=teacher_id,
+                student_id=student.id,
+                status=TeacherStudentStatus.confirmed,
+            )
+        )
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_admin_olympiad_attempts_query_count_is_constant(client, db_session, create_user):
+    admin = await create_user(
+        login="admin01",
+        email="admin01@example.com",
+        password="AdminPass1",
+        role=UserRole.admin,
+        class_grade=None,
+    )
+    teacher = await create_user(
+        login="teacher01",
+        email="teacher01@example.com",
+        password="TeacherPass1",
+        role=UserRole.teacher,
+        class_grade=None,
+        subject="math",
+    )
+    now = datetime.now(timezone.utc)
+    olympiad = Olympiad(
+        title="Olympiad",
+        age_group="7-8",
+        duration_sec=600,
+        available_from=now - timedelta(hours=1),
+        available_to=now + timedelta(hours=1),
+        created_by_user_id=admin.id,
+    )
+    db_session.add(olympiad)
+    await db_session.commit()
+
+    resp = await client.post("/api/v1/auth/login", json={"login": "admin01", "password": "AdminPass1"})
+    headers = _auth_headers(resp.json()["access_token"])
+    url = f"/api/v1/admin/results/olympiads/{olympiad.id}/attempts"
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.bind.sync_engine
+
+    async def _fetch():
+        # прогрев: первый запрос ещё загружает строку пользователя в кэш auth-контекста
+        assert (await client.get(url, headers=headers)).status_code == 200
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", _count)
+        try:
+            resp = await client.get(url, headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", _count)
+        assert resp.status_code == 200
+        return resp.json(), len(statements)
+
+    await _add_students(db_session, create_user, olympiad_id=olympiad.id, teacher_id=teacher.id, start=1, count=2)
+    rows, few_queries = await _fetch()
+    assert len(rows) == 2
+
+    await _add_students(db_session, create_user, olympiad_id=olympiad.id, teacher_id=teacher.id, start=3, count=8)
+    rows, many_queries = await _fetch()
+    assert len(rows) == 10
+    assert many_queries == few_queries
+    assert all(row["teachers"] == "Иванов Иван Иванович" for row in rows)
+
+    resp = await client.get(url, params={"limit": 4}, headers=headers)
+    first_page = resp.json()
+    assert len(first_page) == 4
+    resp = await client.get(url, params={"limit": 4, "before_id": first_page[-1]["id"]}, headers=headers)
+    second_page = resp.json()
+    assert len(second_page) == 4
+    assert second_page[0]["id"] < first_page[-1]["id"]
+
+
+@pytest.mark.asyncio
+async def test_admin_olympiad_results_export_csv(client, db_session, create_user):
+    admin = await create_user(
+        login="admin01",
+        email="admin01@example.com",
+        password="AdminPass1",
+        role=UserRole.admin,
+        class_grade=None,
+    )
+    teacher = await create_user(
+        login="teacher01",
+        email="teacher01@example.com",
+        password="TeacherPass1",
+        role=UserRole.teacher,
+        class_grade=None,
+        subject="math",
+    )
+    now = datetime.now(timezone.utc)
+    olympiad = Olympiad(
+        title="Olympiad",
+        age_group="7-8",
+        duration_sec=600,
+        available_from=now - timedelta(hours=1),
+        available_to=now + timedelta(hours=1),
+        created_by_user_id=admin.id,
+    )
+    db_session.add(olympiad)
+    await db_session.commit()
+    await _add_students(db_session, create_user, olympiad_id=olympiad.id, teacher_id=teacher.id, start=1, count=3)
+
+    resp = await client.post("/api/v1/auth/login", json={"login": "admin01", "password": "AdminPass1"})
+    headers = _auth_headers(resp.json()["access_token"])
+    resp = await client.get(
+        f"/api/v1/admin/results/olympiads/{olympiad.id}/export",
+        params={"format": "csv"},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(resp.content.decode("utf-8-sig"))))
+    assert [int(row["id"]) for row in rows] == sorted(int(row["id"]) for row in rows)
+    assert len(rows) == 3
+    assert rows[0]["teachers"] == "Иванов Иван Иванович"
+
+    resp = await client.get("/api/v1/admin/results/olympiads/999999/export", headers=headers)
+    assert resp.status_code == 404
@@ -0,0 +1,238 @@
+import io
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.v1 import admin_announcements
+from app.models.user import UserRole
+from app.repos.announcements import AnnouncementsRepo
+from app.services import announcements
+
+
+def _campaign(campaign_id: int, code: str, *, starts_at=None, ends_at=None):
+    return SimpleNamespace(id=campaign_id, code=code, common_text="Общий текст", starts_at=starts_at, ends_at=ends_at)
+
+
+def _group(subject: str, group_number: int, title: str, *, ends_at=None):
+    return SimpleNamespace(
+        subject=subject,
+        group_number=group_number,
+        group_title=title,
+        group_text=f"Текст {title}",
+        starts_at=None,
+        ends_at=ends_at,
+    )
+
+
+@pytest.fixture
+def fake_repo(monkeypatch):
+    now = datetime.now(timezone.utc)
+    current = _campaign(2, "round2")
+    previous = _campaign(1, "round1")
+    finished = _campaign(3, "old", ends_at=now - timedelta(days=1))
+    state = {
+        "campaign_rows": [
+            (current, _group("math", 5, "M5"), None),
+            (current, _group("cs", 2, "C2", ends_at=now - timedelta(hours=1)), None),
+            (previous, _group("cs", 7, "C7"), SimpleNamespace(title="Fallback", text="Без группы")),
+            (finished, None, SimpleNamespace(title="Old", text="Old")),
+        ],
+        "assignments": {
+            10: [(2, "math", 5), (2, "cs", 2), (1, "cs", 7), (1, "math", 1)],
+        },
+        "campaign_queries": 0,
+        "assignment_queries": 0,
+    }
+
+    async def _rows(self):
+        state["campaign_queries"] += 1
+        return state["campaign_rows"]
+
+    async def _assignments(self, user_id, campaign_ids):
+        state["assignment_queries"] += 1
+        return [row for row in state["assignments"].get(user_id, []) if row[0] in campaign_ids]
+
+    async def _no_redis():
+        return None
+
+    monkeypatch.setattr(AnnouncementsRepo, "list_active_campaign_rows", _rows)
+    monkeypatch.setattr(AnnouncementsRepo, "list_user_assignments", _assignments)
+    monkeypatch.setattr(announcements, "_redis", _no_redis)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_group_messages_resolved_per_subject(fake_repo):
+    items = await announcements.get_user_announcements(None, 10)
+    # math — из текущей кампании; cs в ней истёк, поэтому берётся из предыдущей
+    assert [(i.campaign_code, i.subject, i.group_number) for i in items] == [("round2", "math", 5), ("round1", "cs", 7)]
+    assert items[0].text == "Общий текст\n\nТекст M5"
+
+
+@pytest.mark.asyncio
+async def test_fallback_for_user_without_groups(fake_repo):
+    items = await announcements.get_user_announcements(None, 99)
+    assert [(i.campaign_code, i.subject, i.title) for i in items] == [("round1", None, "Fallback")]
+
+
+@pytest.mark.asyncio
+async def test_campaign_snapshot_cached_until_invalidated(fake_repo):
+    await announcements.get_user_announcements(None, 10)
+    await announcements.get_user_announcements(None, 99)
+    assert fake_repo["campaign_queries"] == 1
+    assert fake_repo["assignment_queries"] == 2
+
+    await announcements.invalidate_announcements()
+    await announcements.get_user_announcements(None, 10)
+    assert fake_repo["campaign_queries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_assignments_read_from_redis_hash(fake_repo, redis_client, monkeypatch):
+    async def _redis():
+        return redis_client
+
+    monkeypatch.setattr(announcements, "_redis", _redis)
+    for campaign_id in (1, 2):
+        for subject in announcements.SUBJECTS:
+            mapping = {
+                str(user_id): str(group)
+                for user_id, rows in fake_repo["assignments"].items()
+                for cid, subj, group in rows
+                if cid == campaign_id and subj == subject
+            }
+            mapping[announcements.LOADED_FIELD] = "1"
+            await redis_client.hset(announcements.assignments_key(campaign_id, subject), mapping=mapping)
+
+    items = await announcements.get_user_announcements(None, 10)
+    assert [(i.campaign_code, i.subject) for i in items] == [("round2", "math"), ("round1", "cs")]
+    assert fake_repo["assignment_queries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_missing_hash_queued_for_worker_and_served_from_db(fake_repo, redis_client, monkeypatch):
+    async def _redis():
+        return redis_client
+
+    sent = []
+    monkeypatch.setattr(announcements, "_redis", _redis)
+    monkeypatch.setattr(announcements.celery_app, "send_task", lambda name, args: sent.append((name, *args)))
+
+    items = await announcements.get_user_announcements(None, 10)
+    assert [(i.campaign_code, i.subject) for i in items] == [("round2", "math"), ("round1", "cs")]
+    await announcements.get_user_announcements(None, 10)
+    assert fake_repo["assignment_queries"] == 2
+    assert sorted(sent) == sorted(
+        (announcements.LOAD_ASSIGNMENTS_TASK, campaign_id, subject)
+        for campaign_id in (1, 2)
+        for subject in announcements.SUBJECTS
+    )
+    assert not await redis_client.exists(announcements.assignments_key(2, "math"))
+
+
+@pytest.mark.asyncio
+async def test_stale_hash_build_does_not_replace_fresher_import(redis_client, monkeypatch):
+    from app.core import redis as redis_module
+
+    async def _redis():
+        return redis_client
+
+    table = {"rows": [(10, 1)]}
+
+    async def _groups(self, campaign_id, subject):
+        rows = table["rows"]
+        if subject == "math" and table.pop("import_during_read", False):
+            # пока воркер читал старые строки, импорт заменил таблицу и собрал свой хэш
+            table["rows"] = [(10, 5)]
+            assert await announcements.load_assignments_hash(None, campaign_id, subject, new_import=True)
+        return rows
+
+    monkeypatch.setattr(announcements, "_redis", _redis)
+    monkeypatch.setattr(AnnouncementsRepo, "list_assignment_groups", _groups)
+    key = announcements.assignments_key(1, "math")
+
+    table["import_during_read"] = True
+    assert not await announcements.load_assignments_hash(None, 1, "math")
+    assert await redis_client.hget(key, "10") == "5"
+    assert not redis_module.redis_marked_down()
+    assert await redis_client.keys(f"{key}:loading:*") == []
+
+    assert await announcements.load_assignments_hash(None, 1, "math")
+    assert await redis_client.hget(key, "10") == "5"
+
+
+class _Upload:
+    def __init__(self, payload: bytes):
+        self.buffer = io.BytesIO(payload)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.buffer.read(size)
+
+
+async def _parse(payload: bytes, monkeypatch, chunk_size: int = 7):
+    monkeypatch.setattr(admin_announcements, "CSV_READ_CHUNK_SIZE", chunk_size)
+    parser = admin_announcements._CsvRowParser(_Upload(payload))
+    return [row async for row in parser.rows()], parser.invalid
+
+
+@pytest.mark.asyncio
+async def test_csv_parser_streams_rows_across_chunks(monkeypatch):
+    payload = "\ufeffuser_id,group\r\n10,5\r\nbad,row\r\n11,2\r\n\r\n13,21".encode("utf-8")
+    rows, invalid = await _parse(payload, monkeypatch)
+    assert rows == [(10, 5), (11, 2), (13, 21)]
+    assert invalid == 1
+
+    rows, invalid = await _parse("user_id;group\n20;1\n21;3\n22;4\n".encode("utf-8"), monkeypatch)
+    assert rows == [(20, 1), (21, 3), (22, 4)]
+
+    rows, invalid = await _parse("Ф,1\n20\n21,3\n".encode("utf-8"), monkeypatch, chunk_size=1)
+    assert rows == [(21, 3)]
+    assert invalid == 2
+
+
+@pytest.mark.asyncio
+async def test_csv_parser_rejects_non_utf8(monkeypatch):
+    with pytest.raises(UnicodeDecodeError):
+        await _parse("10,1\nИванов,2\n".encode("cp1251"), monkeypatch)
+
+
+@pytest.mark.asyncio
+async def test_import_assignments_stats_and_swap(db_session, create_user):
+    students = [
+        await create_user(login=f"student{i:02d}", email=f"s{i}@example.com", password="StrongPass1", role=UserRole.student)
+        for i in range(1, 4)
+    ]
+    teacher = await create_user(
+        login="teacher01",
+        email="teacher01@example.com",
+        password="TeacherPass1",
+        role=UserRole.teacher,
+        class_grade=None,
+        subject="math",
+    )
+    repo = AnnouncementsRepo(db_session)
+    campaign = await repo.create_campaign({"code": "round1", "title_default": "Round", "common_text": "Текст"})
+
+    async def _rows(items):
+        for item in items:
+            yield item
+
+    first = await repo.replace_assignments(
+        campaign.id,
+        "math",
+        _rows([(students[0].id, 1), (students[1].id, 2), (students[0].id, 3), (teacher.id, 4), (999999, 5), (students[2].id, 22)]),
+        "first.csv",
+    )
+    assert (first.total_rows, first.valid_rows, first.inserted_rows) == (6, 2, 2)
+    assert first.skipped_duplicate_rows == 1
+    assert first.skipped_unknown_user == 1
+    assert first.skipped_not_student == 1
+    assert first.skipped_group_out_of_range == 1
+    assert sorted(await repo.list_assignment_groups(campaign.id, "math")) == sorted(
+        [(students[0].id, 3), (students[1].id, 2)]
+    )
+
+    second = await repo.replace_assignments(campaign.id, "math", _rows([(students[1].id, 7)]), "second.csv")
+    assert (second.total_rows, second.inserted_rows) == (1, 1)
+    assert await repo.list_assignment_groups(campaign.id, "math") == [(students[1].id, 7)]
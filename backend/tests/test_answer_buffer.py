@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.attempt import Attempt, AttemptAnswer, AttemptStatus
+from app.models.olympiad import Olympiad, OlympiadScope
+from app.models.olympiad_task import OlympiadTask
+from app.models.task import Subject, Task, TaskType
+from app.models.user import UserRole
+from app.repos.attempts import AttemptsRepo
+from app.services import answer_buffer
+from app.services.attempts import AttemptsService
+
+
+def test_merge_answers_prefers_newest():
+    now = datetime.now(timezone.utc)
+    stored = [
+        SimpleNamespace(task_id=1, answer_payload={"choice_id": "a"}, updated_at=now),
+        SimpleNamespace(task_id=2, answer_payload={"choice_id": "a"}, updated_at=now),
+    ]
+    pending = [
+        SimpleNamespace(task_id=1, answer_payload={"choice_id": "b"}, updated_at=now + timedelta(seconds=1)),
+        SimpleNamespace(task_id=2, answer_payload={"choice_id": "c"}, updated_at=now - timedelta(seconds=1)),
+        SimpleNamespace(task_id=3, answer_payload={"choice_id": "d"}, updated_at=now),
+    ]
+    merged = {a.task_id: a.answer_payload["choice_id"] for a in answer_buffer.merge_answers(stored, pending)}
+    assert merged == {1: "b", 2: "a", 3: "d"}
+
+
+class BrokenRedis:
+    def pipeline(self, *args, **kwargs):
+        raise RuntimeError("Event loop is closed")
+
+    async def hgetall(self, key):
+        raise RuntimeError("Event loop is closed")
+
+
+class StoredAnswersRepo:
+    def __init__(self, answers):
+        self.answers = answers
+
+    async def list_answers(self, attempt_id):
+        return self.answers
+
+
+@pytest.mark.asyncio
+async def test_load_answers_falls_back_to_db_when_redis_fails(monkeypatch):
+    from app.core import redis as redis_module
+
+    async def _broken():
+        return BrokenRedis()
+
+    monkeypatch.setattr(settings, "ANSWERS_WRITE_BEHIND_ENABLED", True)
+    monkeypatch.setattr(answer_buffer, "safe_redis", _broken)
+    stored = [SimpleNamespace(task_id=1, answer_payload={"choice_id": "a"}, updated_at=datetime.now(timezone.utc))]
+    repo = StoredAnswersRepo(stored)
+
+    monkeypatch.setattr(redis_module, "_unavailable_until", 0.0)
+    assert await answer_buffer.load_answers(repo, 1) == stored
+    assert redis_module.redis_marked_down()
+
+    monkeypatch.setattr(redis_module, "_unavailable_until", 0.0)
+    assert await answer_buffer.load_answers(repo, 1, flush=True, close=True) == stored
+    assert redis_module.redis_marked_down()
+
+
+@pytest.mark.asyncio
+async def test_buffer_refuses_answers_while_submitting_or_closed(redis_client, monkeypatch):
+    monkeypatch.setattr(settings, "ANSWERS_WRITE_BEHIND_TTL_GRACE_SEC", 60)
+    now = datetime.now(timezone.utc)
+    kwargs = dict(
+        task_id=1,
+        answer_payload={"choice_id": "a"},
+        updated_at=now,
+        deadline_at=now + timedelta(minutes=10),
+        lock_key="lock:submit:7",
+    )
+    assert await answer_buffer.buffer_answer(redis_client, attempt_id=7, **kwargs)
+    ttl = await redis_client.ttl(answer_buffer.buffer_key(7))
+    assert 600 < ttl <= 660
+
+    await redis_client.set("lock:submit:7", "token")
+    assert not await answer_buffer.buffer_answer(redis_client, attempt_id=7, **{**kwargs, "task_id": 2})
+    await redis_client.delete("lock:submit:7")
+    await redis_client.set(answer_buffer.closed_key(7), "1")
+    assert not await answer_buffer.buffer_answer(redis_client, attempt_id=7, **{**kwargs, "task_id": 2})
+    assert await redis_client.hkeys(answer_buffer.buffer_key(7)) == ["1"]
+
+
+@pytest.mark.asyncio
+async def test_write_behind_answers_are_flushed_before_grading(db_session, redis_client, create_user, monkeypatch):
+    from app.core import redis as redis_module
+
+    monkeypatch.setattr(settings, "ANSWERS_WRITE_BEHIND_ENABLED", True)
+    monkeypatch.setattr(settings, "ATTEMPT_MIN_SUBMIT_AGE_SEC", 0)
+    # пока Redis помечен недоступным, буфер обходится и ответы пишутся сразу в таблицу
+    monkeypatch.setattr(redis_module, "_unavailable_until", 0.0)
+    now = datetime.now(timezone.utc)
+    student = await create_user(
+        login="buffered01",
+        email="buffered01@example.com",
+        password="StrongPass1",
+        role=UserRole.student,
+    )
+    task = Task(
+        subject=Subject.math,
+        title="Task",
+        content="2+2",
+        task_type=TaskType.single_choice,
+        payload={"options": [{"id": "a", "text": "4"}, {"id": "b", "text": "5"}], "correct_option_id": "a"},
+        created_by_user_id=1,
+    )
+    olympiad = Olympiad(
+        title="Olympiad",
+        description="Desc",
+        scope=OlympiadScope.global_,
+        age_group="5-6",
+        attempts_limit=1,
+        duration_sec=600,
+        available_from=now - timedelta(minutes=1),
+        available_to=now + timedelta(hours=1),
+        pass_percent=60,
+        is_published=True,
+        created_by_user_id=1,
+    )
+    db_session.add_all([task, olympiad])
+    await db_session.flush()
+    db_session.add(OlympiadTask(olympiad_id=olympiad.id, task_id=task.id, sort_order=1, max_score=1))
+    attempt = Attempt(
+        olympiad_id=olympiad.id,
+        user_id=student.id,
+        started_at=now,
+        deadline_at=now + timedelta(minutes=10),
+        duration_sec=600,
+        status=AttemptStatus.active,
+    )
+    db_session.add(attempt)
+    await db_session.commit()
+
+    service = AttemptsService(AttemptsRepo(db_session))
+    await service.upsert_answer(user=student, attempt_id=attempt.id, task_id=task.id, answer_payload={"choice_id": "b"})
+    await service.upsert_answer(user=student, attempt_id=attempt.id, task_id=task.id, answer_payload={"choice_id": "a"})
+
+    assert await redis_client.hkeys(answer_buffer.buffer_key(attempt.id)) == [str(task.id)]
+    res = await db_session.execute(select(AttemptAnswer))
+    assert res.scalars().all() == []
+    _attempt, _olympiad, _tasks, answers_by_task = await service.get_attempt_view(user=student, attempt_id=attempt.id)
+    assert answers_by_task[task.id].answer_payload == {"choice_id": "a"}
+
+    status = await service.submit(user=student, attempt_id=attempt.id)
+    assert status == AttemptStatus.submitted
+    graded = await service.repo.get_attempt(attempt.id)
+    assert graded.score_total == 1
+    assert await redis_client.hlen(answer_buffer.buffer_key(attempt.id)) == 0
+
+    # автосохранение после submit не подтверждается молча
+    with pytest.raises(ValueError):
+        await service.upsert_answer(
+            user=student, attempt_id=attempt.id, task_id=task.id, answer_payload={"choice_id": "b"}
+        )
@@ -306,3 +306,117 @@ async def test_service_token_can_update_user(client, create_user):
         assert resp.json()["school"] == "Service School"
     finally:
         settings.SERVICE_TOKENS = old_tokens
+
+
+@pytest.mark.asyncio
+async def test_admin_user_search_keyset_and_count(client, create_user):
+    await create_user(
+        login="adminsearch",
+        email="adminsearch@example.com",
+        password="AdminPass1",
+        role=UserRole.admin,
+        class_grade=None,
+    )
+    for i in range(1, 6):
+        await create_user(
+            login=f"pupil{i:02d}",
+            email=f"pupil{i:02d}@example.com",
+            password="StrongPass1",
+            role=UserRole.student,
+        )
+    resp = await client.post("/api/v1/auth/login", json={"login": "adminsearch", "password": "AdminPass1"})
+    headers = _auth_headers(resp.json()["access_token"])
+
+    resp = await client.get("/api/v1/admin/users", params={"q": "PUPIL иван", "limit": 2}, headers=headers)
+    assert resp.status_code == 200
+    first_page = resp.json()
+    assert [user["login"] for user in first_page] == ["pupil01", "pupil02"]
+
+    resp = await client.get(
+        "/api/v1/admin/users",
+        params={"q": "pupil", "limit": 10, "after_id": first_page[-1]["id"]},
+        headers=headers,
+    )
+    assert [user["login"] for user in resp.json()] == ["pupil03", "pupil04", "pupil05"]
+
+    resp = await client.get("/api/v1/admin/users", params={"q": "pupil_"}, headers=headers)
+    assert resp.json() == []
+
+    resp = await client.get("/api/v1/admin/users/count", params={"q": "pupil"}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json() == 5
+    assert resp.headers["x-count-estimated"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_admin_diploma_render_job(client, create_user, monkeypatch):
+    from app.api.v1 import admin_olympiads
+    from app.services import diploma_render
+
+    await create_user(
+        login="admindiplomas",
+        email="admindiplomas@example.com",
+        password="AdminPass1",
+        role=UserRole.admin,
+        is_verified=True,
+        class_grade=None,
+        subject=None,
+    )
+    resp = await client.post("/api/v1/auth/login", json={"login": "admindiplomas", "password": "AdminPass1"})
+    headers = _auth_headers(resp.json()["access_token"])
+
+    now = datetime.now(timezone.utc)
+    resp = await client.post(
+        "/api/v1/admin/olympiads",
+        json={
+            "title": "Diplomas",
+            "age_group": "7-8",
+            "attempts_limit": 1,
+            "duration_sec": 600,
+            "available_from": (now - timedelta(minutes=1)).isoformat(),
+            "available_to": (now + timedelta(hours=1)).isoformat(),
+            "pass_percent": 60,
+        },
+        headers=headers,
+    )
+    olympiad_id = resp.json()["id"]
+    template = {
+        "background_key": "templates/diploma.jpg",
+        "name": {"text": "{name}", "x": 100, "y": 100},
+        "place": {"text": "{place} место", "x": 100, "y": 200},
+    }
+
+    sent = []
+    states = {}
+
+    async def _get_state(oid):
+        return states.get(oid)
+
+    async def _mark_queued(job_id, oid):
+        states[oid] = diploma_render.new_state(job_id, oid)
+        return states[oid]
+
+    monkeypatch.setattr(diploma_render, "get_state", _get_state)
+    monkeypatch.setattr(diploma_render, "mark_queued", _mark_queued)
+    monkeypatch.setattr(admin_olympiads.render_diplomas, "apply_async", lambda **kwargs: sent.append(kwargs))
+
+    url = f"/api/v1/admin/olympiads/{olympiad_id}/diplomas"
+    resp = await client.post(url, json=template, headers=headers)
+    assert resp.status_code == 409
+    assert resp.json()["error"]["code"] == codes.RESULTS_NOT_RELEASED
+
+    resp = await client.post(f"/api/v1/admin/olympiads/{olympiad_id}/results", headers=headers)
+    assert resp.status_code == 200
+    resp = await client.post(url, json={**template, "school": {"text": "{email}", "x": 1, "y": 1}}, headers=headers)
+    assert resp.status_code == 422
+
+    resp = await client.post(url, json=template, headers=headers)
+    assert resp.status_code == 202
+    assert resp.json()["status"] == "queued"
+    assert sent[0]["task_id"] == resp.json()["job_id"]
+    assert sent[0]["args"][0] == olympiad_id
+
+    resp = await client.post(url, json=template, headers=headers)
+    assert resp.json()["error"]["code"] == codes.DIPLOMA_RENDER_IN_PROGRESS
+    resp = await client.get(url, headers=headers)
+    assert resp.json()["job_id"] == sent[0]["task_id"]
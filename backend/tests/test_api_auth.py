@@ -1,7 +1,6 @@
 import pytest
 
 from app.core import error_codes as codes
-from app.repos.users import UsersRepo
 
 
 @pytest.mark.asyncio
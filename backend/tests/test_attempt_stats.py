@@ -0,0 +1,115 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.attempt import AttemptStatus
+from app.repos.attempt_stats import AttemptStatsRepo
+from app.services import attempt_stats
+
+
+@pytest.fixture
+def no_redis(monkeypatch):
+    async def _none():
+        return None
+
+    monkeypatch.setattr(attempt_stats, "_redis", _none)
+    attempt_stats._local_pending.clear()
+    yield
+    attempt_stats._local_pending.clear()
+    attempt_stats._active_stale = False
+
+
+def test_bucket_start_floors_to_half_hour():
+    at = datetime(2026, 3, 1, 10, 47, 12, tzinfo=timezone.utc)
+    assert attempt_stats.bucket_start(at) == datetime(2026, 3, 1, 10, 30, tzinfo=timezone.utc)
+    assert attempt_stats.bucket_start(at.replace(minute=30, second=0)) == at.replace(minute=30, second=0)
+
+
+@pytest.mark.asyncio
+async def test_events_without_redis_are_flushed_to_buckets(no_redis, monkeypatch):
+    at = datetime(2026, 3, 1, 10, 5, tzinfo=timezone.utc)
+    await attempt_stats.record_started(attempt_id=1, user_id=10, deadline_at=at + timedelta(hours=1), started_at=at)
+    await attempt_stats.record_started(attempt_id=2, user_id=11, deadline_at=at + timedelta(hours=1), started_at=at)
+    await attempt_stats.record_closed([1, 2], status=AttemptStatus.submitted, at=at + timedelta(minutes=40))
+    await attempt_stats.record_closed([3])
+    assert attempt_stats._active_stale is True
+
+    written = []
+
+    async def _add_deltas(self, deltas):
+        written.append(dict(deltas))
+
+    @asynccontextmanager
+    async def _session_maker():
+        yield None
+
+    monkeypatch.setattr(AttemptStatsRepo, "add_deltas", _add_deltas)
+    assert await attempt_stats.flush(session_maker=_session_maker) == 2
+    assert written == [
+        {
+            (datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc), "attempts_started"): 2,
+            (datetime(2026, 3, 1, 10, 30, tzinfo=timezone.utc), "attempts_submitted"): 2,
+        }
+    ]
+    assert not attempt_stats._local_pending
+    assert await attempt_stats.flush(session_maker=_session_maker) == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_deltas(no_redis, monkeypatch):
+    await attempt_stats.record_diploma_download()
+
+    async def _fail(self, deltas):
+        raise RuntimeError("db down")
+
+    @asynccontextmanager
+    async def _session_maker():
+        yield None
+
+    monkeypatch.setattr(AttemptStatsRepo, "add_deltas", _fail)
+    with pytest.raises(RuntimeError):
+        await attempt_stats.flush(session_maker=_session_maker)
+    assert sum(attempt_stats._local_pending.values()) == 1
+
+
+@pytest.mark.asyncio
+async def test_counter_series_is_zero_filled_and_includes_pending(no_redis, monkeypatch):
+    start = datetime(2026, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+    class _Bucket:
+        bucket_start = start + timedelta(minutes=30)
+        attempts_started = 5
+
+    async def _list_buckets(self, range_start, range_end):
+        return [_Bucket()]
+
+    monkeypatch.setattr(AttemptStatsRepo, "list_buckets", _list_buckets)
+    await attempt_stats.record_started(
+        attempt_id=1, user_id=1, deadline_at=start + timedelta(hours=2), started_at=start + timedelta(minutes=35)
+    )
+    series = await attempt_stats.counter_series(None, "attempts_started", start, start + timedelta(hours=1))
+    assert series == [
+        (start, 0),
+        (start + timedelta(minutes=30), 6),
+        (start + timedelta(hours=1), 0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_active_gauge_in_redis(redis_client, monkeypatch):
+    async def _redis():
+        return redis_client
+
+    monkeypatch.setattr(attempt_stats, "_redis", _redis)
+    now = datetime.now(timezone.utc)
+    await redis_client.set(attempt_stats.ACTIVE_SEEDED_KEY, "1")
+    await attempt_stats.record_started(attempt_id=1, user_id=10, deadline_at=now + timedelta(hours=1), started_at=now)
+    await attempt_stats.record_started(attempt_id=2, user_id=10, deadline_at=now + timedelta(hours=1), started_at=now)
+    await attempt_stats.record_started(attempt_id=3, user_id=11, deadline_at=now - timedelta(minutes=1), started_at=now)
+    assert await attempt_stats.active_overview(None, now) == (3, 2, 1)
+
+    await attempt_stats.record_closed([1, 3], status=AttemptStatus.expired, at=now)
+    assert await attempt_stats.active_overview(None, now) == (1, 1, 1)
+    pending = await redis_client.hgetall(attempt_stats.PENDING_KEY)
+    assert sorted(field.split(":")[1] for field in pending) == ["attempts_expired", "attempts_started"]
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import audit_writer as audit_writer_module
+from app.services.audit_writer import AuditWriter, should_record
+
+
+def _row(i: int) -> dict:
+    return {"action": "request", "path": f"/p/{i}"}
+
+
+@pytest.mark.asyncio
+async def test_audit_writer_batches_and_bounds_queue():
+    batches: list[list[dict]] = []
+
+    async def _write(rows):
+        batches.append(rows)
+
+    writer = AuditWriter(max_queue=5, batch_size=2, flush_ms=10, write=_write)
+    accepted = [writer.enqueue(_row(i)) for i in range(7)]
+    assert accepted == [True] * 5 + [False] * 2
+
+    assert await writer.flush() == 5
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert len(writer) == 0
+
+
+@pytest.mark.asyncio
+async def test_audit_writer_flusher_wakes_on_full_batch():
+    written: list[dict] = []
+
+    async def _write(rows):
+        written.extend(rows)
+
+    writer = AuditWriter(max_queue=100, batch_size=3, flush_ms=60_000, write=_write)
+    task = asyncio.create_task(writer.run())
+    try:
+        for i in range(3):
+            writer.enqueue(_row(i))
+        for _ in range(50):
+            if written:
+                break
+            await asyncio.sleep(0.01)
+        assert len(written) == 3
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+
+@pytest.mark.asyncio
+async def test_audit_writer_skips_failed_batch():
+    calls = 0
+
+    async def _write(rows):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("db down")
+
+    writer = AuditWriter(max_queue=10, batch_size=2, flush_ms=10, write=_write)
+    for i in range(4):
+        writer.enqueue(_row(i))
+    assert await writer.flush() == 2
+    assert calls == 2
+
+
+def test_should_record_sampling(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_LOG_SAMPLE_RULES", "POST /api/v1/attempts/{attempt_id}/answers=0")
+    monkeypatch.setattr(settings, "AUDIT_LOG_DEFAULT_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(audit_writer_module, "_sample_rules_cache", None)
+    answers = "/api/v1/attempts/{attempt_id}/answers"
+
+    assert not should_record(method="POST", route_path=answers, action="request", status_code=200)
+    assert should_record(method="POST", route_path=answers, action="request", status_code=429)
+    assert should_record(method="PUT", route_path="/api/v1/admin/users/{user_id}", action="admin_update_user", status_code=200)
+    assert should_record(method="GET", route_path="/api/v1/olympiads", action="request", status_code=200)
@@ -0,0 +1,177 @@
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app.core import auth_context
+from app.core.security import create_access_token
+from app.models.user import User, UserRole
+from app.repos.users import UsersRepo
+
+
+def test_token_decoded_once_per_request(monkeypatch):
+    calls = 0
+    real_decode = auth_context.decode_token
+
+    def _counting_decode(token):
+        nonlocal calls
+        calls += 1
+        return real_decode(token)
+
+    monkeypatch.setattr(auth_context, "decode_token", _counting_decode)
+    token = create_access_token("42")
+
+    ctx_token = auth_context.set_auth_context(auth_context.bearer_token(f"Bearer {token}"))
+    try:
+        assert auth_context.current_auth_context().user_id == 42
+        assert auth_context.auth_context_for(token).user_id == 42
+        assert auth_context.auth_context_for(token).user_id == 42
+    finally:
+        auth_context.reset_auth_context(ctx_token)
+    assert calls == 1
+
+    assert auth_context.auth_context_for("garbage").payload is None
+    assert auth_context.bearer_token("Basic abc") is None
+
+
+def test_verified_token_cache_skips_signature_check(monkeypatch):
+    calls = 0
+    real_decode = auth_context.decode_token
+
+    def _counting_decode(token):
+        nonlocal calls
+        calls += 1
+        return real_decode(token)
+
+    monkeypatch.setattr(auth_context, "decode_token", _counting_decode)
+    token = create_access_token("7")
+    for _ in range(3):
+        ctx_token = auth_context.set_auth_context(token)
+        auth_context.reset_auth_context(ctx_token)
+    assert calls == 1
+
+    cache = auth_context.VerifiedTokenCache(maxsize=1, max_ttl_sec=60)
+    cache.set("a", {"exp": time.time() + 60})
+    cache.set("b", {"exp": time.time() + 60})
+    assert cache.get("a") is None and cache.get("b") is not None
+    cache.set("c", {"exp": time.time() - 1})
+    assert cache.get("c") is None
+    cache.set("d", {"sub": "1"})
+    assert cache.get("d") is None
+
+
+@pytest.mark.asyncio
+async def test_principal_served_from_cache(db_session, create_user):
+    user = await create_user(
+        login="cached01",
+        email="cached01@example.com",
+        password="StrongPass1",
+        role=UserRole.student,
+    )
+    user_id = user.id
+    db_session.expunge_all()
+    await auth_context.load_principal(db_session, user_id)
+    db_session.expunge_all()
+
+    statements: list[str] = []
+
+    def _on_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sync_engine = db_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _on_execute)
+    try:
+        principal = await auth_context.load_principal(db_session, user_id)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _on_execute)
+    assert statements == []
+    assert principal == auth_context.Principal(
+        id=user_id, role=UserRole.student, is_active=True, must_change_password=False, is_moderator=False
+    )
+
+    # полная строка — только из БД
+    loaded = await auth_context.load_user(db_session, user_id)
+    assert loaded in db_session
+    updated = await UsersRepo(db_session).update_profile(loaded, {"city": "Казань"})
+    assert updated.city == "Казань"
+    assert auth_context.cached_principal(user_id) is None
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.published: list[tuple[str, str]] = []
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+def _principal(user_id: int) -> auth_context.Principal:
+    return auth_context.Principal(
+        id=user_id,
+        role=UserRole.student,
+        is_active=True,
+        must_change_password=False,
+        is_moderator=False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_principal_shared_through_redis_and_invalidated(monkeypatch):
+    fake = FakeRedis()
+
+    async def _safe_redis():
+        return fake
+
+    monkeypatch.setattr(auth_context, "safe_redis", _safe_redis)
+    principal = _principal(11)
+    key = auth_context.user_cache_key(11)
+    fake.data[key] = auth_context._dump_principal(principal)
+
+    # другой воркер положил principal в Redis — L1 пуст, но БД не нужна
+    loaded = await auth_context._shared_principal(11)
+    assert loaded == principal
+    assert loaded.role is UserRole.student
+    assert auth_context.cached_principal(11) == principal
+
+    await auth_context.invalidate_user(11)
+    assert key not in fake.data
+    assert auth_context.cached_principal(11) is None
+    assert fake.published and key in fake.published[0][1]
+
+
+@pytest.mark.asyncio
+async def test_cached_principal_has_no_credentials(monkeypatch):
+    fake = FakeRedis()
+
+    async def _safe_redis():
+        return fake
+
+    monkeypatch.setattr(auth_context, "safe_redis", _safe_redis)
+    user = User(
+        id=12,
+        login="student12",
+        email="s12@example.com",
+        password_hash="argon2-hash",
+        role=UserRole.student,
+        is_active=True,
+        must_change_password=True,
+        is_moderator=False,
+        temp_password_expires_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+    await auth_context._remember_user(user)
+    stored = json.loads(fake.data[auth_context.user_cache_key(12)])
+    assert set(stored) == {"id", "role", "is_active", "must_change_password", "is_moderator"}
+    assert auth_context.cached_principal(12).must_change_password is True
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+
+from app.core.storage import ObjectStat
+from app.core.storage import bulk
+from app.core.storage.bulk import BulkUploader, UploadItem, UploadManifest, s3_etag
+
+
+class _Client:
+    def __init__(self, fail_keys=()):
+        self.uploaded = []
+        self.fail_keys = set(fail_keys)
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def upload_file(self, *, Filename, Bucket, Key, ExtraArgs, Config):
+        if Key in self.fail_keys:
+            raise OSError("connection reset")
+        with self._lock:
+            self.uploaded.append(Key)
+            self.threads.add(threading.get_ident())
+
+
+def _files(tmp_path, count):
+    items = []
+    for idx in range(count):
+        path = tmp_path / f"attempt_{idx}.jpg"
+        path.write_bytes(f"diploma {idx}".encode())
+        items.append(UploadItem(key=path.name, source_path=path))
+    return items
+
+
+def _md5(data: bytes) -> str:
+    return hashlib.md5(data).hexdigest()
+
+
+def test_s3_etag_single_and_multipart(tmp_path):
+    path = tmp_path / "big.bin"
+    data = b"a" * 10 + b"b" * 10 + b"c" * 5
+    path.write_bytes(data)
+    assert s3_etag(path, multipart_threshold=100, part_size=10) == _md5(data)
+    parts = b"".join(hashlib.md5(chunk).digest() for chunk in (b"a" * 10, b"b" * 10, b"c" * 5))
+    assert s3_etag(path, multipart_threshold=20, part_size=10) == f"{_md5(parts)}-3"
+
+
+def test_bulk_upload_skips_unchanged_objects(tmp_path):
+    items = _files(tmp_path, 40)
+    existing = {
+        "attempt_0.jpg": ObjectStat(key="attempt_0.jpg", size=9, etag=_md5(b"diploma 0")),
+        "attempt_1.jpg": ObjectStat(key="attempt_1.jpg", size=9, etag=_md5(b"diploma 9")),
+        "attempt_2.jpg": ObjectStat(key="attempt_2.jpg", size=3, etag="x"),
+    }
+    client = _Client(fail_keys={"attempt_3.jpg"})
+    results = BulkUploader(client, bucket="b", workers=4, existing=existing).run(items)
+
+    by_key = {row.key: row for row in results}
+    assert by_key["attempt_0.jpg"].status == "skipped_unchanged"
+    assert by_key["attempt_1.jpg"].status == "uploaded"
+    assert by_key["attempt_2.jpg"].status == "uploaded"
+    assert by_key["attempt_3.jpg"].status == "error"
+    assert by_key["attempt_5.jpg"].etag == _md5(b"diploma 5")
+    assert len(client.uploaded) == 38
+    assert len(client.threads) > 1
+    assert [row.key for row in results] == sorted(by_key)
+
+
+def test_keep_existing_and_dry_run(tmp_path):
+    items = _files(tmp_path, 2)
+    existing = {"attempt_0.jpg": ObjectStat(key="attempt_0.jpg", size=99, etag="x")}
+    client = _Client()
+    results = BulkUploader(client, bucket="b", workers=2, existing=existing, keep_existing=True, dry_run=True).run(
+        items
+    )
+    assert [row.status for row in results] == ["skipped_exists", "would_upload"]
+    assert client.uploaded == []
+
+
+def test_manifest_makes_rerun_free(tmp_path, monkeypatch):
+    source = tmp_path / "src"
+    source.mkdir()
+    items = _files(source, 5)
+    manifest_path = tmp_path / "manifest.jsonl"
+
+    manifest = UploadManifest(manifest_path)
+    results = BulkUploader(_Client(), bucket="b", workers=2, manifest=manifest).run(items)
+    manifest.close()
+    listing = {row.key: ObjectStat(key=row.key, size=row.size, etag=row.etag) for row in results}
+    with manifest_path.open("a") as fh:
+        fh.write('{"key": "attempt_9.jpg", "si')
+
+    hashed = []
+    monkeypatch.setattr(bulk, "s3_etag", lambda path, **_kwargs: hashed.append(path) or "")
+    manifest = UploadManifest(manifest_path)
+    assert len(manifest) == 5
+    client = _Client()
+    results = BulkUploader(client, bucket="b", workers=2, existing=listing, manifest=manifest).run(items)
+    manifest.close()
+    assert {row.status for row in results} == {"skipped_unchanged"}
+    assert client.uploaded == [] and hashed == []
@@ -0,0 +1,318 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from celery import Celery
+from PIL import Image
+
+from app.schemas.diplomas import DiplomaTemplate, DiplomaTextField
+from app.services import diploma_image, diploma_render
+
+ROWS = [
+    {"attempt_id": 11, "name": "Иванов Иван Иванович", "school": "Школа №1", "score": 18, "score_max": 20, "place": 1},
+    {"attempt_id": 12, "name": "Петрова Анна", "school": "Гимназия", "score": 15, "score_max": 20, "place": 2},
+    {"attempt_id": 13, "name": "Сидоров Пётр", "school": "", "score": 15, "score_max": 20, "place": 2},
+]
+
+
+def _background() -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (600, 400), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _template() -> dict:
+    return DiplomaTemplate(
+        background_key="templates/diploma.png",
+        name=DiplomaTextField(text="{name}", x=300, y=150, font_size=40, bold=True, max_width=200),
+        school=DiplomaTextField(text="{school}", x=300, y=220, font_size=24),
+        score=DiplomaTextField(text="{score} из {score_max}", x=50, y=350, align="left"),
+        place=DiplomaTextField(text="{place} место", x=550, y=350, align="right", color="#aa0000"),
+    ).model_dump()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def smembers(self, key):
+        return {str(value) for value in self.sets.get(key, set())}
+
+    def pipeline(self, transaction=False):
+        redis = self
+
+        class _Pipe:
+            def sadd(self, key, *values):
+                redis.sets.setdefault(key, set()).update(values)
+
+            def expire(self, key, ttl):
+                pass
+
+            async def execute(self):
+                return []
+
+        return _Pipe()
+
+
+class _Session:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Repo:
+    def __init__(self, _session):
+        pass
+
+    async def list_diploma_rows(self, olympiad_id):
+        return [dict(row) for row in ROWS]
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    stored = {}
+    lock = threading.Lock()
+    failing = set()
+    marked = []
+
+    def _put(key, data, content_type):
+        if key in failing:
+            raise OSError("connection reset")
+        with lock:
+            stored[key] = data
+
+    async def _mark(ids):
+        marked.extend(ids)
+
+    monkeypatch.setattr(diploma_render, "AttemptsRepo", _Repo)
+    monkeypatch.setattr(diploma_render, "read_object", lambda key: _background())
+    monkeypatch.setattr(diploma_render, "put_object", _put)
+    monkeypatch.setattr(diploma_render, "mark_diplomas_uploaded", _mark)
+    return stored, failing, marked
+
+
+def test_render_diploma_draws_fields():
+    template = _template()
+    diploma_image.init_renderer(_background(), template)
+    image = Image.open(BytesIO(diploma_image.render_diploma(ROWS[0])))
+    assert image.format == "JPEG"
+    assert image.size == (600, 400)
+    assert image.getbbox() is not None
+    assert image.convert("L").getextrema()[0] < 100
+
+
+def test_worker_autodiscovery_registers_render_task():
+    # в отдельном процессе: в общем процессе тестов модуль задач уже мог быть импортирован
+    code = (
+        "from app.core.celery_app import celery_app\n"
+        "celery_app.loader.import_default_modules()\n"
+        "print('\\n'.join(celery_app.tasks))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    assert "diplomas.render" in out
+    assert "maintenance.grade_overdue_attempts" in out
+    assert "announcements.load_assignments" in out
+
+
+def test_template_rejects_unknown_placeholders():
+    with pytest.raises(ValueError):
+        DiplomaTextField(text="{name.__class__}", x=0, y=0)
+    with pytest.raises(ValueError):
+        DiplomaTextField(text="{email}", x=0, y=0)
+
+
+@pytest.mark.asyncio
+async def test_render_job_uploads_and_resumes(storage):
+    stored, failing, marked = storage
+    redis = FakeRedis()
+
+    async def _redis():
+        return redis
+
+    progress = []
+    failing.add("attempt_13.jpg")
+    state = await diploma_render.render_olympiad_diplomas(
+        7,
+        _template(),
+        job_id="job-1",
+        session_maker=_Session,
+        redis_getter=_redis,
+        workers=2,
+        on_progress=progress.append,
+    )
+    assert (state["status"], state["total"], state["done"], state["failed"]) == ("failed", 3, 2, 1)
+    assert sorted(stored) == ["attempt_11.jpg", "attempt_12.jpg"]
+    assert sorted(marked) == [11, 12]
+    assert progress[-1]["done"] == 2
+
+    failing.clear()
+    stored.clear()
+    state = await diploma_render.render_olympiad_diplomas(
+        7, _template(), job_id="job-2", session_maker=_Session, redis_getter=_redis, workers=2
+    )
+    assert (state["status"], state["done"], state["failed"]) == ("done", 3, 0)
+    assert list(stored) == ["attempt_13.jpg"]
+    saved = json.loads(redis.values[diploma_render.state_key(7)])
+    assert saved["job_id"] == "job-2"
+    assert not diploma_render.is_active(saved)
+
+
+STUBS = '''
+import json
+import pathlib
+import sys
+
+from app.services import diploma_render
+
+OUT = pathlib.Path(sys.argv[1] if __name__ == "__main__" else __import__("os").environ["RENDER_TEST_OUT"])
+ROWS = json.loads((OUT / "rows.json").read_text())
+
+
+class _Session:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Repo:
+    def __init__(self, _session):
+        pass
+
+    async def list_diploma_rows(self, olympiad_id):
+        return ROWS
+
+
+async def _no_redis():
+    return None
+
+
+async def _mark(ids):
+    pass
+
+
+def _put(key, data, content_type):
+    (OUT / key).write_bytes(data)
+
+
+diploma_render.SessionLocal = _Session
+diploma_render.AttemptsRepo = _Repo
+diploma_render.safe_redis = _no_redis
+diploma_render.mark_diplomas_uploaded = _mark
+diploma_render.read_object = lambda key: (OUT / "background.png").read_bytes()
+diploma_render.put_object = _put
+'''
+
+WORKER = '''
+import os
+import sys
+
+from app.core.celery_app import celery_app
+from app.tasks import diplomas
+import render_stubs  # noqa: F401
+
+celery_app.conf.update(
+    broker_transport_options={"data_folder_in": os.environ["RENDER_TEST_QUEUE"], "data_folder_out": os.environ["RENDER_TEST_QUEUE"]},
+    worker_hijack_root_logger=False,
+)
+diplomas.RENDER_COMMAND = [sys.executable, os.path.join(os.path.dirname(__file__), "render_helper.py")]
+celery_app.worker_main(["worker", "-P", "prefork", "-c", "1", "--without-heartbeat", "--without-gossip", "--without-mingle"])
+'''
+
+HELPER = '''
+import render_stubs  # noqa: F401
+from app.services import diploma_render
+
+if __name__ == "__main__":
+    raise SystemExit(diploma_render.main())
+'''
+
+
+def test_render_task_runs_under_prefork_worker(tmp_path):
+    # дочерние процессы prefork-пула — демоны; задача не должна заводить в них свой пул процессов
+    pytest.importorskip("kombu.transport.filesystem")
+    queue = tmp_path / "queue"
+    queue.mkdir()
+    (tmp_path / "rows.json").write_text(json.dumps(ROWS))
+    (tmp_path / "background.png").write_bytes(_background())
+    (tmp_path / "render_stubs.py").write_text(STUBS)
+    (tmp_path / "render_worker.py").write_text(WORKER)
+    (tmp_path / "render_helper.py").write_text(HELPER)
+    backend = Path(__file__).resolve().parents[1]
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([str(backend), str(tmp_path)]),
+        "CELERY_BROKER_URL": "filesystem://",
+        "CELERY_RESULT_BACKEND": f"file://{tmp_path / 'results'}",
+        "DIPLOMA_RENDER_WORKERS": "2",
+        "RENDER_TEST_QUEUE": str(queue),
+        "RENDER_TEST_OUT": str(tmp_path),
+    }
+    (tmp_path / "results").mkdir()
+    worker = subprocess.Popen(
+        [sys.executable, str(tmp_path / "render_worker.py")],
+        cwd=backend,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    client = Celery(
+        "render-test",
+        broker="filesystem://",
+        backend=env["CELERY_RESULT_BACKEND"],
+        broker_transport_options={"data_folder_in": str(queue), "data_folder_out": str(queue)},
+    )
+    try:
+        result = client.send_task("diplomas.render", args=[7, _template()])
+        state = result.get(timeout=120)
+    finally:
+        worker.terminate()
+        _, stderr = worker.communicate(timeout=30)
+    assert state["status"] == "done", stderr
+    assert (state["total"], state["done"], state["failed"]) == (3, 3, 0)
+    assert sorted(p.name for p in tmp_path.glob("attempt_*.jpg")) == [
+        "attempt_11.jpg",
+        "attempt_12.jpg",
+        "attempt_13.jpg",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pool_failure_marks_job_failed(storage, monkeypatch):
+    redis = FakeRedis()
+
+    async def _redis():
+        return redis
+
+    def _no_pool(**kwargs):
+        raise AssertionError("daemonic processes are not allowed to have children")
+
+    monkeypatch.setattr(diploma_render, "ProcessPoolExecutor", _no_pool)
+    state = await diploma_render.render_olympiad_diplomas(
+        7, _template(), job_id="job-1", session_maker=_Session, redis_getter=_redis, workers=2
+    )
+    assert state["status"] == "failed"
+    assert state["error"].startswith("render_pool_failed")
+    assert json.loads(redis.values[diploma_render.state_key(7)])["status"] == "failed"
@@ -0,0 +1,124 @@
+import pytest
+
+from app.core.config import settings
+from app.core.storage import presign_cache
+from app.services import diplomas
+
+
+@pytest.fixture
+def no_redis(monkeypatch):
+    async def _none():
+        return None
+
+    monkeypatch.setattr(diplomas, "_redis", _none)
+    monkeypatch.setattr(presign_cache, "safe_redis", _none)
+    presign_cache._local.clear()
+    yield
+    presign_cache._local.clear()
+
+
+@pytest.fixture
+def listing(monkeypatch):
+    calls = []
+
+    async def _list(prefix):
+        calls.append(prefix)
+        return ["attempt_5.jpg", "attempt_12.jpg", "attempt_x.jpg", "attempt_7.png"]
+
+    monkeypatch.setattr(diplomas, "list_object_keys_async", _list)
+    return calls
+
+
+@pytest.fixture
+def head(monkeypatch):
+    calls = []
+
+    async def _exists(key):
+        calls.append(key)
+        return key in {"attempt_5.jpg", "attempt_12.jpg"}
+
+    monkeypatch.setattr(diplomas, "object_exists_async", _exists)
+    return calls
+
+
+def test_attempt_ids_from_keys():
+    assert diplomas.attempt_ids_from_keys(["attempt_1.jpg", "attempt_02.jpg", "x/attempt_3.jpg", "attempt_4.jpeg"]) == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_cold_index_heads_own_key_without_listing(no_redis, listing, head):
+    assert await diplomas.diploma_exists(5) is True
+    assert await diplomas.diploma_exists(6) is False
+    assert head == ["attempt_5.jpg", "attempt_6.jpg"]
+    assert listing == []
+    assert await diplomas.rebuild_diploma_index() is None
+
+
+@pytest.mark.asyncio
+async def test_head_failure_is_unknown(no_redis, monkeypatch):
+    async def _fail(key):
+        raise RuntimeError("storage_not_configured")
+
+    monkeypatch.setattr(diplomas, "object_exists_async", _fail)
+    assert await diplomas.diploma_exists(5) is None
+
+
+@pytest.mark.asyncio
+async def test_diploma_bitmap_in_redis(redis_client, listing, head, monkeypatch):
+    async def _redis():
+        return redis_client
+
+    monkeypatch.setattr(diplomas, "_redis", _redis)
+    assert await diplomas.diploma_exists(12) is True
+    assert listing == [] and head == ["attempt_12.jpg"]
+
+    assert await diplomas.rebuild_diploma_index() == 2
+    assert await diplomas.diploma_exists(12) is True
+    assert await diplomas.diploma_exists(0) is False
+    assert await diplomas.diploma_exists(13) is False
+    assert await redis_client.ttl(diplomas.INDEX_KEY) > 0
+    assert listing == ["attempt_"] and len(head) == 1
+
+    await diplomas.mark_diplomas_uploaded([13])
+    assert await diplomas.diploma_exists(13) is True
+
+
+@pytest.mark.asyncio
+async def test_rebuild_keeps_diplomas_uploaded_during_listing(redis_client, monkeypatch):
+    async def _redis():
+        return redis_client
+
+    async def _list(prefix):
+        # рендер загрузил диплом, пока шёл листинг — в ответ листинга он не попал
+        await diplomas.mark_diplomas_uploaded([40])
+        return ["attempt_5.jpg"]
+
+    monkeypatch.setattr(diplomas, "_redis", _redis)
+    monkeypatch.setattr(diplomas, "list_object_keys_async", _list)
+    assert await diplomas.rebuild_diploma_index() == 1
+    assert await diplomas.diploma_exists(5) is True
+    assert await diplomas.diploma_exists(40) is True
+    assert not await redis_client.exists(diplomas.UPLOADED_DURING_REBUILD_KEY)
+
+
+@pytest.mark.asyncio
+async def test_presigned_url_reused_within_window(no_redis, monkeypatch):
+    signed = []
+
+    def _presign(key):
+        signed.append(key)
+        return f"https://s3.example.com/{key}?sig={len(signed)}"
+
+    monkeypatch.setattr(presign_cache, "presign_get", _presign)
+    first = await presign_cache.presign_get_cached("attempt_5.jpg")
+    assert await presign_cache.presign_get_cached("attempt_5.jpg") == first
+    assert await presign_cache.presign_get_cached("attempt_6.jpg") != first
+    assert signed == ["attempt_5.jpg", "attempt_6.jpg"]
+
+    monkeypatch.setattr(presign_cache.time, "time", lambda: 4_000_000_000.0)
+    assert await presign_cache.presign_get_cached("attempt_5.jpg") != first
+
+    monkeypatch.setattr(settings, "STORAGE_PRESIGN_REUSE_RATIO", 0)
+    await presign_cache.presign_get_cached("attempt_5.jpg")
+    await presign_cache.presign_get_cached("attempt_5.jpg")
+    assert len(signed) == 5
@@ -1,6 +1,8 @@
 from pathlib import Path
 import sys
 
+import pytest
+
 
 sys.path.append(str(Path(__file__).resolve().parents[2] / "backend"))
 
@@ -36,3 +38,121 @@ def test_short_text_int_float_text():
     text_payload = {"subtype": "text", "expected": "Ответ", "case_insensitive": True, "collapse_spaces": True}
     assert service._grade_task(TaskType.short_text, text_payload, {"text": "оТвет"}) is True
     assert service._grade_task(TaskType.short_text, text_payload, {"text": "не ответ"}) is False
+
+
+def test_compute_attempt_grade_totals_and_pass():
+    from datetime import datetime, timezone
+    from types import SimpleNamespace
+
+    from app.services.grading import AnswerKey, compute_attempt_grade
+
+    tasks = [
+        (
+            SimpleNamespace(task_id=1, max_score=2),
+            SimpleNamespace(id=1, task_type=TaskType.single_choice, payload={"correct_option_id": "A"}),
+        ),
+        (
+            SimpleNamespace(task_id=2, max_score=3),
+            SimpleNamespace(id=2, task_type=TaskType.short_text, payload={"subtype": "int", "expected": "5"}),
+        ),
+    ]
+    now = datetime.now(timezone.utc)
+    grade = compute_attempt_grade(
+        attempt_id=10,
+        answer_key=AnswerKey(tasks),
+        answers_by_task={1: {"choice_id": "A"}},
+        pass_percent=50,
+        graded_at=now,
+    )
+    assert grade.attempt_id == 10
+    assert (grade.score_total, grade.score_max) == (2, 5)
+    assert grade.passed is False
+    assert [(t.task_id, t.is_correct, t.score) for t in grade.tasks] == [(1, True, 2), (2, False, 0)]
+    assert grade.graded_at == now
+
+
+def test_answer_key_validate():
+    from types import SimpleNamespace
+
+    import pytest
+
+    from app.core import error_codes as codes
+    from app.services.grading import AnswerKey
+
+    tasks = [
+        (
+            SimpleNamespace(task_id=1, max_score=1),
+            SimpleNamespace(
+                id=1,
+                task_type=TaskType.multi_choice,
+                payload={"options": [{"id": "A"}, {"id": "B"}], "correct_option_ids": ["A"]},
+            ),
+        ),
+        (
+            SimpleNamespace(task_id=2, max_score=1),
+            SimpleNamespace(id=2, task_type=TaskType.short_text, payload={"subtype": "float", "expected": "1.5"}),
+        ),
+    ]
+    key = AnswerKey(tasks)
+
+    assert key.validate(1, {"choice_ids": ["B", "A"]}) == {"choice_ids": ["B", "A"]}
+    assert key.validate(2, {"text": " 1,5 "}) == {"text": "1,5"}
+    for task_id, payload in ((1, {"choice_ids": ["A", "A"]}), (1, {"choice_ids": ["C"]}), (2, {"text": "x"}), (2, [])):
+        with pytest.raises(ValueError, match=codes.INVALID_ANSWER_PAYLOAD):
+            key.validate(task_id, payload)
+    with pytest.raises(ValueError, match=codes.TASK_NOT_FOUND):
+        key.validate(3, {"text": "1"})
+
+
+def test_answer_key_matches_per_call_checks():
+    from types import SimpleNamespace
+
+    from app.services.grading import AnswerKey, grade_task
+
+    cases = [
+        (TaskType.single_choice, {"options": [{"id": c} for c in "ABC"], "correct_option_id": "C"},
+         [{"choice_id": "C"}, {"choice_id": "A"}]),
+        (TaskType.multi_choice, {"options": [{"id": c} for c in "ABCD"], "correct_option_ids": ["A", "D"]},
+         [{"choice_ids": ["D", "A"]}, {"choice_ids": ["A"]}]),
+        (TaskType.short_text, {"subtype": "float", "expected": "2,5", "epsilon": 0.01},
+         [{"text": "2.5"}, {"text": "2.6"}]),
+        (TaskType.short_text, {"subtype": "text", "expected": "Ответ  здесь", "collapse_spaces": True},
+         [{"text": "ответ здесь"}, {"text": "ответ"}]),
+    ]
+    key = AnswerKey(
+        (SimpleNamespace(task_id=i, max_score=1), SimpleNamespace(id=i, task_type=task_type, payload=payload))
+        for i, (task_type, payload, _answers) in enumerate(cases, start=1)
+    )
+    for task_id, (task_type, payload, answers) in enumerate(cases, start=1):
+        for answer in answers:
+            assert key.validate(task_id, answer) == AttemptsService._validate_answer_payload(task_type, payload, answer)
+            assert key.grade(task_id, answer) == grade_task(task_type, payload, answer)
+        assert key.grade(task_id, answers[0]) is True
+        assert key.grade(task_id, answers[1]) is False
+
+
+@pytest.mark.asyncio
+async def test_answer_key_compiled_once_per_olympiad():
+    service = AttemptsService(None)
+    calls = []
+
+    async def _tasks_cached(olympiad_id):
+        calls.append(olympiad_id)
+        return [
+            {
+                "olymp_task": {"task_id": 1, "sort_order": 1, "max_score": 1},
+                "task": {
+                    "id": 1,
+                    "title": "T",
+                    "content": "",
+                    "task_type": "single_choice",
+                    "payload": {"options": [{"id": "A"}], "correct_option_id": "A"},
+                },
+            }
+        ]
+
+    service._get_tasks_cached = _tasks_cached
+    first = await service._get_answer_key(7)
+    assert await service._get_answer_key(7) is first
+    assert first.grade(1, {"choice_id": "A"}) is True
+    assert calls == [7]
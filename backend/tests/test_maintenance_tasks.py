@@ -9,8 +9,10 @@ from app.models.user import User, UserRole
 from app.models.auth_token import RefreshToken
 from app.models.olympiad import Olympiad, OlympiadScope
 from app.models.audit_log import AuditLog
+from app.models.attempt import Attempt, AttemptAnswer, AttemptGrade, AttemptStatus, AttemptTaskGrade
 from app.models.task import Task, Subject, TaskType
 from app.models.olympiad_task import OlympiadTask
+from app.repos.attempts import AttemptsRepo
 from app.tasks import maintenance
 
 
@@ -171,3 +173,178 @@ async def test_warmup_olympiad_cache(db_engine):
     )
     assert count == 1
     assert fake_redis.store
+
+
+@pytest.mark.asyncio
+async def test_grade_overdue_attempts(db_engine):
+    session_maker = async_sessionmaker(bind=db_engine, expire_on_commit=False, class_=AsyncSession)
+    now = datetime.now(timezone.utc)
+    async with session_maker() as session:
+        task = Task(
+            subject=Subject.math,
+            title="Task",
+            content="2+2",
+            task_type=TaskType.single_choice,
+            payload={"options": [{"id": "a", "text": "4"}, {"id": "b", "text": "5"}], "correct_option_id": "a"},
+            created_by_user_id=1,
+        )
+        olympiad = Olympiad(
+            title="Olympiad",
+            description="Desc",
+            scope=OlympiadScope.global_,
+            age_group="7-8",
+            attempts_limit=1,
+            duration_sec=600,
+            available_from=now - timedelta(hours=2),
+            available_to=now - timedelta(minutes=10),
+            pass_percent=60,
+            is_published=True,
+            created_by_user_id=1,
+        )
+        users = [
+            User(
+                login=f"overdue{i}",
+                email=f"overdue{i}@example.com",
+                password_hash="x",
+                role=UserRole.student,
+                is_active=True,
+                is_email_verified=True,
+            )
+            for i in range(3)
+        ]
+        session.add_all([task, olympiad, *users])
+        await session.flush()
+        session.add(OlympiadTask(olympiad_id=olympiad.id, task_id=task.id, sort_order=1, max_score=2))
+        attempts = [
+            Attempt(
+                olympiad_id=olympiad.id,
+                user_id=user.id,
+                started_at=now - timedelta(hours=1),
+                deadline_at=now - timedelta(minutes=50) if i < 2 else now + timedelta(minutes=5),
+                duration_sec=600,
+                status=AttemptStatus.active,
+            )
+            for i, user in enumerate(users)
+        ]
+        session.add_all(attempts)
+        await session.flush()
+        session.add(
+            AttemptAnswer(
+                attempt_id=attempts[0].id,
+                task_id=task.id,
+                answer_payload={"choice_id": "a"},
+                updated_at=now - timedelta(minutes=55),
+            )
+        )
+        await session.commit()
+
+    graded = await maintenance._grade_overdue_attempts(
+        session_maker=session_maker,
+        redis_getter=lambda: _none(),
+        batch_size=1,
+    )
+    assert graded == 2
+
+    async with session_maker() as session:
+        rows = {a.user_id: a for a in (await session.execute(select(Attempt))).scalars().all()}
+        first, second, open_attempt = (rows[u.id] for u in users)
+        assert (first.status, first.score_total, first.score_max, first.passed) == (AttemptStatus.expired, 2, 2, True)
+        assert (second.status, second.score_total, second.passed) == (AttemptStatus.expired, 0, False)
+        assert open_attempt.status == AttemptStatus.active
+        grades = (await session.execute(select(AttemptTaskGrade))).scalars().all()
+        assert len(grades) == 2
+
+
+async def _none():
+    return None
+
+
+class _LockRedis:
+    """Submit lock of ``held`` attempts already taken; records what the sweep releases."""
+
+    def __init__(self, held: set[str]):
+        self.held = held
+        self.taken: list[str] = []
+        self.released: list[str] = []
+
+    def pipeline(self, transaction=False):
+        redis = self
+
+        class _Pipe:
+            def __init__(self):
+                self.keys: list[str] = []
+
+            def set(self, key, value, nx=False, ex=None):
+                self.keys.append(key)
+
+            async def execute(self):
+                acquired = [key not in redis.held for key in self.keys]
+                redis.taken.extend(key for key, ok in zip(self.keys, acquired) if ok)
+                return acquired
+
+        return _Pipe()
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        self.released.extend(keys_and_args[:numkeys])
+
+
+@pytest.mark.asyncio
+async def test_overdue_sweep_skips_attempts_being_submitted(monkeypatch):
+    from app.core import redis as redis_module
+
+    monkeypatch.setattr(redis_module, "_unavailable_until", 0.0)
+    redis = _LockRedis(held={"lock:submit:2"})
+    locked = await maintenance._lock_attempts(redis, [1, 2, 3], "token")
+    assert locked == [1, 3]
+    await maintenance._unlock_attempts(redis, locked, "token")
+    assert redis.released == ["lock:submit:1", "lock:submit:3"]
+    # без Redis защищает только условие в save_grades
+    assert await maintenance._lock_attempts(None, [1, 2], "token") == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_save_grades_does_not_reclose_submitted_attempt(db_engine):
+    session_maker = async_sessionmaker(bind=db_engine, expire_on_commit=False, class_=AsyncSession)
+    now = datetime.now(timezone.utc)
+    async with session_maker() as session:
+        olympiad = Olympiad(
+            title="Olympiad",
+            description="Desc",
+            scope=OlympiadScope.global_,
+            age_group="7-8",
+            attempts_limit=1,
+            duration_sec=600,
+            available_from=now - timedelta(hours=2),
+            available_to=now - timedelta(minutes=10),
+            pass_percent=60,
+            is_published=True,
+            created_by_user_id=1,
+        )
+        user = User(
+            login="resubmit",
+            email="resubmit@example.com",
+            password_hash="x",
+            role=UserRole.student,
+            is_active=True,
+            is_email_verified=True,
+        )
+        session.add_all([olympiad, user])
+        await session.flush()
+        attempt = Attempt(
+            olympiad_id=olympiad.id,
+            user_id=user.id,
+            started_at=now - timedelta(hours=1),
+            deadline_at=now - timedelta(minutes=50),
+            duration_sec=600,
+            status=AttemptStatus.submitted,
+            score_total=1,
+            score_max=2,
+            graded_at=now - timedelta(minutes=51),
+        )
+        session.add(attempt)
+        await session.commit()
+
+        grade = AttemptGrade(attempt_id=attempt.id, score_total=0, score_max=2, passed=False, graded_at=now, tasks=())
+        assert await AttemptsRepo(session).save_grades([grade], status=AttemptStatus.expired) == []
+        await session.refresh(attempt)
+        assert (attempt.status, attempt.score_total) == (AttemptStatus.submitted, 1)
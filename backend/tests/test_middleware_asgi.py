@@ -0,0 +1,56 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.middleware import audit as audit_module
+from app.middleware import rate_limit as rate_limit_module
+from app.middleware.audit import AuditMiddleware
+from app.middleware.auth_context import AuthContextMiddleware
+from app.middleware.rate_limit import GlobalRateLimitMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from app.services.audit_writer import AuditWriter
+
+
+async def _stream(_request):
+    async def _chunks():
+        for i in range(3):
+            yield f"chunk{i};".encode()
+
+    return StreamingResponse(_chunks(), media_type="text/plain", status_code=201)
+
+
+def _build_app():
+    app = Starlette(routes=[Route("/api/v1/items/{item_id}", _stream)])
+    app.add_middleware(RequestIdMiddleware)
+    app.add_middleware(GlobalRateLimitMiddleware)
+    app.add_middleware(AuditMiddleware)
+    app.add_middleware(AuthContextMiddleware)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_middleware_stack_streams_and_audits(monkeypatch):
+    async def _no_redis():
+        return None
+
+    writer = AuditWriter(max_queue=10, batch_size=10, flush_ms=1000)
+    monkeypatch.setattr(rate_limit_module, "safe_redis", _no_redis)
+    monkeypatch.setattr(audit_module, "audit_writer", writer)
+    monkeypatch.setattr(settings, "AUDIT_LOG_ENABLED", True)
+    monkeypatch.setattr(settings, "AUDIT_LOG_DEFAULT_SAMPLE_RATE", 1.0)
+
+    transport = ASGITransport(app=_build_app())
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        resp = await ac.get("/api/v1/items/7", headers={"X-Request-ID": "req-abc"})
+
+    assert resp.status_code == 201
+    assert resp.text == "chunk0;chunk1;chunk2;"
+    assert resp.headers["X-Request-ID"] == "req-abc"
+    assert len(writer) == 1
+    row = writer._queue[0]
+    assert row["status_code"] == 201
+    assert row["request_id"] == "req-abc"
+    assert row["path"] == "/api/v1/items/7"
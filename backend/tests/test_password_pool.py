@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.security import (
+    PasswordHashBusy,
+    PasswordHashPool,
+    hash_password_async,
+    verify_password_async,
+)
+
+
+@pytest.mark.asyncio
+async def test_password_hash_async_roundtrip():
+    password_hash = await hash_password_async("StrongPass1")
+    assert await verify_password_async("StrongPass1", password_hash)
+    assert not await verify_password_async("WrongPass1", password_hash)
+
+
+@pytest.mark.asyncio
+async def test_password_pool_rejects_when_queue_is_full():
+    pool = PasswordHashPool(workers=1, max_pending=2)
+    release = threading.Event()
+    try:
+        first = asyncio.create_task(pool.run("verify", release.wait, 5))
+        second = asyncio.create_task(pool.run("verify", release.wait, 5))
+        await asyncio.sleep(0)
+        assert pool.pending == 2
+        with pytest.raises(PasswordHashBusy):
+            await pool.run("verify", release.wait, 5)
+        release.set()
+        assert await first and await second
+        assert pool.pending == 0
+    finally:
+        release.set()
+        pool.shutdown()
@@ -0,0 +1,122 @@
+import pytest
+from redis.exceptions import NoScriptError
+
+from app.core.rate_limit import (
+    TOKEN_BUCKET_LUA,
+    TOKEN_BUCKET_SHA,
+    Bucket,
+    token_bucket_rate_limit,
+    token_bucket_rate_limit_many,
+)
+
+
+class FakeRedis:
+    def __init__(self, reply):
+        self.reply = reply
+        self.loaded: list[str] = []
+        self.calls: list[tuple] = []
+
+    async def evalsha(self, sha, numkeys, *keys_and_args):
+        if sha not in self.loaded:
+            raise NoScriptError("NOSCRIPT No matching script")
+        self.calls.append((sha, numkeys, keys_and_args))
+        return self.reply
+
+    async def script_load(self, script):
+        assert script == TOKEN_BUCKET_LUA
+        self.loaded.append(TOKEN_BUCKET_SHA)
+        return TOKEN_BUCKET_SHA
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_loads_script_on_noscript():
+    redis = FakeRedis([0, 4, 0])
+    res = await token_bucket_rate_limit(redis, key="rl:test", capacity=5, window_sec=10)
+    assert res.allowed and res.remaining == 4
+    res = await token_bucket_rate_limit(redis, key="rl:test", capacity=5, window_sec=10)
+    assert redis.loaded == [TOKEN_BUCKET_SHA]
+    assert len(redis.calls) == 2
+    _sha, numkeys, keys_and_args = redis.calls[0]
+    assert numkeys == 1 and keys_and_args[0] == "rl:test"
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_many_reports_denied_bucket():
+    redis = FakeRedis([2, 7, 0, 0, 1500])
+    redis.loaded.append(TOKEN_BUCKET_SHA)
+    results = await token_bucket_rate_limit_many(
+        redis,
+        [
+            Bucket(key="rl:global:ip", capacity=10, window_sec=10),
+            Bucket(key="rl:disabled", capacity=0, window_sec=10),
+            Bucket(key="rl:critical:user:1", capacity=1, window_sec=10),
+        ],
+    )
+    assert [r.allowed for r in results] == [True, True, False]
+    assert results[2].retry_after_sec == 2
+    _sha, numkeys, keys_and_args = redis.calls[0]
+    assert numkeys == 2
+    assert keys_and_args[:2] == ("rl:global:ip", "rl:critical:user:1")
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_many_is_all_or_nothing(redis_client):
+    buckets = [
+        Bucket(key="rl:t:global", capacity=5, window_sec=60),
+        Bucket(key="rl:t:user", capacity=1, window_sec=60),
+    ]
+    first = await token_bucket_rate_limit_many(redis_client, buckets)
+    assert all(r.allowed for r in first)
+    second = await token_bucket_rate_limit_many(redis_client, buckets)
+    assert [r.allowed for r in second] == [True, False]
+    assert second[1].retry_after_sec > 0
+    # заблокированный запрос не списывает токены из глобальной корзины
+    assert second[0].remaining == first[0].remaining
+    assert await redis_client.hget("rl:t:global", "t") is not None
+
+
+class DownRedis:
+    async def evalsha(self, *args):
+        raise ConnectionError("redis down")
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_falls_back_to_local_buckets(monkeypatch):
+    from app.core import rate_limit as rate_limit_module
+    from app.core import redis as redis_module
+
+    monkeypatch.setattr(redis_module, "_unavailable_until", 0.0)
+    monkeypatch.setattr(rate_limit_module, "local_buckets", rate_limit_module.LocalTokenBuckets(maxsize=2))
+    redis = DownRedis()
+
+    first = await token_bucket_rate_limit(redis, key="rl:login:ip:a", capacity=1, window_sec=60)
+    assert first.allowed
+    second = await token_bucket_rate_limit(None, key="rl:login:ip:a", capacity=1, window_sec=60)
+    assert not second.allowed and second.retry_after_sec > 0
+    # Redis помечен недоступным — повторных попыток до REDIS_RETRY_AFTER_SEC нет
+    assert redis_module.redis_marked_down()
+
+    await token_bucket_rate_limit(None, key="rl:login:ip:b", capacity=1, window_sec=60)
+    await token_bucket_rate_limit(None, key="rl:login:ip:c", capacity=1, window_sec=60)
+    assert len(rate_limit_module.local_buckets) == 2
+    # самый старый ключ вытеснен — корзина начинается заново
+    assert (await token_bucket_rate_limit(None, key="rl:login:ip:a", capacity=1, window_sec=60)).allowed
+
+
+class WrongLoopRedis:
+    async def evalsha(self, *args):
+        raise RuntimeError("Event loop is closed")
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_falls_back_on_any_client_error(monkeypatch):
+    from app.core import rate_limit as rate_limit_module
+    from app.core import redis as redis_module
+
+    monkeypatch.setattr(redis_module, "_unavailable_until", 0.0)
+    monkeypatch.setattr(rate_limit_module, "local_buckets", rate_limit_module.LocalTokenBuckets(maxsize=8))
+
+    res = await token_bucket_rate_limit(WrongLoopRedis(), key="rl:login:ip:a", capacity=1, window_sec=60)
+    assert res.allowed
+    assert redis_module.redis_marked_down()
+    assert len(rate_limit_module.local_buckets) == 1
@@ -0,0 +1,107 @@
+import csv
+import io
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from openpyxl import load_workbook
+
+from app.models.user import Gender
+from app.repos.teacher import TeacherRepo
+from app.services import results_export
+
+
+def _row(attempt_id: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=attempt_id,
+        user_id=100 + attempt_id,
+        login=f"student{attempt_id}",
+        surname="Иванов",
+        name="Иван",
+        father_name=None,
+        gender=Gender.male,
+        class_grade=7,
+        city="Москва",
+        school="Школа",
+        manual_teachers=[{"full_name": "Петров Пётр"}, {"full_name": "Сидоров Сидор"}],
+        teacher_names=["Сидоров Сидор"],
+        started_at=datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc),
+        graded_at=None,
+        duration_sec=600,
+        score_total=3,
+        score_max=4,
+        task_scores={"11": 1, "12": 2},
+    )
+
+
+class _FakeStream:
+    def __init__(self, rows, size):
+        self.rows = rows
+        self.size = size
+
+    async def partitions(self):
+        for start in range(0, len(self.rows), self.size):
+            yield self.rows[start : start + self.size]
+
+
+@pytest.fixture
+def fake_export(monkeypatch):
+    rows = [_row(i) for i in range(1, 6)]
+    batch_sizes = []
+
+    async def _stream(self, olympiad_id, *, yield_per):
+        batch_sizes.append(yield_per)
+        return _FakeStream(rows, yield_per)
+
+    @asynccontextmanager
+    async def _session_maker():
+        yield None
+
+    monkeypatch.setattr(TeacherRepo, "stream_olympiad_export", _stream)
+    return _session_maker, batch_sizes
+
+
+def test_teachers_value_merges_manual_teachers():
+    assert results_export.teachers_value(["A", "B"], [{"full_name": " B "}, {"full_name": "C"}, "x"]) == "A; B; C"
+    assert results_export.teachers_value([], None) is None
+
+
+@pytest.mark.asyncio
+async def test_csv_export_streams_one_chunk_per_batch(fake_export):
+    session_maker, batch_sizes = fake_export
+    chunks = [
+        chunk
+        async for chunk in results_export.iter_csv(session_maker, olympiad_id=1, task_ids=[11, 12, 13], batch_size=2)
+    ]
+    assert batch_sizes == [2]
+    assert len(chunks) == 1 + 3  # header + ceil(5 / 2)
+
+    text = b"".join(chunks).decode("utf-8")
+    assert text.startswith("\ufeff")
+    rows = list(csv.reader(io.StringIO(text.lstrip("\ufeff"))))
+    assert rows[0][-3:] == ["task_11", "task_12", "task_13"]
+    assert len(rows) == 6
+    first = dict(zip(rows[0], rows[1]))
+    assert first["user_full_name"] == "Иванов Иван"
+    assert first["teachers"] == "Сидоров Сидор; Петров Пётр"
+    assert first["percent"] == "75"
+    assert first["started_at"] == "2026-03-01T10:00:00+00:00"
+    assert (first["task_11"], first["task_12"], first["task_13"]) == ("1", "2", "")
+
+
+@pytest.mark.asyncio
+async def test_xlsx_export(fake_export):
+    session_maker, _batch_sizes = fake_export
+    body = b"".join(
+        [
+            chunk
+            async for chunk in results_export.iter_xlsx(session_maker, olympiad_id=1, task_ids=[11, 12], batch_size=2)
+        ]
+    )
+    sheet = load_workbook(io.BytesIO(body), read_only=True)["results"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert len(rows) == 6
+    first = dict(zip(rows[0], rows[1]))
+    assert first["started_at"] == datetime(2026, 3, 1, 10, 0)
+    assert (first["task_11"], first["task_12"]) == (1, 2)
@@ -0,0 +1,63 @@
+import pytest
+
+from app.models.school import School
+from app.services import school_lookup
+from app.services.school_lookup import SchoolIndex
+
+ROWS = [
+    ("Москва", "Школа № 57"),
+    ("Москва", "Лицей «Вторая школа»"),
+    ("Москва", "Школа 1543"),
+    ("москва", "Школа № 57"),
+    ("Королёв", "Гимназия № 5"),
+    ("Королев", "Лицей № 4"),
+    ("Мурманск", "Школа № 57"),
+    ("Орёл", "Лицей № 1"),
+]
+
+
+def test_city_prefix_is_case_and_yo_insensitive():
+    index = SchoolIndex(ROWS)
+    assert index.cities("мо", 20) == ["Москва", "москва"]
+    assert index.cities("КОРОЛЕ", 20) == ["Королев", "Королёв"]
+    assert index.cities("м", 2) == ["Москва", "москва"]
+    assert index.cities("  ", 20) == []
+
+
+def test_school_substring_search_by_trigrams():
+    index = SchoolIndex(ROWS)
+    assert index.schools("москва", "школ", 50) == ["Лицей «Вторая школа»", "Школа 1543", "Школа № 57"]
+    assert index.schools("Москва", "57", 50) == ["Школа № 57"]
+    assert index.schools("Москва", "", 2) == ["Лицей «Вторая школа»", "Школа 1543"]
+    assert index.schools("королев", "гимназия", 50) == ["Гимназия № 5"]
+    assert index.schools("Москва", "гимназия", 50) == []
+    assert index.schools("Тверь", "", 50) == []
+
+
+def test_etag_depends_on_content_and_params():
+    index = SchoolIndex(ROWS)
+    assert index.etag("cities", "мо", 20) == SchoolIndex(list(reversed(ROWS))).etag("cities", "мо", 20)
+    assert index.etag("cities", "мо", 20) != index.etag("cities", "мо", 10)
+    assert index.etag("cities", "мо", 20) != SchoolIndex(ROWS[:-1]).etag("cities", "мо", 20)
+
+
+@pytest.mark.asyncio
+async def test_lookup_endpoints_use_index_with_etag(client, db_session):
+    db_session.add_all([School(city=city, name=name) for city, name in ROWS])
+    await db_session.commit()
+    await school_lookup.bump_index_version()
+
+    resp = await client.get("/api/v1/lookup/cities", params={"query": "орел"})
+    assert resp.status_code == 200
+    assert resp.json() == ["Орёл"]
+    assert resp.headers["cache-control"].startswith("public, max-age=")
+
+    resp = await client.get("/api/v1/lookup/schools", params={"city": "Москва", "query": "школ"})
+    assert resp.json() == ["Лицей «Вторая школа»", "Школа 1543", "Школа № 57"]
+    etag = resp.headers["etag"]
+    resp = await client.get(
+        "/api/v1/lookup/schools",
+        params={"city": "Москва", "query": "школ"},
+        headers={"If-None-Match": etag},
+    )
+    assert resp.status_code == 304
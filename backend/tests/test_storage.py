@@ -0,0 +1,67 @@
+from urllib.parse import urlparse
+
+import pytest
+
+from app.core import storage
+from app.core.config import settings
+from app.core.storage import client as storage_client
+
+
+@pytest.fixture
+def configured_storage(monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_ENDPOINT", "https://s3.example.com")
+    monkeypatch.setattr(settings, "STORAGE_ACCESS_KEY", "key")
+    monkeypatch.setattr(settings, "STORAGE_SECRET_KEY", "secret")
+    probes: list[str] = []
+
+    def _probe(endpoint):
+        probes.append(endpoint)
+        return endpoint == "http://minio:9000"
+
+    monkeypatch.setattr(storage_client, "_probe", _probe)
+    storage_client.reset()
+    yield probes
+    storage_client.reset()
+    storage_client.shutdown()
+
+
+def test_presign_signs_locally_with_one_shared_client(configured_storage, monkeypatch):
+    monkeypatch.setattr(storage_client, "start_endpoint_resolution", lambda: None)
+    first = storage.presign_get("attempt_1.jpg")
+    second = storage.presign_get("attempt_2.jpg")
+    assert configured_storage == []
+    assert urlparse(first).netloc == "s3.example.com"
+    assert "X-Amz-Signature=" in second
+    assert storage.get_client(wait=False) is storage.get_client(wait=False)
+
+
+def test_background_resolution_switches_endpoint(configured_storage):
+    storage.start_endpoint_resolution().result(timeout=5)
+    assert configured_storage[0] == "https://s3.example.com"
+    assert configured_storage[-1] == "http://minio:9000"
+    assert urlparse(storage.presign_get("attempt_1.jpg")).netloc == "minio:9000"
+    assert storage.start_endpoint_resolution() is None
+
+
+def test_unconfigured_storage(monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_ACCESS_KEY", None)
+    storage_client.reset()
+    assert storage.get_client() is None
+    with pytest.raises(RuntimeError):
+        storage.presign_get("attempt_1.jpg")
+
+
+@pytest.mark.asyncio
+async def test_list_object_keys_async_runs_in_pool(configured_storage, monkeypatch):
+    calls = []
+
+    class _Client:
+        def list_objects_v2(self, **params):
+            calls.append(params)
+            if "ContinuationToken" not in params:
+                return {"Contents": [{"Key": "a"}], "IsTruncated": True, "NextContinuationToken": "t"}
+            return {"Contents": [{"Key": "b"}], "IsTruncated": False}
+
+    monkeypatch.setattr("app.core.storage.objects.get_client", lambda **_kwargs: _Client())
+    assert await storage.list_object_keys_async("certificates/") == ["a", "b"]
+    assert [call.get("ContinuationToken") for call in calls] == [None, "t"]
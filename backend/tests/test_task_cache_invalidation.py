@@ -1,6 +1,9 @@
+import json
+
 import pytest
 
-from app.core.cache import olympiad_tasks_key
+from app.core import cache as cache_module
+from app.core.cache import CACHE_INVALIDATION_CHANNEL, LocalCache, local_cache, olympiad_tasks_key
 from app.services import tasks as tasks_module
 from app.services.tasks import TasksService
 
@@ -8,10 +11,14 @@ from app.services.tasks import TasksService
 class FakeRedis:
     def __init__(self):
         self.deleted_keys = []
+        self.published = []
 
     async def delete(self, *keys):
         self.deleted_keys.extend(keys)
 
+    async def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
 
 class FakeRepo:
     def __init__(self, olympiad_ids):
@@ -75,3 +82,51 @@ async def test_task_update_invalidates_tasks_cache(monkeypatch):
 
     assert repo.updated is True
     assert fake_redis.deleted_keys == [olympiad_tasks_key(3)]
+    assert fake_redis.published == [(CACHE_INVALIDATION_CHANNEL, [olympiad_tasks_key(3)])]
+
+
+@pytest.mark.asyncio
+async def test_task_update_drops_local_cache_entry(monkeypatch):
+    async def _no_redis():
+        return None
+
+    monkeypatch.setattr(tasks_module, "safe_redis", _no_redis)
+    local_cache.set(olympiad_tasks_key(5), ("inflated",))
+
+    repo = FakeRepo([5])
+    await TasksService(repo).delete(task=type("TaskObj", (), {"id": 1})())
+
+    assert local_cache.get(olympiad_tasks_key(5), cache="test") is None
+
+
+def test_local_cache_ttl_and_lru(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = LocalCache(maxsize=2, ttl_sec=10)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a", cache="test") == 1
+    cache.set("c", 3)  # "b" — самый давно использованный
+    assert cache.get("b", cache="test") is None
+    assert cache.get("c", cache="test") == 3
+
+    now[0] += 11
+    assert cache.get("a", cache="test") is None
+
+
+def test_celery_worker_bypasses_local_cache(monkeypatch):
+    from app.core.celery_app import _disable_local_caches
+
+    monkeypatch.setattr(cache_module, "_local_disabled", False)
+    monkeypatch.setattr(cache_module, "_local_caches", [local_cache])
+    monkeypatch.setattr(local_cache, "maxsize", local_cache.maxsize)
+    local_cache.set(olympiad_tasks_key(5), ("stale",))
+
+    _disable_local_caches()
+    assert local_cache.get(olympiad_tasks_key(5), cache="test") is None
+    local_cache.set(olympiad_tasks_key(5), ("fresh",))
+    assert local_cache.get(olympiad_tasks_key(5), cache="test") is None
+    late = cache_module.register_local_cache(LocalCache(maxsize=10, ttl_sec=10))
+    late.set("k", 1)
+    assert late.get("k", cache="test") is None
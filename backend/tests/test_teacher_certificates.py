@@ -0,0 +1,153 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.v1 import teacher as teacher_api
+from app.core.security import hash_password
+from app.models.user import User, UserRole
+from app.repos.teacher_certificates import TeacherCertificatesRepo
+from app.services import teacher_certificates
+from app.tasks import maintenance
+
+
+def _headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_parse_certificate_key():
+    assert teacher_certificates.parse_certificate_key(
+        "certificates/teachers/2025_2026/certificate_7_2025_2026_02.jpg"
+    ) == {
+        "teacher_id": 7,
+        "season": "2025_2026",
+        "seq": 2,
+        "key": "certificates/teachers/2025_2026/certificate_7_2025_2026_02.jpg",
+    }
+    assert teacher_certificates.parse_certificate_key("certificates/teachers/2025_2026/readme.txt") is None
+    # сезон в имени не совпадает с папкой
+    assert teacher_certificates.parse_certificate_key(
+        "certificates/teachers/2024_2025/certificate_7_2025_2026_02.jpg"
+    ) is None
+    assert teacher_certificates.parse_certificate_key(
+        "certificates/teachers/2025_2027/certificate_7_2025_2027_02.jpg"
+    ) is None
+
+
+@pytest.mark.asyncio
+async def test_reconcile_rebuilds_index_from_one_listing(db_engine, monkeypatch):
+    session_maker = async_sessionmaker(bind=db_engine, expire_on_commit=False, class_=AsyncSession)
+    async with session_maker() as session:
+        teacher = User(
+            login="certteacher",
+            email="certteacher@example.com",
+            password_hash=hash_password("TeacherPass1"),
+            role=UserRole.teacher,
+            is_active=True,
+            is_email_verified=True,
+        )
+        student = User(
+            login="certstudent",
+            email="certstudent@example.com",
+            password_hash=hash_password("StudentPass1"),
+            role=UserRole.student,
+            is_active=True,
+            is_email_verified=True,
+        )
+        session.add_all([teacher, student])
+        await session.commit()
+        await TeacherCertificatesRepo(session).add_many(
+            [{"teacher_id": teacher.id, "season": "2024_2025", "seq": 1, "key": "stale.jpg"}]
+        )
+
+    listings = []
+
+    async def _list(prefix):
+        listings.append(prefix)
+        return [
+            f"certificates/teachers/2025_2026/certificate_{teacher.id}_2025_2026_02.jpg",
+            f"certificates/teachers/2025_2026/certificate_{teacher.id}_2025_2026_01.jpg",
+            f"certificates/teachers/2025_2026/certificate_{student.id}_2025_2026_01.jpg",
+            "certificates/teachers/2025_2026/notes.txt",
+        ]
+
+    monkeypatch.setattr(teacher_certificates, "list_object_keys_async", _list)
+    assert await maintenance._reconcile_teacher_certificates(session_maker=session_maker) == 2
+    assert listings == ["certificates/teachers/"]
+
+    async with session_maker() as session:
+        repo = TeacherCertificatesRepo(session)
+        assert [c.seq for c in await repo.list_for_teacher(teacher.id, "2025_2026")] == [1, 2]
+        assert await repo.list_for_teacher(teacher.id, "2024_2025") == []
+
+
+@pytest.mark.asyncio
+async def test_teacher_certificates_endpoint_reads_index(client, create_user, db_session, monkeypatch):
+    teacher = await create_user(
+        login="certpage",
+        email="certpage@example.com",
+        password="TeacherPass1",
+        role=UserRole.teacher,
+        subject="Math",
+    )
+    key = f"certificates/teachers/2025_2026/certificate_{teacher.id}_2025_2026_02.jpg"
+    await TeacherCertificatesRepo(db_session).add_many(
+        [{"teacher_id": teacher.id, "season": "2025_2026", "seq": 2, "key": key}]
+    )
+
+    async def _no_listing(prefix):
+        raise AssertionError("endpoint must not list storage")
+
+    monkeypatch.setattr(teacher_certificates, "list_object_keys_async", _no_listing)
+    monkeypatch.setattr(teacher_api, "public_url_for_key", lambda k: f"https://cdn.example.com/{k}")
+
+    resp = await client.post("/api/v1/auth/login", json={"login": "certpage", "password": "TeacherPass1"})
+    token = resp.json()["access_token"]
+    resp = await client.get("/api/v1/teacher/certificates?season=2025_2026", headers=_headers(token))
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [item["file_name"] for item in body] == [f"certificate_{teacher.id}_2025_2026_02.jpg"]
+    assert body[0]["url"] == f"https://cdn.example.com/{key}"
+    assert body[0]["title"].endswith("2025-2026 году")
+
+    # сезон без строк в индексе (таблица ещё не сверена) — листинг ключей только этого учителя
+    listings = []
+
+    async def _list(prefix):
+        listings.append(prefix)
+        return [f"certificates/teachers/2024_2025/certificate_{teacher.id}_2024_2025_01.jpg"]
+
+    monkeypatch.setattr(teacher_certificates, "list_object_keys_async", _list)
+    resp = await client.get("/api/v1/teacher/certificates?season=2024_2025", headers=_headers(token))
+    assert [item["seq"] for item in resp.json()] == [1]
+    assert listings == [f"certificates/teachers/2024_2025/certificate_{teacher.id}_"]
+
+
+@pytest.mark.asyncio
+async def test_unindexed_season_falls_back_to_teacher_prefix(monkeypatch):
+    indexed = {"2025_2026"}
+
+    async def _rows(self, teacher_id, season):
+        return []
+
+    async def _season_indexed(self, season):
+        return season in indexed
+
+    async def _list(prefix):
+        return [
+            f"{prefix}2024_2025_02.jpg",
+            f"{prefix}2024_2025_01.jpg",
+            "certificates/teachers/2024_2025/certificate_70_2024_2025_01.jpg",
+        ]
+
+    monkeypatch.setattr(TeacherCertificatesRepo, "list_for_teacher", _rows)
+    monkeypatch.setattr(TeacherCertificatesRepo, "season_indexed", _season_indexed)
+    monkeypatch.setattr(teacher_certificates, "list_object_keys_async", _list)
+    rows = await teacher_certificates.teacher_certificate_rows(None, 7, "2024_2025")
+    assert [(row["teacher_id"], row["seq"]) for row in rows] == [(7, 1), (7, 2)]
+    assert await teacher_certificates.teacher_certificate_rows(None, 7, "2025_2026") == []
+
+    async def _fail(prefix):
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(teacher_certificates, "list_object_keys_async", _fail)
+    with pytest.raises(RuntimeError):
+        await teacher_certificates.teacher_certificate_rows(None, 7, "2024_2025")
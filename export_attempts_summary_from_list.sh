@@ -3,6 +3,7 @@ set -euo pipefail
 
 # Build a consolidated CSV report for attempts listed in input CSV.
 # Input CSV must contain column: attempt_id
+# Whole-olympiad reports (with per-task scores): GET /api/v1/admin/results/olympiads/{id}/export?format=csv|xlsx
 #
 # Usage:
 #   ./export_attempts_summary_from_list.sh \
@@ -3,6 +3,7 @@ set -euo pipefail
 
 # Build a consolidated CSV report for ALL attempts.
 # This variant does NOT include teachers (confirmed links + manual teachers).
+# Whole-olympiad reports (with per-task scores): GET /api/v1/admin/results/olympiads/{id}/export?format=csv|xlsx
 #
 # Usage:
 #   ./export_attempts_summary_no_teachers_from_list.sh